@@ -4,15 +4,123 @@ BaseModel: Clase base que implementa soft delete y auditoría automática.
 Todas las entidades (productos, categorías, proveedores, etc.) heredan de esta clase.
 """
 
+import bisect
+import math
+import os
+import queue
 import sqlite3
+import threading
+import time
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Union
+from typing import Callable, List, Dict, Any, Optional, Union
 import logging
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Perfiles de PRAGMAs aplicados a cada conexión (cache_size negativo = KiB)
+PERFILES_PRAGMA: Dict[str, Dict[str, Any]] = {
+    "seguro": {
+        "busy_timeout": 5000,
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "cache_size": -2000,
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+    },
+    "rendimiento": {
+        "busy_timeout": 5000,
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    },
+    "carga_masiva": {
+        "busy_timeout": 30000,
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -256000,
+        "mmap_size": 1024 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    },
+}
+
+# Perfil por defecto, configurable con la variable de entorno INVENTARIO_DB_PERFIL
+PERFIL_POR_DEFECTO = os.environ.get("INVENTARIO_DB_PERFIL", "rendimiento")
+
+# Sentencias más lentas que este umbral (ms) se registran en el logger
+# "inventario.slow_queries" (INVENTARIO_SLOW_QUERY_MS)
+SLOW_QUERY_MS = float(os.environ.get("INVENTARIO_SLOW_QUERY_MS", "100"))
+slow_query_logger = logging.getLogger("inventario.slow_queries")
+
+# Incluir los valores de los parámetros en el registro de consultas lentas;
+# por defecto solo se anota cuántos son (INVENTARIO_LOG_PARAMS=1)
+LOG_QUERY_PARAMS = os.environ.get("INVENTARIO_LOG_PARAMS", "0") == "1"
+
+# Filas por índice que examina optimize() al actualizar estadísticas
+# (INVENTARIO_ANALYSIS_LIMIT, 0 = todas)
+ANALYSIS_LIMIT = int(os.environ.get("INVENTARIO_ANALYSIS_LIMIT", "1000"))
+
+# Páginas libres que devuelve cada paso del vacío incremental; entre pasos se
+# suelta el bloqueo de escritura (INVENTARIO_VACUUM_PAGES)
+VACUUM_PAGES_PER_STEP = int(os.environ.get("INVENTARIO_VACUUM_PAGES", "1024"))
+
+# Registros eliminados en lote a partir de los cuales se recalculan las estadísticas
+BULK_ANALYZE_MIN_ROWS = 1000
+
+# Segundos sin consultas antes de un mantenimiento en reposo, y mínimo entre
+# dos mantenimientos (INVENTARIO_MAINTENANCE_IDLE, INVENTARIO_MAINTENANCE_INTERVAL)
+MAINTENANCE_IDLE_SECONDS = float(os.environ.get("INVENTARIO_MAINTENANCE_IDLE", "5"))
+MAINTENANCE_INTERVAL_SECONDS = float(os.environ.get("INVENTARIO_MAINTENANCE_INTERVAL", "600"))
+
+# Límites superiores (ms) de las cubetas del histograma de latencias: cada
+# cubeta es un 10% más ancha que la anterior, de 0,01 ms a ~10 minutos
+_LIMITES_MS: List[float] = [0.01 * 1.1 ** i for i in range(189)]
+
+class QueryStats:
+    """Histograma de latencias y contadores de una sentencia"""
+    
+    __slots__ = ("calls", "errors", "rows", "total_ms", "max_ms", "buckets")
+    
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(_LIMITES_MS) + 1)
+    
+    def add(self, ms: float, rows: int, error: bool) -> None:
+        """Sumar una ejecución"""
+        self.calls += 1
+        self.rows += rows
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.buckets[bisect.bisect_left(_LIMITES_MS, ms)] += 1
+        if error:
+            self.errors += 1
+    
+    def percentile(self, p: float) -> float:
+        """
+        Estimar un percentil como el límite superior de su cubeta
+        
+        Args:
+            p (float): Percentil entre 0 y 100
+            
+        Returns:
+            float: Latencia estimada en milisegundos
+        """
+        target = math.ceil(self.calls * p / 100)
+        accumulated = 0
+        for index, count in enumerate(self.buckets):
+            accumulated += count
+            if accumulated >= target:
+                limit = _LIMITES_MS[index] if index < len(_LIMITES_MS) else self.max_ms
+                return min(limit, self.max_ms)
+        return self.max_ms
+
 class BaseModel:
     """
     Clase base que proporciona operaciones CRUD con soft delete y auditoría.
@@ -25,32 +133,209 @@ class BaseModel:
     - Validaciones antes de eliminar
     """
     
-    def __init__(self, db_name: str = "inventario.db"):
+    # Bases en las que ya se fijó journal_mode (es persistente en el archivo)
+    _journal_configurado: set = set()
+    
+    # Conexiones de larga vida: (hilo, base, perfil) -> conexión con el perfil aplicado
+    _conexiones: Dict[tuple, sqlite3.Connection] = {}
+    _conexiones_lock = threading.Lock()
+    
+    # (base, tabla) con triggers de contadores ya verificados en este proceso
+    _contadores_listos: set = set()
+    
+    # Métricas por sentencia, compartidas por todas las entidades
+    _query_stats: Dict[str, QueryStats] = {}
+    _query_hooks: List[Callable[[Dict[str, Any]], None]] = []
+    _stats_lock = threading.Lock()
+    
+    # Métricas de mantenimiento y bases con un mantenimiento en curso
+    _maintenance_stats: Dict[str, float] = {
+        'optimize_runs': 0, 'optimize_ms': 0.0, 'analyze_runs': 0, 'analyze_ms': 0.0,
+        'vacuum_steps': 0, 'pages_freed': 0, 'bytes_reclaimed': 0,
+    }
+    _maintenance_running: set = set()
+    
+    def __init__(self, db_name: str = "inventario.db", perfil: Optional[str] = None):
         self.db_name = db_name
         self.table_name = ""  # Debe ser definido por las clases hijas
         self.primary_key = "id"  # Puede ser redefinido por las clases hijas
+        self.perfil = perfil or PERFIL_POR_DEFECTO
+        if self.perfil not in PERFILES_PRAGMA:
+            raise ValueError(f"Perfil de base de datos desconocido: '{self.perfil}'")
         
     def _validate_before_delete(self, record_id: Union[str, int]) -> bool:
         """Método base para validar antes de eliminar un registro"""
         return True
         
     def get_connection(self) -> sqlite3.Connection:
-        """Obtener una conexión a la base de datos"""
-        return sqlite3.connect(self.db_name)
+        """Obtener una conexión nueva a la base de datos con el perfil de PRAGMAs aplicado"""
+        conn = sqlite3.connect(self.db_name)
+        self._aplicar_perfil(conn)
+        return conn
+    
+    def _conexion_del_hilo(self) -> sqlite3.Connection:
+        """
+        Obtener la conexión de larga vida del hilo actual para esta base y perfil
+        
+        Abrir una conexión y aplicarle el perfil cuesta más que una consulta
+        por clave, así que execute_query y execute_command reutilizan una por
+        hilo y los PRAGMAs se aplican una sola vez. Se cierran con
+        close_connections.
+        
+        Returns:
+            sqlite3.Connection: Conexión que solo usa el hilo actual
+        """
+        clave = (threading.get_ident(), os.path.abspath(self.db_name), self.perfil)
+        conn = BaseModel._conexiones.get(clave)
+        if conn is None:
+            # check_same_thread=False solo para poder cerrarla desde close_connections
+            conn = sqlite3.connect(self.db_name, check_same_thread=False)
+            try:
+                self._aplicar_perfil(conn)
+            except Exception:
+                conn.close()
+                raise
+            with BaseModel._conexiones_lock:
+                BaseModel._conexiones[clave] = conn
+        return conn
+    
+    @classmethod
+    def close_connections(cls) -> None:
+        """Cerrar las conexiones de larga vida de todos los hilos (llamar al cerrar la aplicación)"""
+        with cls._conexiones_lock:
+            conexiones = list(cls._conexiones.values())
+            cls._conexiones.clear()
+        for conn in conexiones:
+            conn.close()
+    
+    def _aplicar_perfil(self, conn: sqlite3.Connection) -> None:
+        """
+        Aplicar los PRAGMAs del perfil a una conexión nueva
+        
+        journal_mode se guarda en el archivo, por lo que solo se fija la primera
+        vez por base y proceso; el resto de los PRAGMAs son por conexión.
+        """
+        pragmas = PERFILES_PRAGMA[self.perfil]
+        clave = (os.path.abspath(self.db_name), self.perfil)
+        
+        for nombre, valor in pragmas.items():
+            if nombre == "journal_mode" and clave in BaseModel._journal_configurado:
+                continue
+            if nombre == "journal_mode" and not conn.execute("PRAGMA page_count").fetchone()[0]:
+                # Archivo recién creado: auto_vacuum solo se elige antes de la
+                # primera página (después exige un VACUUM completo)
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute(f"PRAGMA {nombre} = {valor}").fetchall()
+        
+        BaseModel._journal_configurado.add(clave)
+    
+    # ================================
+    # MÉTRICAS DE SENTENCIAS
+    # ================================
     
-    def execute_query(self, query: str, params: Optional[tuple] = None) -> List[tuple]:
+    def _statement_name(self, sql: str, name: Optional[str]) -> str:
+        """Nombre con el que se agrupan las métricas de una sentencia"""
+        if name:
+            return f"{self.table_name}.{name}" if self.table_name else name
+        text = " ".join(sql.split())
+        return text if len(text) <= 60 else text[:57] + "..."
+    
+    def _record_query(self, name: str, seconds: float, rows: int = 0,
+                      error: Optional[Exception] = None, params: Optional[tuple] = None) -> None:
+        """
+        Registrar una ejecución en el histograma de su sentencia
+        
+        Args:
+            name (str): Nombre de la sentencia (ver _statement_name)
+            seconds (float): Duración de la ejecución
+            rows (int): Filas leídas o afectadas
+            error (Exception): Error de la ejecución, si lo hubo
+            params (tuple): Parámetros (en el registro de consultas lentas solo
+                se escriben sus valores con LOG_QUERY_PARAMS)
+        """
+        ms = seconds * 1000
+        with BaseModel._stats_lock:
+            stats = BaseModel._query_stats.get(name)
+            if stats is None:
+                stats = BaseModel._query_stats[name] = QueryStats()
+            stats.add(ms, rows, error is not None)
+            hooks = list(BaseModel._query_hooks)
+        
+        if ms >= SLOW_QUERY_MS:
+            detail = repr(params) if LOG_QUERY_PARAMS or not params else f"<{len(params)} valores>"
+            slow_query_logger.warning(f"🐢 {name} {ms:.1f} ms filas={rows} params={detail}"
+                                      + (f" error={error}" if error is not None else ""))
+        
+        for hook in hooks:
+            hook({'statement': name, 'ms': ms, 'rows': rows, 'error': error})
+    
+    @classmethod
+    def add_query_hook(cls, hook: Callable[[Dict[str, Any]], None]) -> None:
+        """
+        Registrar una función que recibe cada medición
+        
+        Args:
+            hook (Callable): Recibe un dict con statement, ms, rows y error
+        """
+        with cls._stats_lock:
+            cls._query_hooks.append(hook)
+    
+    @classmethod
+    def remove_query_hook(cls, hook: Callable[[Dict[str, Any]], None]) -> None:
+        """Quitar una función registrada con add_query_hook"""
+        with cls._stats_lock:
+            if hook in cls._query_hooks:
+                cls._query_hooks.remove(hook)
+    
+    @classmethod
+    def get_query_stats(cls) -> Dict[str, Dict[str, float]]:
+        """
+        Obtener las métricas acumuladas por sentencia
+        
+        Returns:
+            Dict: Por sentencia: calls, errors, rows, mean_ms, p50_ms, p95_ms, p99_ms y max_ms
+        """
+        with cls._stats_lock:
+            return {
+                name: {
+                    'calls': stats.calls,
+                    'errors': stats.errors,
+                    'rows': stats.rows,
+                    'mean_ms': stats.total_ms / stats.calls,
+                    'p50_ms': stats.percentile(50),
+                    'p95_ms': stats.percentile(95),
+                    'p99_ms': stats.percentile(99),
+                    'max_ms': stats.max_ms,
+                }
+                for name, stats in cls._query_stats.items()
+            }
+    
+    @classmethod
+    def reset_query_stats(cls) -> None:
+        """Borrar todas las métricas acumuladas"""
+        with cls._stats_lock:
+            cls._query_stats.clear()
+    
+    # ================================
+    # EJECUCIÓN DE SENTENCIAS
+    # ================================
+    
+    def execute_query(self, query: str, params: Optional[tuple] = None,
+                      name: Optional[str] = None) -> List[tuple]:
         """
         Ejecutar una consulta SELECT y retornar resultados
         
         Args:
             query (str): Consulta SQL
             params (tuple): Parámetros para la consulta
+            name (str): Nombre de la sentencia para las métricas (por defecto, su texto)
             
         Returns:
             List[tuple]: Lista de tuplas con los resultados
         """
+        start = time.perf_counter()
         try:
-            conn = self.get_connection()
+            conn = self._conexion_del_hilo()
             cursor = conn.cursor()
             
             if params:
@@ -59,26 +344,33 @@ class BaseModel:
                 cursor.execute(query)
             
             results = cursor.fetchall()
-            conn.close()
+            self._record_query(self._statement_name(query, name), time.perf_counter() - start,
+                               len(results), params=params)
             return results
             
         except Exception as e:
+            self._record_query(self._statement_name(query, name), time.perf_counter() - start,
+                               error=e, params=params)
             logger.error(f"❌ Error ejecutando consulta: {e}")
             return []
 
-    def execute_command(self, command: str, params: Optional[tuple] = None) -> int:
+    def execute_command(self, command: str, params: Optional[tuple] = None,
+                        name: Optional[str] = None) -> int:
         """
         Ejecutar un comando INSERT, UPDATE o DELETE
         
         Args:
             command (str): Comando SQL
             params (tuple): Parámetros para el comando
+            name (str): Nombre de la sentencia para las métricas (por defecto, su texto)
             
         Returns:
             int: Número de filas afectadas
         """
+        start = time.perf_counter()
+        conn = None
         try:
-            conn = self.get_connection()
+            conn = self._conexion_del_hilo()
             cursor = conn.cursor()
             
             if params:
@@ -88,10 +380,16 @@ class BaseModel:
             
             conn.commit()
             rows_affected = cursor.rowcount
-            conn.close()
+            self._record_query(self._statement_name(command, name), time.perf_counter() - start,
+                               rows_affected, params=params)
             return rows_affected
             
         except Exception as e:
+            # La conexión se reutiliza: no puede quedar con la transacción abierta
+            if conn is not None and conn.in_transaction:
+                conn.rollback()
+            self._record_query(self._statement_name(command, name), time.perf_counter() - start,
+                               error=e, params=params)
             logger.error(f"❌ Error ejecutando comando: {e}")
             return 0
     
@@ -110,7 +408,7 @@ class BaseModel:
         if order_by:
             query += f" ORDER BY {order_by}"
             
-        return self.execute_query(query)
+        return self.execute_query(query, name="get_active")
     
     def get_deleted(self, order_by: Optional[str] = None) -> List[tuple]:
         """
@@ -127,7 +425,7 @@ class BaseModel:
         if order_by:
             query += f" ORDER BY {order_by}"
             
-        return self.execute_query(query)
+        return self.execute_query(query, name="get_deleted")
     
     def get_all_including_deleted(self, order_by: Optional[str] = None) -> List[tuple]:
         """
@@ -144,7 +442,7 @@ class BaseModel:
         if order_by:
             query += f" ORDER BY {order_by}"
             
-        return self.execute_query(query)
+        return self.execute_query(query, name="get_all_including_deleted")
     
     def get_by_id(self, record_id: Union[str, int]) -> Optional[tuple]:
         """
@@ -157,7 +455,7 @@ class BaseModel:
             Optional[tuple]: Registro encontrado o None
         """
         query = f"SELECT * FROM {self.table_name} WHERE {self.primary_key} = ? AND deleted_at IS NULL"
-        results = self.execute_query(query, (record_id,))
+        results = self.execute_query(query, (record_id,), name="get_by_id")
         
         return results[0] if results else None
     
@@ -186,7 +484,7 @@ class BaseModel:
             
             # Ejecutar soft delete
             query = f"UPDATE {self.table_name} SET deleted_at = CURRENT_TIMESTAMP WHERE {self.primary_key} = ?"
-            rows_affected = self.execute_command(query, (record_id,))
+            rows_affected = self.execute_command(query, (record_id,), name="soft_delete")
             
             if rows_affected > 0:
                 return True
@@ -210,7 +508,7 @@ class BaseModel:
         """
         try:
             query = f"UPDATE {self.table_name} SET deleted_at = NULL WHERE {self.primary_key} = ?"
-            rows_affected = self.execute_command(query, (record_id,))
+            rows_affected = self.execute_command(query, (record_id,), name="restore")
             
             if rows_affected > 0:
                 return True
@@ -241,28 +539,116 @@ class BaseModel:
             query = f"SELECT * FROM {self.table_name} WHERE {field} = ? AND deleted_at IS NULL"
             params = (value,)
             
-        return self.execute_query(query, params)
+        return self.execute_query(query, params, name=f"search_active.{field}")
+    
+    def _ensure_counters(self) -> bool:
+        """
+        Crear (una vez por base y tabla) los triggers que mantienen entity_counters
+        
+        La tabla entity_counters guarda por entidad la cantidad de registros
+        activos y eliminados. Los triggers y el conteo inicial se crean en la
+        misma transacción, así que los contadores arrancan exactos.
+        
+        Returns:
+            bool: True si los contadores están disponibles para esta tabla
+        """
+        clave = (os.path.abspath(self.db_name), self.table_name)
+        if clave in BaseModel._contadores_listos:
+            return True
+        
+        t = self.table_name
+        estado = "(CASE WHEN {fila}.deleted_at IS NULL THEN {signo}1 ELSE 0 END), " \
+                 "(CASE WHEN {fila}.deleted_at IS NULL THEN 0 ELSE {signo}1 END)"
+        sumar = ("INSERT INTO entity_counters (table_name, active, deleted) VALUES ('" + t + "', {valores}) "
+                 "ON CONFLICT(table_name) DO UPDATE SET active = active + excluded.active, "
+                 "deleted = deleted + excluded.deleted;")
+        
+        try:
+            conn = self.get_connection()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS entity_counters (
+                        table_name TEXT PRIMARY KEY,
+                        active INTEGER NOT NULL DEFAULT 0,
+                        deleted INTEGER NOT NULL DEFAULT 0
+                    ) WITHOUT ROWID
+                """)
+                existe = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?",
+                    (f"trg_{t}_counters_insert",)
+                ).fetchone()
+                if not existe:
+                    conn.execute(f"""
+                        INSERT OR REPLACE INTO entity_counters (table_name, active, deleted)
+                        SELECT '{t}', COUNT(*) - COUNT(deleted_at), COUNT(deleted_at) FROM {t}
+                    """)
+                    conn.execute(
+                        f"CREATE TRIGGER trg_{t}_counters_insert AFTER INSERT ON {t} BEGIN "
+                        + sumar.format(valores=estado.format(fila="new", signo="")) + " END"
+                    )
+                    conn.execute(
+                        f"CREATE TRIGGER trg_{t}_counters_delete AFTER DELETE ON {t} BEGIN "
+                        + sumar.format(valores=estado.format(fila="old", signo="-")) + " END"
+                    )
+                    conn.execute(
+                        f"CREATE TRIGGER trg_{t}_counters_update AFTER UPDATE OF deleted_at ON {t} "
+                        f"WHEN (old.deleted_at IS NULL) != (new.deleted_at IS NULL) BEGIN "
+                        + sumar.format(valores=estado.format(fila="old", signo="-")) + " "
+                        + sumar.format(valores=estado.format(fila="new", signo="")) + " END"
+                    )
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ No se pudieron crear los contadores de {t}: {e}")
+            return False
+        
+        BaseModel._contadores_listos.add(clave)
+        return True
+    
+    def _read_counter(self, column: str) -> Optional[int]:
+        """Leer un contador de entity_counters (None si no están disponibles)"""
+        if not self.table_name or not self._ensure_counters():
+            return None
+        result = self.execute_query(
+            f"SELECT {column} FROM entity_counters WHERE table_name = ?",
+            (self.table_name,), name=f"count_{column}"
+        )
+        return result[0][0] if result else 0
     
     def count_active(self) -> int:
         """
         Contar registros activos
         
+        Lee el contador mantenido por triggers (ver _ensure_counters) en
+        lugar de recorrer la tabla.
+        
         Returns:
             int: Número de registros activos
         """
+        count = self._read_counter("active")
+        if count is not None:
+            return count
         query = f"SELECT COUNT(*) FROM {self.table_name} WHERE deleted_at IS NULL"
-        result = self.execute_query(query)
+        result = self.execute_query(query, name="count_active")
         return result[0][0] if result else 0
     
     def count_deleted(self) -> int:
         """
         Contar registros eliminados
         
+        Lee el contador mantenido por triggers (ver _ensure_counters) en
+        lugar de recorrer la tabla.
+        
         Returns:
             int: Número de registros eliminados
         """
+        count = self._read_counter("deleted")
+        if count is not None:
+            return count
         query = f"SELECT COUNT(*) FROM {self.table_name} WHERE deleted_at IS NOT NULL"
-        result = self.execute_query(query)
+        result = self.execute_query(query, name="count_deleted")
         return result[0][0] if result else 0
     
     def get_audit_info(self, record_id: Union[str, int]) -> Optional[Dict[str, Any]]:
@@ -281,7 +667,7 @@ class BaseModel:
         WHERE {self.primary_key} = ?
         """
         
-        result = self.execute_query(query, (record_id,))
+        result = self.execute_query(query, (record_id,), name="get_audit_info")
         
         if result:
             created_at, updated_at, deleted_at = result[0]
@@ -314,6 +700,10 @@ class BaseModel:
                 successful.append(record_id)
             else:
                 failed.append(record_id)
+        
+        # Muchos deleted_at nuevos dejan viejas las estadísticas del planificador
+        if len(successful) >= BULK_ANALYZE_MIN_ROWS:
+            self.run_maintenance_in_background(analyze=True)
         return {
             'successful': successful,
             'failed': failed,
@@ -339,7 +729,7 @@ class BaseModel:
         LIMIT {limit}
         """
         
-        return self.execute_query(query)
+        return self.execute_query(query, name="get_recently_created")
     
     def get_recently_updated(self, days: int = 7, limit: int = 100) -> List[tuple]:
         """
@@ -361,4 +751,301 @@ class BaseModel:
         LIMIT {limit}
         """
         
-        return self.execute_query(query)
\ No newline at end of file
+        return self.execute_query(query, name="get_recently_updated")
+    
+    # ================================
+    # MANTENIMIENTO
+    # ================================
+    
+    def get_space_info(self) -> Dict[str, Any]:
+        """
+        Obtener el tamaño de la base y sus páginas libres
+        
+        Returns:
+            Dict: page_size, pages, free_pages, bytes, free_bytes y auto_vacuum
+                  ('none', 'full' o 'incremental')
+        """
+        conn = self.get_connection()
+        try:
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            pages = conn.execute("PRAGMA page_count").fetchone()[0]
+            free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        finally:
+            conn.close()
+        return {
+            'page_size': page_size,
+            'pages': pages,
+            'free_pages': free_pages,
+            'bytes': pages * page_size,
+            'free_bytes': free_pages * page_size,
+            'auto_vacuum': {0: "none", 1: "full", 2: "incremental"}.get(mode, str(mode)),
+        }
+    
+    def optimize(self) -> bool:
+        """
+        Actualizar las estadísticas que falten o hayan quedado viejas (PRAGMA optimize)
+        
+        Como cada llamada abre su propia conexión, y antes de SQLite 3.46
+        PRAGMA optimize solo mira las tablas que consultó esa misma conexión,
+        en esas versiones se ejecuta ANALYZE leyendo a lo sumo ANALYSIS_LIMIT
+        filas por índice. Se llama al cerrar la aplicación y desde el
+        mantenimiento en segundo plano, nunca en cada consulta.
+        
+        Returns:
+            bool: True si se ejecutó, False si falló (por ejemplo, base bloqueada)
+        """
+        start = time.perf_counter()
+        conn = self.get_connection()
+        try:
+            conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}").fetchall()
+            if sqlite3.sqlite_version_info >= (3, 46, 0):
+                # 0x10000: revisar todas las tablas, no solo las de esta conexión
+                conn.execute("PRAGMA optimize(0x10002)").fetchall()
+            else:
+                conn.execute("ANALYZE")
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ No se pudo optimizar {self.db_name}: {e}")
+            return False
+        finally:
+            conn.close()
+        with BaseModel._stats_lock:
+            BaseModel._maintenance_stats['optimize_runs'] += 1
+            BaseModel._maintenance_stats['optimize_ms'] += (time.perf_counter() - start) * 1000
+        return True
+    
+    def analyze(self) -> float:
+        """
+        Recalcular las estadísticas del planificador de todas las tablas (ANALYZE)
+        
+        Lee cada índice completo: usarlo después de cargas o bajas masivas,
+        preferentemente con run_maintenance_in_background.
+        
+        Returns:
+            float: Milisegundos que tardó
+        """
+        start = time.perf_counter()
+        conn = self.get_connection()
+        try:
+            conn.execute("ANALYZE")
+        finally:
+            conn.close()
+        ms = (time.perf_counter() - start) * 1000
+        with BaseModel._stats_lock:
+            BaseModel._maintenance_stats['analyze_runs'] += 1
+            BaseModel._maintenance_stats['analyze_ms'] += ms
+        logger.info(f"📊 ANALYZE de {self.db_name} en {ms:.0f} ms")
+        return ms
+    
+    def incremental_vacuum(self, pages: Optional[int] = None) -> Dict[str, int]:
+        """
+        Devolver al sistema hasta ``pages`` páginas libres (PRAGMA incremental_vacuum)
+        
+        Los soft delete no liberan páginas; las liberan las actualizaciones
+        que reescriben filas e índices. Requiere auto_vacuum = INCREMENTAL
+        (las bases nuevas lo tienen; ver enable_incremental_vacuum); si no,
+        no hace nada.
+        
+        Args:
+            pages (int): Páginas como máximo (por defecto VACUUM_PAGES_PER_STEP)
+            
+        Returns:
+            Dict: pages_freed, bytes_reclaimed y free_pages (las que quedan)
+        """
+        pages = VACUUM_PAGES_PER_STEP if pages is None else pages
+        before = self.get_space_info()
+        result = {'pages_freed': 0, 'bytes_reclaimed': 0, 'free_pages': before['free_pages']}
+        if before['auto_vacuum'] != "incremental" or not before['free_pages'] or pages <= 0:
+            return result
+        
+        conn = self.get_connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # sqlite3 ejecuta un solo paso de las sentencias que no retornan
+            # filas, y cada paso de incremental_vacuum mueve una página
+            for _ in range(min(pages, before['free_pages'])):
+                conn.execute("PRAGMA incremental_vacuum(1)")
+            conn.commit()
+            free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        finally:
+            conn.close()
+        
+        freed = max(0, before['free_pages'] - free_pages)
+        result.update({
+            'pages_freed': freed,
+            'bytes_reclaimed': freed * before['page_size'],
+            'free_pages': free_pages,
+        })
+        with BaseModel._stats_lock:
+            BaseModel._maintenance_stats['vacuum_steps'] += 1
+            BaseModel._maintenance_stats['pages_freed'] += freed
+            BaseModel._maintenance_stats['bytes_reclaimed'] += result['bytes_reclaimed']
+        return result
+    
+    def enable_incremental_vacuum(self) -> int:
+        """
+        Pasar una base existente a auto_vacuum = INCREMENTAL
+        
+        Reescribe la base completa con VACUUM (que además devuelve todas las
+        páginas libres) y nadie puede escribir mientras dura: ejecutarlo con
+        la aplicación cerrada.
+        
+        Returns:
+            int: Bytes recuperados (0 si la base ya usaba vacío incremental)
+        """
+        before = self.get_space_info()
+        if before['auto_vacuum'] == "incremental":
+            return 0
+        conn = self.get_connection()
+        try:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+        reclaimed = max(0, before['bytes'] - self.get_space_info()['bytes'])
+        with BaseModel._stats_lock:
+            BaseModel._maintenance_stats['bytes_reclaimed'] += reclaimed
+        logger.info(f"🧹 Vacío incremental activado en {self.db_name}: {reclaimed / 1024:.0f} KiB recuperados")
+        return reclaimed
+    
+    def run_maintenance(self, analyze: bool = False, pause: float = 0.05) -> Dict[str, Any]:
+        """
+        Ejecutar el mantenimiento completo: estadísticas y vacío incremental
+        
+        Actualiza las estadísticas con optimize() o, si se pide, con un
+        ANALYZE completo.
+        
+        Vacía de a VACUUM_PAGES_PER_STEP páginas y entre paso y paso suelta el
+        bloqueo de escritura ``pause`` segundos, así las escrituras de la
+        interfaz no esperan todo el vacío.
+        
+        Args:
+            analyze (bool): Si recalcular las estadísticas completas en lugar de optimize()
+            pause (float): Segundos entre pasos del vacío
+            
+        Returns:
+            Dict: analyze_ms, pages_freed, bytes_reclaimed, free_pages y bytes (tamaño final)
+        """
+        if analyze:
+            report = {'analyze_ms': self.analyze()}
+        else:
+            self.optimize()
+            report = {'analyze_ms': 0.0}
+        report.update({'pages_freed': 0, 'bytes_reclaimed': 0})
+        while True:
+            step = self.incremental_vacuum()
+            report['pages_freed'] += step['pages_freed']
+            report['bytes_reclaimed'] += step['bytes_reclaimed']
+            if not step['pages_freed'] or not step['free_pages']:
+                break
+            time.sleep(pause)
+        
+        space = self.get_space_info()
+        report.update({'free_pages': space['free_pages'], 'bytes': space['bytes']})
+        if report['bytes_reclaimed']:
+            logger.info(f"🧹 {self.db_name}: {report['pages_freed']} páginas liberadas, "
+                        f"{report['bytes_reclaimed'] / 1024:.0f} KiB recuperados")
+        elif space['free_pages'] and space['auto_vacuum'] != "incremental":
+            logger.info(f"ℹ️ {self.db_name} tiene {space['free_pages']} páginas libres pero no usa "
+                        f"vacío incremental (ver enable_incremental_vacuum)")
+        return report
+    
+    def run_maintenance_in_background(self, analyze: bool = False,
+                                      on_done: Optional[Callable[[Dict[str, Any]], None]] = None
+                                      ) -> Optional[threading.Thread]:
+        """
+        Ejecutar run_maintenance en un hilo de fondo, sin bloquear la interfaz
+        
+        Hay a lo sumo un mantenimiento por base a la vez. ``on_done`` recibe el
+        informe en el hilo de fondo: no debe tocar la interfaz directamente.
+        
+        Args:
+            analyze (bool): Si recalcular las estadísticas completas (ver run_maintenance)
+            on_done (Callable): Recibe el informe de run_maintenance
+            
+        Returns:
+            threading.Thread: El hilo lanzado, o None si ya había uno en curso
+        """
+        clave = os.path.abspath(self.db_name)
+        with BaseModel._stats_lock:
+            if clave in BaseModel._maintenance_running:
+                return None
+            BaseModel._maintenance_running.add(clave)
+        
+        def work():
+            try:
+                report = self.run_maintenance(analyze)
+                if on_done:
+                    on_done(report)
+            except Exception as e:
+                logger.warning(f"⚠️ Mantenimiento de {self.db_name} interrumpido: {e}")
+            finally:
+                with BaseModel._stats_lock:
+                    BaseModel._maintenance_running.discard(clave)
+        
+        thread = threading.Thread(target=work, name="inventario-mantenimiento", daemon=True)
+        thread.start()
+        return thread
+    
+    @classmethod
+    def get_maintenance_stats(cls) -> Dict[str, float]:
+        """
+        Obtener las métricas de mantenimiento acumuladas
+        
+        Returns:
+            Dict: optimize_runs, optimize_ms, analyze_runs, analyze_ms, vacuum_steps,
+                  pages_freed y bytes_reclaimed
+        """
+        with cls._stats_lock:
+            return dict(cls._maintenance_stats)
+
+class MaintenanceScheduler:
+    """
+    Mantenimiento de la base en los cuadros en que la interfaz está en reposo
+    
+    La aplicación llama a tick() en cada cuadro. Cuando no hubo consultas
+    durante MAINTENANCE_IDLE_SECONDS (y pasaron MAINTENANCE_INTERVAL_SECONDS
+    desde el anterior) lanza run_maintenance_in_background; el cuadro nunca
+    espera a la base. El informe del mantenimiento se entrega en el hilo de
+    la interfaz, en el tick siguiente a que termine.
+    """
+    
+    def __init__(self, model: BaseModel, idle_seconds: Optional[float] = None,
+                 interval_seconds: Optional[float] = None):
+        self.model = model
+        self.idle_seconds = MAINTENANCE_IDLE_SECONDS if idle_seconds is None else idle_seconds
+        self.interval_seconds = MAINTENANCE_INTERVAL_SECONDS if interval_seconds is None else interval_seconds
+        self.last_report: Optional[Dict[str, Any]] = None
+        self._last_activity = time.monotonic()
+        self._last_run = self._last_activity - self.interval_seconds
+        self._reports: queue.SimpleQueue = queue.SimpleQueue()
+        # Cada consulta de los modelos marca actividad; las del mantenimiento no pasan por aquí
+        BaseModel.add_query_hook(self._on_query)
+    
+    def _on_query(self, measurement: Dict[str, Any]) -> None:
+        self._last_activity = time.monotonic()
+    
+    def tick(self) -> Optional[Dict[str, Any]]:
+        """
+        Lanzar el mantenimiento si la interfaz está en reposo (llamar una vez por cuadro)
+        
+        Returns:
+            Dict: Informe de un mantenimiento que terminó desde el tick anterior, o None
+        """
+        try:
+            report = self._reports.get_nowait()
+        except queue.Empty:
+            report = None
+        else:
+            self.last_report = report
+        
+        now = time.monotonic()
+        if now - self._last_activity >= self.idle_seconds and now - self._last_run >= self.interval_seconds:
+            if self.model.run_maintenance_in_background(on_done=self._reports.put) is not None:
+                self._last_run = now
+        return report
+    
+    def close(self) -> None:
+        """Dejar de observar las consultas y optimizar la base (llamar al cerrar la aplicación)"""
+        BaseModel.remove_query_hook(self._on_query)
+        self.model.optimize()
@@ -12,6 +12,8 @@ import os
 import logging
 from datetime import datetime
 
+from base_model import BaseModel, MaintenanceScheduler
+
 # Importar módulos de gestión
 # from modules.categorias_manager import CategoriasManager
 # from modules.proveedores_manager import ProveedoresManager  
@@ -32,6 +34,9 @@ class InventarioApp:
             # Inicializar managers con manejo de errores
             logger.info("🚀 Inicializando sistema de inventario...")
             
+            # Estadísticas y vacío incremental de la base en los cuadros de reposo
+            self.mantenimiento = MaintenanceScheduler(BaseModel(self.db_name))
+            
         except Exception as e:
             logger.error(f"❌ Error durante la inicialización: {e}")
             raise
@@ -58,10 +63,17 @@ class InventarioApp:
         except Exception as e:
             logger.error(f"⚠️ Error cargando datos iniciales: {e}")
             # Continuar con la aplicación aunque fallen los datos iniciales
-        dpg.start_dearpygui()
+        
+        # Bucle de dibujo: en los cuadros sin consultas se mantiene la base
+        while dpg.is_dearpygui_running():
+            # El espacio recuperado lo informa run_maintenance en el log
+            self.mantenimiento.tick()
+            dpg.render_dearpygui_frame()
         
         # Limpiar recursos al cerrar
         dpg.destroy_context()
+        self.mantenimiento.close()
+        BaseModel.close_connections()
 
 def main():
     """Función principal"""
@@ -0,0 +1,246 @@
+# benchmark.py - Medición de latencia por llamada de la capa de base de datos
+"""
+Casos disponibles:
+- conexiones: costo por llamada de abrir/cerrar una conexión en cada consulta
+  (comportamiento anterior de DatabaseManager) contra el pool compartido,
+  sobre un catálogo sintético de 100.000 libros.
+- busqueda: latencia de ServicioLibros.buscar_libros (FTS5) contra el LIKE
+  '%x%' anterior, sobre un catálogo de 1.000.000 de libros.
+- escritura: filas por segundo al insertar libros con execute_command fila
+  por fila contra execute_many en lotes.
+- cache: latencia de las lecturas de la interfaz (combos y búsquedas por
+  clave) con y sin la caché de resultados, con un préstamo cada 20 lecturas.
+
+Uso:
+    python benchmark.py [caso] [cantidad_libros] [llamadas]
+
+Para medir todas las sentencias y operaciones sobre datos sintéticos a
+escala (y comparar entre commits) ver benchmark_suite.py.
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+import modules.sqlstatement as sql
+from modules.database_manager import DatabaseManager
+from modules.datos_sinteticos import vocabulario
+from modules.servicios import ServicioLibros, ServicioPrestamos
+
+LIBROS_POR_DEFECTO = 100_000
+LLAMADAS_POR_DEFECTO = 2_000
+
+def poblar_catalogo(db_name, cantidad_libros):
+    """Crear un catálogo sintético con la cantidad de libros indicada"""
+    rnd = random.Random(42)
+    palabras = vocabulario()
+    conn = sqlite3.connect(db_name)
+    cursor = conn.cursor()
+    autores = [(f"Nombre{i}", f"Apellido{i}", "Argentina", "1950-01-01") for i in range(1000)]
+    cursor.executemany(sql.INSERT_AUTOR, autores)
+    libros = (
+        (f"978{i:010d}", " ".join(rnd.sample(palabras, rnd.randint(2, 5))), i % 1000 + 1,
+         1900 + i % 120, f"Editorial {i % 50}", f"Genero {i % 30}", "Disponible")
+        for i in range(cantidad_libros)
+    )
+    cursor.executemany(sql.INSERT_LIBRO, libros)
+    conn.commit()
+    conn.close()
+    return palabras
+
+def _consulta_sin_pool(db_name, query, params):
+    """Réplica del execute_query original: una conexión nueva por llamada"""
+    conn = sqlite3.connect(db_name)
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    results = cursor.fetchall()
+    conn.close()
+    return results
+
+def _comando_sin_pool(db_name, command, params):
+    """Réplica del execute_command original: una conexión nueva por llamada"""
+    conn = sqlite3.connect(db_name)
+    cursor = conn.cursor()
+    cursor.execute(command, params)
+    conn.commit()
+    rows = cursor.rowcount
+    conn.close()
+    return rows
+
+def medir(funcion, argumentos):
+    """Ejecutar la función con cada juego de argumentos y devolver latencias en µs"""
+    tiempos = []
+    for args in argumentos:
+        inicio = time.perf_counter()
+        funcion(*args)
+        tiempos.append((time.perf_counter() - inicio) * 1_000_000)
+    return tiempos
+
+def _resumen(nombre, tiempos, unidad="µs"):
+    tiempos = sorted(tiempos)
+    p95 = tiempos[max(0, int(len(tiempos) * 0.95) - 1)]
+    print(f"   {nombre:<28} media {statistics.mean(tiempos):9.1f} {unidad} | "
+          f"p50 {statistics.median(tiempos):9.1f} {unidad} | p95 {p95:9.1f} {unidad}")
+    return statistics.mean(tiempos)
+
+def benchmark_conexiones(cantidad_libros=LIBROS_POR_DEFECTO, llamadas=LLAMADAS_POR_DEFECTO):
+    """Comparar conexión por llamada contra el pool compartido"""
+    with tempfile.TemporaryDirectory() as directorio:
+        db_name = os.path.join(directorio, "benchmark.db")
+        manager = DatabaseManager(db_name)
+        # Se mide la base, no la caché de resultados
+        manager.cache.activa = False
+        print(f"📚 Generando catálogo de {cantidad_libros} libros...")
+        poblar_catalogo(db_name, cantidad_libros)
+
+        rnd = random.Random(42)
+        isbns = [(f"978{rnd.randrange(cantidad_libros):010d}",) for _ in range(llamadas)]
+        estados = [("Disponible", isbn[0]) for isbn in isbns]
+
+        print(f"⏱️  {llamadas} llamadas por caso")
+        print("🔍 SELECT_LIBRO_BY_ISBN")
+        antes = _resumen("conexión por llamada", medir(
+            _consulta_sin_pool, [(db_name, sql.SELECT_LIBRO_BY_ISBN, p) for p in isbns]))
+        despues = _resumen("pool compartido", medir(
+            manager.execute_query, [(sql.SELECT_LIBRO_BY_ISBN, p) for p in isbns]))
+        print(f"   ➡️  {antes / despues:.1f}x más rápido")
+
+        print("✏️  UPDATE_LIBRO_ESTADO")
+        antes = _resumen("conexión por llamada", medir(
+            _comando_sin_pool, [(db_name, sql.UPDATE_LIBRO_ESTADO, p) for p in estados]))
+        despues = _resumen("pool compartido", medir(
+            manager.execute_command, [(sql.UPDATE_LIBRO_ESTADO, p) for p in estados]))
+        print(f"   ➡️  {antes / despues:.1f}x más rápido")
+
+        manager.cerrar_conexiones()
+
+def _busqueda_like(manager, termino):
+    """Réplica de la búsqueda anterior: dos LIKE '%x%' y unión O(n²)"""
+    libros_titulo = manager.execute_query(sql.SEARCH_LIBROS_BY_TITLE, (f"%{termino}%",))
+    libros_genero = manager.execute_query(sql.SEARCH_LIBROS_BY_GENRE, (f"%{termino}%",))
+    return libros_titulo + [libro for libro in libros_genero if libro not in libros_titulo]
+
+def benchmark_busqueda(cantidad_libros=1_000_000, llamadas=200):
+    """Comparar la búsqueda FTS5 contra LIKE sobre el catálogo"""
+    with tempfile.TemporaryDirectory() as directorio:
+        db_name = os.path.join(directorio, "benchmark.db")
+        manager = ServicioLibros(db_name)
+        manager.cache.activa = False
+        print(f"📚 Generando catálogo de {cantidad_libros} libros...")
+        palabras = poblar_catalogo(db_name, cantidad_libros)
+
+        rnd = random.Random(42)
+        terminos = [(rnd.choice(palabras),) for _ in range(llamadas)]
+
+        print(f"⏱️  {llamadas} búsquedas por caso")
+        print("🔍 Búsqueda por una palabra")
+        despues = _resumen("FTS5 (buscar_libros)", [
+            t / 1000 for t in medir(manager.buscar_libros, terminos)], "ms")
+        antes = _resumen("LIKE '%x%'", [t / 1000 for t in medir(
+            lambda termino: _busqueda_like(manager, termino), terminos[:max(1, llamadas // 20)])], "ms")
+        print(f"   ➡️  {antes / despues:.1f}x más rápido")
+
+        manager.cerrar_conexiones()
+
+def _libros_sinteticos(cantidad, desde=0):
+    """Generar filas de INSERT_LIBRO sin repetir ISBN"""
+    return (
+        (f"979{i:010d}", f"Titulo {i}", i % 1000 + 1, 1900 + i % 120,
+         f"Editorial {i % 50}", f"Genero {i % 30}", "Disponible")
+        for i in range(desde, desde + cantidad)
+    )
+
+def benchmark_escritura(cantidad_libros=100_000, llamadas=5_000):
+    """Comparar inserción fila por fila contra execute_many por lotes"""
+    with tempfile.TemporaryDirectory() as directorio:
+        db_name = os.path.join(directorio, "benchmark.db")
+        manager = DatabaseManager(db_name)
+        poblar_catalogo(db_name, 0)
+
+        print("✏️  INSERT_LIBRO")
+        inicio = time.perf_counter()
+        for fila in _libros_sinteticos(llamadas):
+            manager.execute_command(sql.INSERT_LIBRO, fila)
+        antes = llamadas / (time.perf_counter() - inicio)
+        print(f"   {'execute_command':<28} {antes:12,.0f} filas/s ({llamadas} filas)")
+
+        inicio = time.perf_counter()
+        resultado = manager.execute_many(sql.INSERT_LIBRO, _libros_sinteticos(cantidad_libros, llamadas))
+        despues = resultado['afectadas'] / (time.perf_counter() - inicio)
+        print(f"   {'execute_many':<28} {despues:12,.0f} filas/s ({cantidad_libros} filas)")
+        print(f"   ➡️  {despues / antes:.1f}x más rápido")
+
+        manager.cerrar_conexiones()
+
+def benchmark_cache(cantidad_libros=LIBROS_POR_DEFECTO, llamadas=LLAMADAS_POR_DEFECTO):
+    """Comparar las lecturas de la interfaz con y sin caché de resultados"""
+    with tempfile.TemporaryDirectory() as directorio:
+        db_name = os.path.join(directorio, "benchmark.db")
+        manager = ServicioPrestamos(db_name)
+        print(f"📚 Generando catálogo de {cantidad_libros} libros...")
+        poblar_catalogo(db_name, cantidad_libros)
+
+        # Lecturas típicas de la interfaz: combos, autor y libro por clave
+        # (pocos distintos, como al navegar) y un préstamo cada 20 lecturas
+        rnd = random.Random(42)
+        isbns = [f"978{rnd.randrange(cantidad_libros):010d}" for _ in range(50)]
+        lecturas = [
+            rnd.choice([
+                (sql.SELECT_AUTORES_FOR_COMBO, None),
+                (sql.SELECT_AUTOR_BY_ID, (rnd.randint(1, 1000),)),
+                (sql.SELECT_LIBRO_BY_ISBN, (rnd.choice(isbns),)),
+                (sql.SELECT_LIBROS_PRIMERA_PAGINA, (51,)),
+            ])
+            for _ in range(llamadas)
+        ]
+
+        def recorrer():
+            tiempos = []
+            for numero, (query, params) in enumerate(lecturas, start=1):
+                inicio = time.perf_counter()
+                manager.execute_query(query, params)
+                tiempos.append((time.perf_counter() - inicio) * 1_000_000)
+                if numero % 20 == 0:
+                    manager.prestar_libro(f"978{numero:010d}", "benchmark")
+            return tiempos
+
+        print(f"⏱️  {llamadas} lecturas por caso")
+        manager.cache.activa = False
+        antes = _resumen("sin caché", recorrer())
+        manager.execute_command("DELETE FROM prestamos")
+        manager.cache.activa = True
+        manager.cache.reiniciar_estadisticas()
+        despues = _resumen("con caché", recorrer())
+        estadisticas = manager.cache.estadisticas()
+        print(f"   aciertos {estadisticas['tasa_aciertos']:.0%} "
+              f"({estadisticas['invalidadas']} entradas invalidadas por préstamos)")
+        print(f"   ➡️  {antes / despues:.1f}x más rápido")
+
+        manager.cerrar_conexiones()
+
+CASOS = {
+    "conexiones": benchmark_conexiones,
+    "busqueda": benchmark_busqueda,
+    "escritura": benchmark_escritura,
+    "cache": benchmark_cache,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia por llamada de la capa de base de datos")
+    parser.add_argument("caso", nargs="?", default="conexiones", choices=sorted(CASOS))
+    parser.add_argument("cantidad_libros", nargs="?", type=int, help="libros del catálogo sintético")
+    parser.add_argument("llamadas", nargs="?", type=int, help="llamadas medidas por caso")
+    args = parser.parse_args()
+
+    # Sin cantidades se usan las de cada caso
+    argumentos = [valor for valor in (args.cantidad_libros, args.llamadas) if valor is not None]
+    CASOS[args.caso](*argumentos)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
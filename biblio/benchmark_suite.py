@@ -0,0 +1,428 @@
+# benchmark_suite.py - Suite de rendimiento sobre datos sintéticos, con resultados en JSON
+"""
+Genera (o reutiliza) una base con datos sintéticos (modules/datos_sinteticos.py)
+y mide:
+- cada sentencia de sqlstatement.py, ejecutada directamente sobre una
+  conexión del pool; las que escriben se deshacen después de cada llamada,
+  así que los datos no cambian entre mediciones;
+- las operaciones de los servicios (modules/servicios.py): préstamo,
+  devolución, búsqueda, historial y reportes, con la caché de resultados
+  desactivada.
+
+Cada medición se repite hasta --llamadas veces o hasta consumir --segundos,
+y se guarda media, p50, p95 y máximo en milisegundos. El JSON incluye el
+commit, las versiones de Python y SQLite y el tamaño de los datos, para
+comparar dos corridas con --comparar.
+
+Uso:
+    python benchmark_suite.py [--escala 0.01] [--semilla 42] [--db ruta.db]
+                              [--salida resultados.json] [--llamadas 100] [--segundos 1]
+    python benchmark_suite.py --comparar antes.json despues.json
+
+Con --db se reutiliza la base si ya tiene datos (las operaciones de préstamo
+y devolución le agregan préstamos devueltos); sin --db se genera en un
+directorio temporal.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import modules.sqlstatement as sql
+from modules import datos_sinteticos
+from modules.fechas import formatear
+from modules.servicios import ServicioLibros, ServicioPrestamos
+
+FORMATO_RESULTADOS = 1
+
+# Cambio de la media a partir del cual --comparar marca una medición; las
+# diferencias menores que MINIMO_CAMBIO_MS son ruido aunque superen el umbral
+UMBRAL_CAMBIO = 0.10
+MINIMO_CAMBIO_MS = 0.05
+
+class Muestra:
+    """Valores reales de la base para armar los parámetros de las mediciones"""
+
+    def __init__(self, conn, rnd, cantidad=200):
+        self.rnd = rnd
+        ultimo_libro = conn.execute("SELECT MAX(id) FROM libros").fetchone()[0] or 0
+        ultimo_prestamo = conn.execute("SELECT MAX(id) FROM prestamos").fetchone()[0] or 0
+        ultimo_autor = conn.execute("SELECT MAX(id) FROM autores").fetchone()[0] or 0
+
+        def por_id(consulta, ultimo):
+            filas = (conn.execute(consulta, (rnd.randint(1, ultimo),)).fetchone()
+                     for _ in range(cantidad if ultimo else 0))
+            return [fila for fila in filas if fila is not None]
+
+        self.libros = por_id("SELECT isbn, titulo, estado FROM libros WHERE id >= ? "
+                             "ORDER BY id LIMIT 1", ultimo_libro)
+        self.disponibles = [libro[0] for libro in self.libros if libro[2] == "Disponible"]
+        self.prestados = [libro[0] for libro in self.libros if libro[2] == "Prestado"]
+        self.prestamos = por_id("SELECT id, nombre_usuario, fecha_prestamo FROM prestamos "
+                                "WHERE id >= ? ORDER BY id LIMIT 1", ultimo_prestamo)
+        self.activos = [fila[0] for fila in conn.execute(
+            "SELECT id FROM prestamos WHERE fecha_devolucion IS NULL LIMIT ?", (cantidad,))]
+        self.autores = [rnd.randint(1, ultimo_autor) for _ in range(cantidad)] if ultimo_autor else []
+        self.palabras = sorted({palabra for libro in self.libros for palabra in libro[1].split()})
+        self.dia_max = conn.execute("SELECT MAX(fecha_prestamo) FROM prestamos").fetchone()[0] or 0
+
+    def elegir(self, valores, vacio=None):
+        return self.rnd.choice(valores) if valores else vacio
+
+    def isbn(self):
+        return self.elegir(self.libros, ("",))[0]
+
+    def disponible(self):
+        return self.elegir(self.disponibles, "")
+
+    def prestado(self):
+        return self.elegir(self.prestados, "")
+
+    def prestamo(self):
+        return self.elegir(self.prestamos, (0, "", 0))
+
+    def activo(self):
+        return self.elegir(self.activos, 0)
+
+    def autor(self):
+        return self.elegir(self.autores, 0)
+
+    def palabra(self):
+        return self.elegir(self.palabras, "")
+
+    def dia(self):
+        """Día de préstamo de un préstamo al azar"""
+        return self.prestamo()[2]
+
+    def mes(self):
+        return formatear(self.dia())[:7]
+
+# Parámetros de cada sentencia de sqlstatement.py que lleva parámetros
+PARAMETROS_SENTENCIAS = {
+    "INSERT_SCHEMA_VERSION": lambda m: (10 ** 6, "benchmark"),
+    "INSERT_AUTOR": lambda m: ("Nombre", "Apellido", "Argentina", "1950-01-01"),
+    "CHECK_AUTOR_HAS_BOOKS": lambda m: (m.autor(),),
+    "CHECK_LIBRO_HAS_ACTIVE_LOANS": lambda m: (m.isbn(),),
+    "SELECT_LIBROS_PRIMERA_PAGINA": lambda m: (51,),
+    "SELECT_LIBROS_PAGINA_SIGUIENTE": lambda m: (*m.elegir(m.libros, ("", ""))[1::-1], 51),
+    "SELECT_LIBROS_PAGINA_ANTERIOR": lambda m: (*m.elegir(m.libros, ("", ""))[1::-1], 51),
+    "UPDATE_LIBRO_ESTADO": lambda m: ("Disponible", m.disponible()),
+    "UPDATE_PRESTAMO_DEVOLUCION": lambda m: (m.dia_max, m.prestamo()[0]),
+    "SELECT_HISTORIAL_PRIMERA_PAGINA": lambda m: (51,),
+    "SELECT_HISTORIAL_PAGINA_SIGUIENTE": lambda m: (*m.prestamo()[2::-2], 51),
+    "SELECT_HISTORIAL_PAGINA_ANTERIOR": lambda m: (*m.prestamo()[2::-2], 51),
+    "SELECT_PRESTAMOS_ENTRE_FECHAS": lambda m: (m.dia_max - 30, m.dia_max),
+    "COUNT_PRESTAMOS_ENTRE_FECHAS": lambda m: (m.dia_max - 365, m.dia_max),
+    "SEARCH_PRESTAMOS_BY_USER": lambda m: (f"%{m.prestamo()[1][-4:]}%",),
+    "SEARCH_PRESTAMOS_BY_TITLE": lambda m: (f"%{m.palabra()}%",),
+    "SELECT_AUTOR_BY_ID": lambda m: (m.autor(),),
+    "UPDATE_AUTOR": lambda m: ("Nombre", "Apellido", "Argentina", "1950-01-01", m.autor()),
+    "DELETE_AUTOR": lambda m: (m.autor(),),
+    "INSERT_LIBRO": lambda m: ("9799999999999", "Titulo", m.autor(), 2000, "Editorial", "Genero",
+                               "Disponible"),
+    "UPSERT_LIBRO": lambda m: (m.isbn(), "Titulo", m.autor(), 2000, "Editorial", "Genero"),
+    "SELECT_LIBRO_BY_ISBN": lambda m: (m.isbn(),),
+    "UPDATE_LIBRO": lambda m: ("Titulo", m.autor(), 2000, "Editorial", "Genero", "Disponible",
+                               m.disponible()),
+    "UPDATE_LIBRO_INFO": lambda m: ("Titulo", m.autor(), 2000, "Editorial", "Genero", m.isbn()),
+    "DELETE_LIBRO": lambda m: (m.disponible(),),
+    "SEARCH_LIBROS_BY_TITLE": lambda m: (f"%{m.palabra()}%",),
+    "SEARCH_LIBROS_BY_GENRE": lambda m: ("%Genero 1%",),
+    "SEARCH_LIBROS_FTS": lambda m: (f'"{m.palabra()}"', 51),
+    "SEARCH_LIBROS_FTS_SIGUIENTE": lambda m: (f'"{m.palabra()}"', float("-inf"), 0, 51),
+    "SEARCH_LIBROS_FTS_ANTERIOR": lambda m: (f'"{m.palabra()}"', float("inf"), 0, 51),
+    "SEARCH_LIBROS_FTS_ULTIMA": lambda m: (f'"{m.palabra()}"', 51),
+    "SEARCH_LIBROS_FTS_PREFIX": lambda m: (f'"{m.palabra()[:3]}"*', 51),
+    "SEARCH_LIBROS_FTS_PREFIX_SIGUIENTE": lambda m: (f'"{m.palabra()[:3]}"*', 0, 51),
+    "SEARCH_LIBROS_FTS_PREFIX_ANTERIOR": lambda m: (f'"{m.palabra()[:3]}"*', 2 ** 62, 51),
+    "SEARCH_LIBROS_FTS_PREFIX_ULTIMA": lambda m: (f'"{m.palabra()[:3]}"*', 51),
+    "INSERT_PRESTAMO": lambda m: (m.disponible(), "benchmark", m.dia_max, m.dia_max + 15),
+    "INSERT_PRESTAMO_DEVUELTO": lambda m: (m.isbn(), "benchmark", m.dia_max, m.dia_max + 15,
+                                           m.dia_max + 3, "Devuelto"),
+    "SELECT_PRESTAMO_BY_ID": lambda m: (m.prestamo()[0],),
+    "UPDATE_PRESTAMO_DEVUELTO": lambda m: (m.dia_max, m.activo()),
+    "CHECK_LIBRO_DISPONIBLE": lambda m: (m.isbn(),),
+    "INSERT_PRESTAMO_SI_DISPONIBLE": lambda m: ("benchmark", m.dia_max, m.dia_max + 15, m.disponible()),
+    "UPDATE_PRESTAMO_DEVOLVER_SI_ACTIVO": lambda m: (m.dia_max, m.activo()),
+    "SELECT_LIBRO_ESTADO": lambda m: (m.isbn(),),
+    "SELECT_LIBRO_EXISTE_ISBN": lambda m: (m.isbn(),),
+    "UPDATE_LIBRO_PRESTADO": lambda m: (m.prestado(),),
+    "UPDATE_LIBRO_DISPONIBLE": lambda m: (m.disponible(),),
+    "SELECT_LIBROS_MAS_PRESTADOS": lambda m: (10,),
+    "SELECT_LIBROS_MAS_PRESTADOS_PERIODO": lambda m: (m.mes(), m.mes(), 10),
+    "SELECT_HISTORIAL_USUARIO": lambda m: (m.prestamo()[1],),
+    "SELECT_PRESTAMOS_VENCIDOS": lambda m: (m.dia_max, m.dia_max),
+    "SELECT_PRESTAMOS_POR_VENCER_LOTE": lambda m: (m.dia_max + 2, *m.elegir(
+        [(m.dia_max - d, 0) for d in range(30)], (0, 0)), 1000),
+    "INSERT_LOTE_IMPORTACION": lambda m: ("9780000000002", "Benchmark", None, 2024, None, None),
+}
+
+# Sentencias que se ejecutan (sin medir) antes de la medida, en la misma transacción
+PREVIAS_SENTENCIAS = {
+    "INSERT_CONTADORES_DESDE_TABLAS": ["DELETE_CONTADORES"],
+    "INSERT_PRESTAMOS_POR_LIBRO_DESDE_PRESTAMOS": ["DELETE_PRESTAMOS_POR_LIBRO"],
+    "INSERT_PRESTAMOS_POR_LIBRO_MES_DESDE_PRESTAMOS": ["DELETE_PRESTAMOS_POR_LIBRO_MES"],
+    "INSERT_LIBROS_FTS_FROM_LIBROS": ["DELETE_LIBROS_FTS"],
+    "DELETE_LOTE_IMPORTACION": ["CREATE_LOTE_IMPORTACION"],
+    "INSERT_LOTE_IMPORTACION": ["CREATE_LOTE_IMPORTACION"],
+    "DELETE_LIBROS_FTS_LOTE": ["CREATE_LOTE_IMPORTACION"],
+    "UPSERT_LIBROS_LOTE": ["CREATE_LOTE_IMPORTACION"],
+    "INSERT_LIBROS_FTS_LOTE": ["CREATE_LOTE_IMPORTACION"],
+}
+
+def sentencias():
+    """Nombres de todas las sentencias de sqlstatement.py"""
+    return sorted(nombre for nombre, valor in vars(sql).items()
+                  if nombre.isupper() and isinstance(valor, str))
+
+def _estadisticas(tiempos, filas=None):
+    """Resumen en milisegundos de una lista de latencias en segundos"""
+    ordenados = sorted(t * 1000 for t in tiempos)
+    resumen = {
+        'llamadas': len(ordenados),
+        'media_ms': round(statistics.mean(ordenados), 4),
+        'p50_ms': round(statistics.median(ordenados), 4),
+        'p95_ms': round(ordenados[max(0, int(len(ordenados) * 0.95) - 1)], 4),
+        'max_ms': round(ordenados[-1], 4),
+    }
+    if filas is not None:
+        resumen['filas'] = filas
+    return resumen
+
+def _repetir(funcion, llamadas, segundos):
+    """Llamar a ``funcion()`` hasta ``llamadas`` veces o ``segundos`` de medición (al menos una)"""
+    tiempos = []
+    while len(tiempos) < llamadas and (not tiempos or sum(tiempos) < segundos):
+        tiempos.append(funcion())
+    return tiempos
+
+def medir_sentencias(manager, muestra, llamadas, segundos, on_progreso=None):
+    """Medir cada sentencia de sqlstatement.py; retorna (resultados, sin_medir)"""
+    resultados = {}
+    sin_medir = []
+    with manager.pool.conexion() as conn:
+        for nombre in sentencias():
+            sentencia = getattr(sql, nombre)
+            parametros = PARAMETROS_SENTENCIAS.get(nombre)
+            if parametros is None and "?" in sentencia:
+                sin_medir.append(nombre)
+                continue
+            if on_progreso:
+                on_progreso(nombre)
+            filas = []
+
+            def una_llamada():
+                params = parametros(muestra) if parametros else ()
+                conn.execute("BEGIN")
+                try:
+                    for previa in PREVIAS_SENTENCIAS.get(nombre, []):
+                        conn.execute(getattr(sql, previa))
+                    inicio = time.perf_counter()
+                    cursor = conn.execute(sentencia, params)
+                    leidas = 0
+                    while lote := cursor.fetchmany(1000):
+                        leidas += len(lote)
+                    transcurrido = time.perf_counter() - inicio
+                    filas.append(leidas if cursor.description else max(cursor.rowcount, 0))
+                    return transcurrido
+                finally:
+                    conn.rollback()
+
+            try:
+                tiempos = _repetir(una_llamada, llamadas, segundos)
+            except sqlite3.Error as e:
+                resultados[nombre] = {'error': str(e)}
+                continue
+            resultados[nombre] = _estadisticas(tiempos, round(statistics.mean(filas), 1))
+    return resultados, sin_medir
+
+def medir_operaciones(manager, libros, muestra, llamadas, segundos, on_progreso=None):
+    """Medir las operaciones de los servicios que usa la interfaz"""
+    disponibles = list(muestra.disponibles)
+    prestados = []
+
+    def cronometrar(funcion, *args):
+        inicio = time.perf_counter()
+        resultado = funcion(*args)
+        return time.perf_counter() - inicio, resultado
+
+    def prestar():
+        # Cada préstamo usa un libro disponible distinto; el id se guarda para devolverlo
+        transcurrido, prestamo_id = cronometrar(manager.prestar_libro, disponibles.pop(), "benchmark")
+        if prestamo_id is not None:
+            prestados.append(prestamo_id)
+        return transcurrido
+
+    def devolver():
+        return cronometrar(manager.devolver_prestamo, prestados.pop())[0]
+
+    operaciones = {
+        "prestar_libro": (prestar, lambda: len(disponibles)),
+        "devolver_prestamo": (devolver, lambda: len(prestados)),
+        "buscar_libros": (lambda: cronometrar(libros.buscar_libros, muestra.palabra())[0], None),
+        "buscar_libros_prefijo": (lambda: cronometrar(libros.buscar_libros, muestra.palabra()[:3])[0], None),
+        "pagina_libros": (lambda: cronometrar(libros.obtener_pagina_libros,
+                                              muestra.elegir(muestra.libros, ("", ""))[1::-1])[0], None),
+        "pagina_historial": (lambda: cronometrar(manager.obtener_pagina_historial,
+                                                 muestra.prestamo()[2::-2])[0], None),
+        "historial_usuario": (lambda: cronometrar(manager.historial_usuario, muestra.prestamo()[1])[0], None),
+        "prestamos_vencidos": (lambda: cronometrar(manager.obtener_prestamos_vencidos, muestra.dia_max)[0], None),
+        "lotes_recordatorio": (lambda: cronometrar(
+            lambda: sum(len(lote) for lote in manager.lotes_recordatorio(2, muestra.dia_max)))[0], None),
+        "prestamos_del_mes": (lambda: cronometrar(manager.obtener_prestamos_entre,
+                                                  muestra.dia_max - 30, muestra.dia_max)[0], None),
+        "reporte_mas_prestados": (lambda: cronometrar(manager.obtener_libros_mas_prestados, 10)[0], None),
+        "reporte_mas_prestados_mes": (lambda: cronometrar(manager.obtener_libros_mas_prestados, 10,
+                                                          muestra.mes(), muestra.mes())[0], None),
+        "reporte_contadores": (lambda: cronometrar(manager.obtener_contadores)[0], None),
+    }
+
+    resultados = {}
+    for nombre, (operacion, disponibles_para) in operaciones.items():
+        if on_progreso:
+            on_progreso(nombre)
+        tope = llamadas if disponibles_para is None else min(llamadas, disponibles_para())
+        if tope == 0:
+            resultados[nombre] = {'error': "sin datos para medir"}
+            continue
+        resultados[nombre] = _estadisticas(_repetir(operacion, tope, segundos))
+    return resultados
+
+def _commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))
+                              ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def ejecutar(db_name, escala, semilla, llamadas, segundos):
+    """Generar los datos si hace falta, medir y retornar el diccionario de resultados"""
+    def progreso(etapa):
+        print(f"   ... {etapa:<60}", end="\r")
+
+    manager = ServicioPrestamos(db_name)
+    libros = ServicioLibros(db_name)
+    datos = None
+    if not manager.obtener_contadores().get('libros', 0):
+        print(f"📚 Generando datos sintéticos (escala {escala})...")
+        datos = datos_sinteticos.generar(db_name, escala, semilla, on_progreso=progreso)
+        print(f"✅ {datos['autores']:,} autores, {datos['libros']:,} libros y "
+              f"{datos['prestamos']:,} préstamos en {datos['segundos']:.1f} s")
+
+    # Se mide la base, no la caché de resultados
+    # (la caché es una sola por archivo, compartida por los dos servicios)
+    manager.cache.activa = False
+    # Otra semilla que la de los datos: con la misma, la muestra elegiría
+    # justo los libros que el generador dejó prestados
+    rnd = random.Random(semilla + 1)
+    with manager.pool.conexion() as conn:
+        muestra = Muestra(conn, rnd)
+
+    print(f"⏱️  Sentencias de sqlstatement.py (hasta {llamadas} llamadas o {segundos} s cada una)")
+    sentencias_medidas, sin_medir = medir_sentencias(manager, muestra, llamadas, segundos, progreso)
+    print("⏱️  Operaciones de los servicios")
+    operaciones = medir_operaciones(manager, libros, muestra, llamadas, segundos, progreso)
+    contadores = manager.obtener_contadores()
+    manager.cerrar_conexiones()
+
+    return {
+        'formato': FORMATO_RESULTADOS,
+        'fecha': datetime.now().isoformat(timespec="seconds"),
+        'commit': _commit_actual(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'datos': {
+            'escala': escala if datos else None,
+            'semilla': semilla,
+            'autores': contadores.get('autores', 0),
+            'libros': contadores.get('libros', 0),
+            'prestamos': contadores.get('prestamos', 0),
+            'generacion_s': round(datos['segundos'], 2) if datos else None,
+        },
+        'sentencias': sentencias_medidas,
+        'operaciones': operaciones,
+        'sin_medir': sin_medir,
+    }
+
+def _imprimir(resultados):
+    for seccion in ("sentencias", "operaciones"):
+        print(f"📊 {seccion}")
+        for nombre, medicion in resultados[seccion].items():
+            if 'error' in medicion:
+                print(f"   ❌ {nombre:<48} {medicion['error']}")
+            else:
+                print(f"   {nombre:<50} media {medicion['media_ms']:10.3f} ms | "
+                      f"p95 {medicion['p95_ms']:10.3f} ms | {medicion['llamadas']:4d} llamadas")
+    for nombre in resultados['sin_medir']:
+        print(f"   ⚠️ {nombre}: sin parámetros en PARAMETROS_SENTENCIAS")
+
+def comparar(archivo_antes, archivo_despues):
+    """Imprimir el cambio de la media de cada medición entre dos archivos de resultados.
+
+    Retorna la cantidad de mediciones que empeoraron más que UMBRAL_CAMBIO
+    (y más que MINIMO_CAMBIO_MS).
+    """
+    with open(archivo_antes, encoding="utf-8") as f:
+        antes = json.load(f)
+    with open(archivo_despues, encoding="utf-8") as f:
+        despues = json.load(f)
+
+    print(f"📊 {antes.get('commit')} ({antes['datos']['prestamos']:,} préstamos) -> "
+          f"{despues.get('commit')} ({despues['datos']['prestamos']:,} préstamos)")
+    peores = 0
+    for seccion in ("sentencias", "operaciones"):
+        print(f"📊 {seccion}")
+        for nombre in sorted(set(antes[seccion]) | set(despues[seccion])):
+            previa = antes[seccion].get(nombre, {}).get('media_ms')
+            actual = despues[seccion].get(nombre, {}).get('media_ms')
+            if previa is None or actual is None:
+                print(f"   {nombre:<50} {'-' if previa is None else f'{previa:.3f} ms'} -> "
+                      f"{'-' if actual is None else f'{actual:.3f} ms'}")
+                continue
+            cambio = (actual - previa) / previa if previa else 0.0
+            if abs(actual - previa) < MINIMO_CAMBIO_MS:
+                marca = "  "
+            else:
+                marca = "🔴" if cambio > UMBRAL_CAMBIO else "🟢" if cambio < -UMBRAL_CAMBIO else "  "
+            peores += marca == "🔴"
+            print(f"{marca} {nombre:<50} {previa:10.3f} -> {actual:10.3f} ms ({cambio:+.0%})")
+    return peores
+
+def main():
+    parser = argparse.ArgumentParser(description="Suite de rendimiento sobre datos sintéticos")
+    parser.add_argument("--escala", type=float, default=datos_sinteticos.ESCALA_POR_DEFECTO,
+                        help="1 = 1.000.000 de libros y 10.000.000 de préstamos")
+    parser.add_argument("--semilla", type=int, default=datos_sinteticos.SEMILLA_POR_DEFECTO)
+    parser.add_argument("--db", help="base a reutilizar (se genera si está vacía)")
+    parser.add_argument("--salida", default="resultados_benchmark.json")
+    parser.add_argument("--llamadas", type=int, default=100, help="máximo de llamadas por medición")
+    parser.add_argument("--segundos", type=float, default=1.0, help="tiempo máximo por medición")
+    parser.add_argument("--comparar", nargs=2, metavar=("ANTES", "DESPUES"),
+                        help="comparar dos archivos de resultados en lugar de medir")
+    args = parser.parse_args()
+
+    if args.comparar:
+        return 1 if comparar(*args.comparar) else 0
+
+    with tempfile.TemporaryDirectory() as directorio:
+        db_name = args.db or os.path.join(directorio, "benchmark.db")
+        resultados = ejecutar(db_name, args.escala, args.semilla, args.llamadas, args.segundos)
+
+    _imprimir(resultados)
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(resultados, f, ensure_ascii=False, indent=2)
+    print(f"💾 Resultados guardados en {args.salida}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,20 +1,19 @@
 # datos_prueba.py - Script para poblar la base de datos con datos de prueba
 
-import sqlite3
+import sys
 from datetime import datetime, date
 import modules.sqlstatement as sql
+from modules.database_manager import DatabaseManager
+from modules.servicios import calcular_vencimiento
+from modules.fechas import a_dia
+from modules.isbn import normalizar_isbn
 
 def crear_datos_prueba():
-    """Crear datos de prueba para el sistema de biblioteca"""
+    """Crear datos de prueba para el sistema de biblioteca; retorna False si alguna fila falló"""
     
     try:
-        conn = sqlite3.connect("biblioteca.db")
-        cursor = conn.cursor()
-        
-        # Crear tablas si no existen
-        cursor.execute(sql.CREATE_TABLE_AUTORES)
-        cursor.execute(sql.CREATE_TABLE_LIBROS)
-        cursor.execute(sql.CREATE_TABLE_PRESTAMOS)
+        # Crear o migrar el esquema si hace falta
+        db = DatabaseManager("biblioteca.db", perfil="carga_masiva")
         
         # Datos de autores de prueba
         autores_prueba = [
@@ -31,11 +30,7 @@ def crear_datos_prueba():
         ]
         
         # Insertar autores
-        for autor in autores_prueba:
-            try:
-                cursor.execute(sql.INSERT_AUTOR, autor)
-            except sqlite3.IntegrityError:
-                pass  # El autor ya existe
+        autores = db.execute_many(sql.INSERT_AUTOR, autores_prueba)
         
         # Datos de libros de prueba
         libros_prueba = [
@@ -56,12 +51,9 @@ def crear_datos_prueba():
             ("978-84-204-2964-5", "La tía Julia y el escribidor", 3, 1977, "Seix Barral", "Novela", "Disponible")
         ]
         
-        # Insertar libros
-        for libro in libros_prueba:
-            try:
-                cursor.execute(sql.INSERT_LIBRO, libro)
-            except sqlite3.IntegrityError:
-                pass  # El libro ya existe
+        # Insertar libros con el ISBN normalizado (los que ya existen se informan
+        # como errores y se omiten)
+        libros = db.execute_many(sql.INSERT_LIBRO, [(normalizar_isbn(l[0]), *l[1:]) for l in libros_prueba])
         
         # Datos de préstamos de prueba (algunos activos, algunos devueltos)
         prestamos_prueba = [
@@ -72,31 +64,33 @@ def crear_datos_prueba():
             ("978-84-204-8229-2", "Luis Rodríguez", "2024-09-08", None, "Activo")
         ]
         
-        # Insertar préstamos
-        for prestamo in prestamos_prueba:
-            try:
-                if prestamo[3]:  # Si tiene fecha de devolución
-                    cursor.execute("""
-                        INSERT INTO prestamos (isbn, nombre_usuario, fecha_prestamo, fecha_devolucion, estado)
-                        VALUES (?, ?, ?, ?, ?)
-                    """, prestamo)
-                else:  # Préstamo activo
-                    cursor.execute(sql.INSERT_PRESTAMO, (prestamo[0], prestamo[1], prestamo[2]))
-                    # Actualizar estado del libro a prestado
-                    cursor.execute(sql.UPDATE_LIBRO_PRESTADO, (prestamo[0],))
-            except sqlite3.IntegrityError:
-                pass  # El préstamo ya existe
+        # Insertar préstamos devueltos
+        devueltos = db.execute_many(sql.INSERT_PRESTAMO_DEVUELTO,
+                                    [(normalizar_isbn(p[0]), p[1], a_dia(p[2]), calcular_vencimiento(p[2]),
+                                      a_dia(p[3]), p[4])
+                                     for p in prestamos_prueba if p[3]])
+        
+        # Insertar préstamos activos (los triggers marcan sus libros como prestados)
+        activos = [p for p in prestamos_prueba if not p[3]]
+        prestados = db.execute_many(sql.INSERT_PRESTAMO,
+                                    [(normalizar_isbn(p[0]), p[1], a_dia(p[2]), calcular_vencimiento(p[2]))
+                                     for p in activos])
         
-        conn.commit()
-        conn.close()
-        print("✅ Datos de prueba creados exitosamente")
+        db.cerrar_conexiones()
+        errores = autores['errores'] + libros['errores'] + devueltos['errores'] + prestados['errores']
+        print("✅ Datos de prueba creados" if not errores else "⚠️ Datos de prueba creados con errores")
         print("📚 Se agregaron:")
-        print(f"   - {len(autores_prueba)} autores")
-        print(f"   - {len(libros_prueba)} libros")
-        print(f"   - {len(prestamos_prueba)} préstamos")
+        print(f"   - {autores['afectadas']} de {autores['procesadas']} autores")
+        print(f"   - {libros['afectadas']} de {libros['procesadas']} libros")
+        print(f"   - {devueltos['afectadas'] + prestados['afectadas']} de {len(prestamos_prueba)} préstamos")
+        if errores:
+            print(f"❌ {len(errores)} filas fallaron; la primera: {errores[0][2]}")
+            return False
+        return True
         
     except Exception as e:
         print(f"❌ Error al crear datos de prueba: {e}")
+        return False
 
 if __name__ == "__main__":
-    crear_datos_prueba()
+    sys.exit(0 if crear_datos_prueba() else 1)
@@ -0,0 +1,191 @@
+# estres_escrituras.py - Préstamos simultáneos desde varios procesos sobre una base
+"""
+Uso:
+    python estres_escrituras.py [--procesos 8] [--segundos 10] [--libros-por-proceso 200]
+                                [--perfil rendimiento] [--busy-timeout MS]
+                                [--reintentos N] [--db archivo.db] [--salida resultado.json]
+
+Cada proceso es un mostrador que, durante --segundos, presta un libro de su
+propia parte del catálogo y lo devuelve, una y otra vez. Todos escriben el
+mismo archivo, así que compiten por el bloqueo de escritura de SQLite.
+
+Al final se informa el ritmo sostenido de préstamos por segundo, la
+latencia de cada préstamo, los bloqueos y reintentos (ver
+modules/bloqueos.py) y los errores. Después se cuentan los préstamos de la
+base: tiene que haber exactamente uno por cada préstamo informado como
+hecho, es decir, ninguno perdido.
+
+Sin --db se usa una base temporal nueva. Con --busy-timeout 0 SQLite no
+espera el bloqueo y todo el trabajo queda en manos de los reintentos.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from modules import bloqueos, db_config
+from modules.datos_sinteticos import generar, isbn_sintetico
+from modules.servicios import ServicioPrestamos
+
+def _mostrador(numero, db_name, isbns, comienzo, segundos, opciones, resultados):
+    """Prestar y devolver libros hasta que se acabe el tiempo (corre en otro proceso)"""
+    if opciones['busy_timeout'] is not None:
+        db_config.BUSY_TIMEOUT_MS = opciones['busy_timeout']
+    if opciones['reintentos'] is not None:
+        db_config.REINTENTOS_BLOQUEO = opciones['reintentos']
+    servicio = ServicioPrestamos(db_name, perfil=opciones['perfil'])
+    usuario = f"Mostrador {numero}"
+    latencias = []
+    errores = []
+    rechazados = 0
+
+    # Todos los procesos empiezan a la vez
+    time.sleep(max(0.0, comienzo - time.time()))
+    fin = time.time() + segundos
+    i = 0
+    while time.time() < fin:
+        isbn = isbns[i % len(isbns)]
+        i += 1
+        inicio = time.perf_counter()
+        try:
+            prestamo_id = servicio.prestar_libro(isbn, usuario)
+        except Exception as e:
+            errores.append(f"prestar {isbn}: {e}")
+            continue
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        if prestamo_id is None:
+            rechazados += 1
+            continue
+        try:
+            servicio.devolver_prestamo(prestamo_id)
+        except Exception as e:
+            errores.append(f"devolver {prestamo_id}: {e}")
+
+    servicio.cerrar_conexiones()
+    resultados.put({
+        'mostrador': numero,
+        'prestamos': len(latencias) - rechazados,
+        'rechazados': rechazados,
+        'latencias_ms': latencias,
+        'errores': errores,
+        'bloqueos': bloqueos.resumen(),
+    })
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+def ejecutar(db_name, procesos, segundos, libros_por_proceso, perfil, busy_timeout, reintentos):
+    """Correr los mostradores y retornar el resumen de la prueba"""
+    servicio = ServicioPrestamos(db_name, perfil=perfil)
+    # Los contadores los cambian otros procesos: sin caché se leen de la base
+    servicio.cache.activa = False
+    if not servicio.obtener_contadores().get('libros', 0):
+        print(f"⚙️ Generando {procesos * libros_por_proceso:,} libros en {db_name}...")
+        generar(db_name, autores=max(1, procesos * libros_por_proceso // 100),
+                libros=procesos * libros_por_proceso, prestamos=0)
+    # El journal_mode del perfil se fija aquí, con una sola conexión abierta:
+    # cambiarlo con los mostradores conectados falla con "database is locked"
+    servicio.cerrar_conexiones()
+    antes = servicio.obtener_contadores().get('prestamos', 0)
+
+    # spawn: cada proceso abre sus propias conexiones (no hereda las del padre)
+    contexto = multiprocessing.get_context("spawn")
+    resultados = contexto.Queue()
+    opciones = {'perfil': perfil, 'busy_timeout': busy_timeout, 'reintentos': reintentos}
+    comienzo = time.time() + 2.0
+    hijos = [
+        contexto.Process(target=_mostrador, args=(
+            n, db_name, [isbn_sintetico(n * libros_por_proceso + k) for k in range(libros_por_proceso)],
+            comienzo, segundos, opciones, resultados))
+        for n in range(procesos)
+    ]
+    for hijo in hijos:
+        hijo.start()
+    print(f"🏁 {procesos} mostradores durante {segundos} s (perfil {perfil})...")
+    por_mostrador = [resultados.get() for _ in hijos]
+    for hijo in hijos:
+        hijo.join()
+
+    latencias = [ms for r in por_mostrador for ms in r['latencias_ms']]
+    prestamos = sum(r['prestamos'] for r in por_mostrador)
+    despues = servicio.obtener_contadores().get('prestamos', 0)
+    servicio.cerrar_conexiones()
+    return {
+        'procesos': procesos,
+        'segundos': segundos,
+        'perfil': perfil,
+        'busy_timeout_ms': busy_timeout,
+        'reintentos': db_config.REINTENTOS_BLOQUEO if reintentos is None else reintentos,
+        'prestamos': prestamos,
+        'prestamos_por_segundo': prestamos / segundos,
+        'por_mostrador': sorted(r['prestamos'] for r in por_mostrador),
+        'latencia_media_ms': statistics.fmean(latencias) if latencias else 0.0,
+        'latencia_p50_ms': _percentil(latencias, 50),
+        'latencia_p95_ms': _percentil(latencias, 95),
+        'latencia_p99_ms': _percentil(latencias, 99),
+        'latencia_max_ms': max(latencias, default=0.0),
+        'rechazados': sum(r['rechazados'] for r in por_mostrador),
+        'errores': [e for r in por_mostrador for e in r['errores']],
+        'bloqueos': {
+            clave: sum(r['bloqueos'][clave] for r in por_mostrador)
+            for clave in ('esperas', 'espera_total_ms', 'bloqueos', 'reintentos', 'pausa_total_ms', 'agotados')
+        },
+        'espera_max_ms': max(r['bloqueos']['espera_max_ms'] for r in por_mostrador),
+        'prestamos_en_base': despues - antes,
+    }
+
+def _imprimir(resultado):
+    bloqueo = resultado['bloqueos']
+    print(f"📈 {resultado['prestamos']:,} préstamos en {resultado['segundos']} s: "
+          f"{resultado['prestamos_por_segundo']:,.0f} préstamos/s "
+          f"(por mostrador: {min(resultado['por_mostrador']):,} a {max(resultado['por_mostrador']):,})")
+    print(f"⏱️ Latencia del préstamo: media {resultado['latencia_media_ms']:.2f} ms | "
+          f"p50 {resultado['latencia_p50_ms']:.2f} | p95 {resultado['latencia_p95_ms']:.2f} | "
+          f"p99 {resultado['latencia_p99_ms']:.2f} | máx {resultado['latencia_max_ms']:.2f} ms")
+    espera_media = bloqueo['espera_total_ms'] / bloqueo['esperas'] if bloqueo['esperas'] else 0.0
+    print(f"🔒 Espera del bloqueo de escritura: media {espera_media:.2f} ms, máx {resultado['espera_max_ms']:.2f} ms")
+    print(f"🔁 {bloqueo['bloqueos']:,} bloqueos, {bloqueo['reintentos']:,} reintentos "
+          f"({bloqueo['pausa_total_ms']:,.0f} ms en pausa), {bloqueo['agotados']:,} sin resolver")
+    if resultado['errores']:
+        print(f"⚠️ {len(resultado['errores']):,} errores; el primero: {resultado['errores'][0]}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Préstamos simultáneos desde varios procesos")
+    parser.add_argument("--procesos", type=int, default=8)
+    parser.add_argument("--segundos", type=float, default=10)
+    parser.add_argument("--libros-por-proceso", type=int, default=200)
+    parser.add_argument("--perfil", default=db_config.PERFIL_POR_DEFECTO, choices=list(db_config.PERFILES_PRAGMA))
+    parser.add_argument("--busy-timeout", type=int, help="busy_timeout en milisegundos (por defecto, el del perfil)")
+    parser.add_argument("--reintentos", type=int, help=f"reintentos ante un bloqueo (por defecto {db_config.REINTENTOS_BLOQUEO})")
+    parser.add_argument("--db", help="base a usar (por defecto una temporal nueva)")
+    parser.add_argument("--salida", help="archivo JSON para guardar el resultado")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="biblio_estres_") as directorio:
+        db_name = args.db or os.path.join(directorio, "estres.db")
+        resultado = ejecutar(db_name, args.procesos, args.segundos, args.libros_por_proceso,
+                             args.perfil, args.busy_timeout, args.reintentos)
+
+    _imprimir(resultado)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+        print(f"💾 Resultado guardado en {args.salida}")
+
+    perdidos = resultado['prestamos'] - resultado['prestamos_en_base']
+    if perdidos:
+        print(f"❌ {perdidos:,} préstamos informados que no están en la base")
+        return 1
+    print(f"✅ Los {resultado['prestamos_en_base']:,} préstamos están en la base: ninguno perdido")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
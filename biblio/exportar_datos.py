@@ -0,0 +1,51 @@
+# exportar_datos.py - Exportar catálogo, autores e historial de préstamos a CSV o JSONL
+"""
+Uso:
+    python exportar_datos.py [--db biblioteca.db] [--dir exportacion]
+                             [--formato csv|jsonl] [CONSULTA ...]
+    python exportar_datos.py --listar
+
+Sin consultas exporta SELECT_ALL_AUTORES, SELECT_ALL_LIBROS y
+SELECT_ALL_PRESTAMOS. Puede ejecutarse con la aplicación abierta: la lectura
+se hace desde una instantánea y no bloquea las escrituras.
+"""
+
+import argparse
+import sys
+import time
+
+from modules.database_manager import DatabaseManager
+from modules.exportador import exportar, consultas_exportables, FORMATOS
+
+def main():
+    parser = argparse.ArgumentParser(description="Exportar consultas de sqlstatement.py")
+    parser.add_argument("consultas", nargs="*", help="nombres SELECT_* de sqlstatement.py")
+    parser.add_argument("--db", default="biblioteca.db")
+    parser.add_argument("--dir", default="exportacion")
+    parser.add_argument("--formato", choices=FORMATOS, default="csv")
+    parser.add_argument("--lote", type=int, help="filas leídas por fetchmany")
+    parser.add_argument("--listar", action="store_true", help="mostrar las consultas exportables")
+    args = parser.parse_args()
+
+    if args.listar:
+        for nombre in consultas_exportables():
+            print(nombre)
+        return 0
+
+    db = DatabaseManager(args.db)
+    inicio = time.perf_counter()
+    try:
+        resultado = exportar(db, args.dir, args.consultas, args.formato, args.lote)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        db.cerrar_conexiones()
+
+    for nombre, (ruta, filas) in resultado.items():
+        print(f"📤 {nombre}: {filas:,} filas -> {ruta}")
+    print(f"✅ Exportación terminada en {time.perf_counter() - inicio:.1f} s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
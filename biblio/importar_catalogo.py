@@ -0,0 +1,49 @@
+# importar_catalogo.py - Importar un catálogo de editorial (CSV o JSONL) a la biblioteca
+"""
+Uso:
+    python importar_catalogo.py archivo.csv [--db biblioteca.db] [--lote N]
+                                [--masivo] [--rechazos rechazos.csv]
+
+El índice de búsqueda se actualiza una vez por lote, así que la aplicación
+puede seguir abierta. --masivo lo suspende durante la carga y lo reconstruye
+al final, sin fsync; es algo más rápido, pero solo con la aplicación cerrada.
+"""
+
+import argparse
+import sys
+
+from modules.importador import ImportadorCatalogo
+
+def main():
+    parser = argparse.ArgumentParser(description="Importar un catálogo CSV/JSONL")
+    parser.add_argument("archivo")
+    parser.add_argument("--db", default="biblioteca.db")
+    parser.add_argument("--formato", choices=["csv", "jsonl"])
+    parser.add_argument("--lote", type=int, help="filas por transacción")
+    parser.add_argument("--masivo", action="store_true",
+                        help="reconstruir el índice de búsqueda al final en lugar de por lote")
+    parser.add_argument("--rechazos", help="archivo CSV para las filas rechazadas")
+    args = parser.parse_args()
+
+    importador = ImportadorCatalogo(args.db, tamaño_lote=args.lote, masivo=args.masivo)
+
+    def progreso(resultado):
+        print(f"   ... {resultado['leidas']:,} filas leídas", end="\r")
+
+    print(f"📥 Importando {args.archivo}...")
+    resultado = importador.importar(args.archivo, args.formato, args.rechazos, on_progreso=progreso)
+
+    print(f"✅ {resultado['importadas']:,} libros importados de {resultado['leidas']:,} filas "
+          f"en {resultado['segundos']:.1f} s ({resultado['filas_por_segundo']:,.0f} filas/s)")
+    print(f"👤 {resultado['autores_creados']:,} autores nuevos")
+    if resultado['analisis_ms']:
+        print(f"📊 Estadísticas del planificador actualizadas en {resultado['analisis_ms']:,.0f} ms")
+    if resultado['rechazadas']:
+        print(f"⚠️ {resultado['rechazadas']:,} filas rechazadas")
+        for linea, motivo in resultado['rechazos'][:10]:
+            print(f"   línea {linea}: {motivo}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
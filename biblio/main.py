@@ -1,5 +1,4 @@
 import dearpygui.dearpygui as dpg
-import sqlite3
 import sys
 import os
 from datetime import datetime, date
@@ -7,24 +6,50 @@ from datetime import datetime, date
 # Agregar el directorio padre al path para importar lib
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from lib.myfunctions.myscreen import getPositionX
-import modules.sqlstatement as sql
 
 # Importar módulos de gestión
 from modules.database_manager import DatabaseManager
 from modules.autores_manager import AutoresManager
 from modules.libros_manager import LibrosManager
 from modules.prestamos_manager import PrestamosManager
+from modules.paginador import crear_paginador
+from modules.exportador import exportar
+from modules.trabajador_db import TrabajadorDB
+from modules.mantenimiento import MantenimientoEnReposo
+from modules.cliente_api import ClienteBiblioteca
+from modules.db_config import SERVIDOR_URL
+
+# Períodos del reporte de libros más prestados
+PERIODOS_REPORTE = ["Todo el historial", "Este mes", "Últimos 12 meses", "Este año"]
+
+# Segundos de espera antes de mostrar el indicador de ocupado (evita parpadeos
+# con las consultas rápidas)
+DEMORA_INDICADOR_OCUPADO = 0.2
 
 class BibliotecaApp:
     def __init__(self):
         self.db_name = "biblioteca.db"
         
+        # Las consultas de la interfaz corren en hilos de fondo; los resultados
+        # se entregan en el bucle de dibujo (ver ejecutar)
+        self.trabajador = TrabajadorDB()
+        DatabaseManager.trabajador = self.trabajador
+        
+        # Con BIBLIO_SERVIDOR las operaciones de los managers las atiende el
+        # servidor de la biblioteca (servidor_biblioteca.py) en lugar del archivo
+        if SERVIDOR_URL:
+            DatabaseManager.cliente = ClienteBiblioteca(SERVIDOR_URL)
+            print(f"🌐 Usando el servidor {SERVIDOR_URL}")
+        
         # Inicializar managers
         self.db_manager = DatabaseManager(self.db_name)
         self.autores_manager = AutoresManager(self.db_name)
         self.libros_manager = LibrosManager(self.db_name)
         self.prestamos_manager = PrestamosManager(self.db_name)
         
+        # Vacío incremental de la base en los cuadros sin consultas pendientes
+        self.mantenimiento = MantenimientoEnReposo(self.db_manager)
+        
         # Configurar callbacks entre módulos
         self.autores_manager.set_callbacks(
             on_autor_added=self.actualizar_combo_autores,
@@ -91,63 +116,8 @@ class BibliotecaApp:
         self.libros_manager.eliminar_libro(isbn)
     
     def buscar_libros(self):
-        """Buscar libros por título o género"""
-        termino = dpg.get_value("input_buscar_libro")
-        
-        if not termino:
-            self.cargar_libros()
-            return
-        
-        try:
-            conn = sqlite3.connect(self.db_name)
-            cursor = conn.cursor()
-            
-            # Buscar por título
-            cursor.execute(sql.SEARCH_LIBROS_BY_TITLE, (f"%{termino}%",))
-            libros_titulo = cursor.fetchall()
-            
-            # Buscar por género
-            cursor.execute(sql.SEARCH_LIBROS_BY_GENRE, (f"%{termino}%",))
-            libros_genero = cursor.fetchall()
-            
-            conn.close()
-            
-            # Combinar resultados y eliminar duplicados
-            libros = libros_titulo + [libro for libro in libros_genero if libro not in libros_titulo]
-            
-            # Limpiar tabla
-            dpg.delete_item("table_libros", children_only=True)
-            
-            # Agregar encabezados
-            with dpg.table_row(parent="table_libros"):
-                dpg.add_text("ISBN")
-                dpg.add_text("Título")
-                dpg.add_text("Autor")
-                dpg.add_text("Año")
-                dpg.add_text("Editorial")
-                dpg.add_text("Género")
-                dpg.add_text("Estado")
-                dpg.add_text("Acciones")
-            
-            # Agregar datos
-            for libro in libros:
-                with dpg.table_row(parent="table_libros"):
-                    dpg.add_text(libro[0])
-                    dpg.add_text(libro[1])
-                    dpg.add_text(libro[2])
-                    dpg.add_text(str(libro[3]) if libro[3] else "")
-                    dpg.add_text(libro[4] or "")
-                    dpg.add_text(libro[5] or "")
-                    dpg.add_text(libro[6])
-                    with dpg.group(horizontal=True):
-                        dpg.add_button(
-                            label=f"Eliminar##del_libro_{libro[0]}", 
-                            callback=lambda s, a, u=libro[0]: self.eliminar_libro(u),
-                            width=80
-                        )
-                        
-        except Exception as e:
-            dpg.set_value("status_libros", f"Error al buscar libros: {e}")
+        """Delegar al módulo de libros"""
+        self.libros_manager.buscar_en_catalogo()
     
     # ================================
     # FUNCIONES DELEGADAS - PRÉSTAMOS
@@ -169,33 +139,80 @@ class BibliotecaApp:
         """Delegar al módulo de préstamos"""
         self.prestamos_manager.cargar_historial_prestamos(sender, app_data)
     
+    def periodo_reporte(self, periodo):
+        """Convertir la opción del combo de períodos en meses (desde, hasta) 'AAAA-MM'"""
+        hoy = datetime.now()
+        if periodo == "Este mes":
+            mes = hoy.strftime("%Y-%m")
+            return mes, mes
+        if periodo == "Este año":
+            return f"{hoy.year}-01", f"{hoy.year}-12"
+        if periodo == "Últimos 12 meses":
+            año, mes = (hoy.year, 1) if hoy.month == 12 else (hoy.year - 1, hoy.month + 1)
+            return f"{año}-{mes:02d}", hoy.strftime("%Y-%m")
+        return None, None
+    
+    def leer_reportes(self, desde=None, hasta=None):
+        """Leer los contadores y el ranking de libros más prestados (corre en el trabajador)"""
+        # Totales leídos de la tabla de contadores (no recorre las tablas)
+        return (self.db_manager.obtener_contadores(),
+                self.db_manager.obtener_libros_mas_prestados(10, desde, hasta))
+    
     def mostrar_reportes(self):
         """Mostrar reportes de libros más prestados"""
-        try:
-            conn = sqlite3.connect(self.db_name)
-            cursor = conn.cursor()
-            cursor.execute(sql.SELECT_LIBROS_MAS_PRESTADOS)
-            reportes = cursor.fetchall()
-            conn.close()
-            
-            # Limpiar solo las filas de datos, preservando las columnas (igual que autores)
-            # Primero obtenemos todos los hijos de la tabla
-            children = dpg.get_item_children("table_reportes", slot=1)  # slot 1 contiene las filas
-            if children:
-                for child in children:
-                    if dpg.get_item_type(child) == "mvAppItemType::mvTableRow":
-                        dpg.delete_item(child)
-            
-            # Agregar datos (sin encabezados, ya están definidos en las columnas)
-            for reporte in reportes:
-                with dpg.table_row(parent="table_reportes"):
-                    dpg.add_text(reporte[0])
-                    dpg.add_text(reporte[1])
-                    dpg.add_text(reporte[2])
-                    dpg.add_text(str(reporte[3]))
-                        
-        except Exception as e:
-            print(f"Error al cargar reportes: {e}")
+        desde, hasta = self.periodo_reporte(dpg.get_value("combo_periodo_reportes"))
+        self.db_manager.en_segundo_plano(
+            self.leer_reportes, desde, hasta,
+            al_terminar=lambda datos: self._mostrar_reportes(*datos),
+            al_fallar=lambda e: print(f"Error al cargar reportes: {e}"),
+            clave="table_reportes"
+        )
+    
+    def _mostrar_reportes(self, c, reportes):
+        """Mostrar el resumen y el ranking leídos por leer_reportes"""
+        dpg.set_value("texto_resumen_reportes",
+                      f"{c.get('autores', 0)} autores | {c.get('libros', 0)} libros "
+                      f"({c.get('libros.estado:Disponible', 0)} disponibles, "
+                      f"{c.get('libros.estado:Prestado', 0)} prestados) | "
+                      f"{c.get('prestamos', 0)} préstamos ({c.get('prestamos.estado:Activo', 0)} activos)")
+        
+        # Limpiar solo las filas de datos, preservando las columnas (igual que autores)
+        dpg.delete_item("table_reportes", children_only=True, slot=1)
+        
+        # Agregar datos (sin encabezados, ya están definidos en las columnas)
+        for reporte in reportes:
+            with dpg.table_row(parent="table_reportes"):
+                dpg.add_text(reporte[0])
+                dpg.add_text(reporte[1])
+                dpg.add_text(reporte[2])
+                dpg.add_text(str(reporte[3]))
+    
+    # ================================
+    # EXPORTACIÓN
+    # ================================
+    
+    def exportar_datos(self, sender=None, app_data=None, user_data="csv"):
+        """Exportar autores, libros y préstamos a la carpeta exportacion/<fecha y hora>"""
+        directorio = os.path.join("exportacion", datetime.now().strftime("%Y%m%d_%H%M%S"))
+        dpg.set_value("status_exportacion", f"Exportando ({user_data.upper()}) a {directorio}...")
+        # La exportación escribe archivos: no se cancela a mitad de camino
+        self.db_manager.en_segundo_plano(
+            lambda: exportar(self.db_manager, directorio, formato=user_data),
+            al_terminar=lambda resultado: self._exportacion_terminada(resultado, user_data, directorio),
+            al_fallar=lambda e: self._exportacion_terminada(None, user_data, directorio, e),
+            cancelable=False
+        )
+    
+    def _exportacion_terminada(self, resultado, formato, directorio, error=None):
+        """Informar el resultado de la exportación"""
+        if error is None:
+            total = sum(filas for _, filas in resultado.values())
+            mensaje = f"Exportadas {total} filas ({formato.upper()}) en {directorio}"
+            print(f"📤 {mensaje}")
+        else:
+            mensaje = f"Error al exportar: {error}"
+            print(f"❌ {mensaje}")
+        dpg.set_value("status_exportacion", mensaje)
     
     def crear_interfaz(self):
         """Crear la interfaz gráfica principal"""
@@ -223,6 +240,18 @@ class BibliotecaApp:
             height=dpg.get_viewport_height(),
             tag="main_window"
         ):
+            with dpg.menu_bar():
+                with dpg.menu(label="Archivo"):
+                    dpg.add_menu_item(label="Exportar a CSV", callback=self.exportar_datos, user_data="csv")
+                    dpg.add_menu_item(label="Exportar a JSONL", callback=self.exportar_datos, user_data="jsonl")
+            dpg.add_text("", tag="status_exportacion")
+            
+            # Indicador de consultas en curso (ver actualizar_indicador_ocupado)
+            with dpg.group(horizontal=True, tag="grupo_ocupado", show=False):
+                dpg.add_loading_indicator(style=1, radius=1.5)
+                dpg.add_text("Consultando la base de datos...", tag="texto_ocupado")
+                dpg.add_button(label="Cancelar", callback=self.cancelar_consultas)
+            
             with dpg.tab_bar():
                 # ===== PESTAÑA DE AUTORES =====
                 # Crear interfaz de autores usando el módulo
@@ -243,6 +272,9 @@ class BibliotecaApp:
                     dpg.add_separator()
                     
                     dpg.add_button(label="Actualizar Historial", callback=self.cargar_historial_prestamos)
+                    crear_paginador("table_historial_paginador",
+                                    self.prestamos_manager.pagina_historial_anterior,
+                                    self.prestamos_manager.pagina_historial_siguiente)
                     
                     with dpg.table(tag="table_historial", header_row=True,
                                  borders_innerH=True, borders_outerH=True,
@@ -261,7 +293,11 @@ class BibliotecaApp:
                     dpg.add_text("Libros Más Prestados", color=(0, 255, 0))
                     dpg.add_separator()
                     
-                    dpg.add_button(label="Generar Reporte", callback=self.mostrar_reportes)
+                    with dpg.group(horizontal=True):
+                        dpg.add_combo(PERIODOS_REPORTE, default_value=PERIODOS_REPORTE[0],
+                                      tag="combo_periodo_reportes", width=200)
+                        dpg.add_button(label="Generar Reporte", callback=self.mostrar_reportes)
+                    dpg.add_text("", tag="texto_resumen_reportes")
                     
                     with dpg.table(tag="table_reportes", header_row=True,
                                  borders_innerH=True, borders_outerH=True,
@@ -272,14 +308,30 @@ class BibliotecaApp:
                         dpg.add_table_column(label="Autor", width_fixed=True, init_width_or_weight=150)
                         dpg.add_table_column(label="Total Préstamos", width_fixed=True, init_width_or_weight=120)
     
+    def cancelar_consultas(self, sender=None, app_data=None):
+        """Cancelar las consultas en curso (las escrituras terminan igual)"""
+        canceladas = self.trabajador.cancelar_todas()
+        dpg.set_value("status_exportacion", f"{canceladas} consultas canceladas")
+    
+    def actualizar_indicador_ocupado(self):
+        """Mostrar el indicador solo si hay tareas pendientes desde hace un momento"""
+        ocupado = self.trabajador.tiempo_ocupado() > DEMORA_INDICADOR_OCUPADO
+        if ocupado != dpg.is_item_shown("grupo_ocupado"):
+            dpg.configure_item("grupo_ocupado", show=ocupado)
+    
     def ejecutar(self):
         """Ejecutar la aplicación"""
         self.crear_interfaz()
         
+        # Los callbacks se ejecutan en el bucle de abajo, en el mismo hilo que
+        # dibuja, para que solo ese hilo toque los items de la interfaz
+        dpg.configure_app(manual_callback_management=True)
+        
         # Configurar DearPyGUI ANTES de cargar datos
         dpg.setup_dearpygui()
         
         # Cargar datos iniciales DESPUÉS de configurar la interfaz usando los módulos
+        # (se envían al trabajador y se muestran en los primeros cuadros)
         self.autores_manager.cargar_autores()
         self.autores_manager.actualizar_combo_autores("combo_autor_libro")
         self.libros_manager.cargar_libros()
@@ -287,10 +339,20 @@ class BibliotecaApp:
         
         # Mostrar la aplicación
         dpg.show_viewport()
-        dpg.start_dearpygui()
+        
+        # Bucle de dibujo: en cada cuadro se atienden los callbacks de la
+        # interfaz y se entregan los resultados que terminó el trabajador
+        while dpg.is_dearpygui_running():
+            dpg.run_callbacks(dpg.get_callback_queue())
+            self.trabajador.procesar_terminadas()
+            self.mantenimiento.paso()
+            self.actualizar_indicador_ocupado()
+            dpg.render_dearpygui_frame()
         
         # Limpiar recursos al cerrar
+        self.trabajador.cerrar()
         dpg.destroy_context()
+        self.db_manager.cerrar_conexiones()
 
 def main():
     app = BibliotecaApp()
@@ -0,0 +1,62 @@
+# mantener_base.py - Estadísticas del planificador y espacio libre de la base
+"""
+Uso:
+    python mantener_base.py [--db biblioteca.db] [--analizar] [--vaciar]
+                            [--activar-incremental]
+
+Sin opciones informa el tamaño de la base, sus páginas libres y si usa vacío
+incremental. --analizar recalcula las estadísticas del planificador
+(ANALYZE); --vaciar devuelve al sistema todas las páginas libres (la
+aplicación lo hace sola, de a poco, mientras está en reposo).
+
+--activar-incremental pasa una base creada antes del vacío incremental a
+auto_vacuum = INCREMENTAL con un VACUUM completo: reescribe todo el archivo y
+nadie puede escribir mientras dura, así que debe correrse con la aplicación
+y el servidor cerrados.
+"""
+
+import argparse
+import sys
+
+from modules import mantenimiento
+from modules.database_manager import DatabaseManager
+
+def _imprimir_espacio(datos):
+    print(f"💾 {datos['bytes'] / 1024 / 1024:,.1f} MiB en {datos['paginas']:,} páginas de "
+          f"{datos['tamaño_pagina']:,} bytes; {datos['paginas_libres']:,} libres "
+          f"({datos['bytes_libres'] / 1024 / 1024:,.1f} MiB), auto_vacuum {datos['auto_vacuum']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Mantenimiento de la base de la biblioteca")
+    parser.add_argument("--db", default="biblioteca.db")
+    parser.add_argument("--analizar", action="store_true", help="recalcular las estadísticas (ANALYZE)")
+    parser.add_argument("--vaciar", action="store_true", help="devolver al sistema las páginas libres")
+    parser.add_argument("--activar-incremental", action="store_true",
+                        help="convertir la base a vacío incremental con un VACUUM completo")
+    args = parser.parse_args()
+
+    manager = DatabaseManager(args.db)
+    _imprimir_espacio(manager.espacio())
+
+    if args.activar_incremental:
+        with manager.pool.conexion() as conn:
+            recuperados = mantenimiento.activar_vacio_incremental(conn)
+        print(f"✅ Vacío incremental activado; {recuperados / 1024:,.0f} KiB recuperados")
+    if args.analizar:
+        print(f"📊 ANALYZE en {manager.analizar():,.0f} ms")
+    if args.vaciar:
+        libres = manager.espacio()['paginas_libres']
+        resultado = manager.vaciar_incremental(libres)
+        if resultado['auto_vacuum'] != "incremental":
+            print("⚠️ La base no usa vacío incremental (ver --activar-incremental)")
+        else:
+            print(f"🧹 {resultado['paginas_liberadas']:,} páginas liberadas "
+                  f"({resultado['bytes_recuperados'] / 1024:,.0f} KiB)")
+
+    if args.activar_incremental or args.analizar or args.vaciar:
+        _imprimir_espacio(manager.espacio())
+    manager.cerrar_conexiones()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
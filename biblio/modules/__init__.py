@@ -3,8 +3,26 @@
 """
 Módulos de gestión para el sistema de biblioteca:
 - database_manager: Clase base para operaciones de base de datos
+- connection_pool: Pool de conexiones compartido entre managers
+- cache_consultas: Caché LRU de resultados invalidada por versión de tabla
+- trabajador_db: Hilos de fondo para las consultas de la interfaz
+- db_config: Configuración de la base de datos (perfiles PRAGMA, pool)
+- schema_migrations: Migraciones versionadas del esquema
+- query_metrics: Latencia por sentencia y registro de consultas lentas
+- bloqueos: Reintentos ante bloqueos de escritura y métricas de espera
+- mantenimiento: PRAGMA optimize, ANALYZE y vacío incremental en reposo
+- query_plans: Verificación de planes de ejecución de consultas críticas
+- servicios: Lógica de autores, libros y préstamos sin interfaz gráfica
+- servidor_api: Servidor HTTP/JSON que atiende los servicios para varios mostradores
+- cliente_api: Cliente del servidor usado por los managers con BIBLIO_SERVIDOR
 - autores_manager: Gestión de autores
 - libros_manager: Gestión de libros
 - prestamos_manager: Gestión de préstamos
+- fechas: Fechas de préstamos guardadas como número de día
+- isbn: Normalización de ISBN a ISBN-13
+- datos_sinteticos: Generación reproducible de datos a escala para mediciones
+- importador: Importación en streaming de catálogos CSV/JSONL
+- exportador: Exportación en streaming de consultas a CSV/JSONL
+- paginador: Controles de paginación para tablas
 - sqlstatement: Declaraciones SQL centralizadas
 """
\ No newline at end of file
@@ -1,11 +1,10 @@
 # autores_manager.py - Módulo para la gestión de autores
 
 import dearpygui.dearpygui as dpg
-from .database_manager import DatabaseManager
-from . import sqlstatement as sql
+from .servicios import ServicioAutores
 
-class AutoresManager(DatabaseManager):
-    """Clase para manejar todas las operaciones relacionadas con autores"""
+class AutoresManager(ServicioAutores):
+    """Interfaz de autores: formulario y tabla sobre ServicioAutores"""
     
     def __init__(self, db_name="biblioteca.db"):
         super().__init__(db_name)
@@ -21,151 +20,127 @@ class AutoresManager(DatabaseManager):
         nacionalidad = dpg.get_value("input_autor_nacionalidad")
         fecha_nacimiento = dpg.get_value("input_autor_fecha")
         
-        if not nombre or not apellido:
-            self._set_status("Error: Nombre y apellido son obligatorios")
-            return
-        
-        try:
-            rows_affected = self.execute_command(
-                sql.INSERT_AUTOR, 
-                (nombre, apellido, nacionalidad, fecha_nacimiento)
-            )
+        self.en_segundo_plano(
+            self.crear_autor, nombre, apellido, nacionalidad, fecha_nacimiento,
+            al_terminar=lambda autor_id: self._autor_guardado(
+                True, f"Autor '{nombre} {apellido}' agregado exitosamente", "Error al agregar autor"),
+            cancelable=False
+        )
+    
+    def _autor_guardado(self, guardado, mensaje, mensaje_error):
+        """Actualizar la interfaz después de agregar o actualizar un autor"""
+        if guardado:
+            # Limpiar campos y volver a modo agregar
+            self._reset_formulario_autor()
             
-            if rows_affected > 0:
-                # Limpiar campos
-                dpg.set_value("input_autor_nombre", "")
-                dpg.set_value("input_autor_apellido", "")
-                dpg.set_value("input_autor_nacionalidad", "")
-                dpg.set_value("input_autor_fecha", "")
-                
-                self._set_status(f"Autor '{nombre} {apellido}' agregado exitosamente")
-                self.cargar_autores()
-                
-                # Notificar a otros módulos si es necesario
-                if hasattr(self, 'on_autor_added'):
-                    self.on_autor_added()
-            else:
-                self._set_status("Error al agregar autor")
-                
-        except Exception as e:
-            self._set_status(f"Error al agregar autor: {e}")
+            self._set_status(mensaje)
+            self.cargar_autores()
+            
+            # Notificar a otros módulos si es necesario
+            if hasattr(self, 'on_autor_added'):
+                self.on_autor_added()
+        else:
+            self._set_status(mensaje_error)
     
     def cargar_autores(self, sender=None, app_data=None):
         """Cargar la lista de autores en la tabla"""
         print("📥 Cargando autores...")
         
-        try:
-            # Verificar que la tabla existe
-            if not dpg.does_item_exist("table_autores"):
-                print("❌ ERROR: table_autores no existe!")
-                self._set_status("Error: Tabla no disponible")
-                return
-            
-            # Obtener autores de la base de datos
-            autores = self.execute_query(sql.SELECT_ALL_AUTORES)
-            
-            print(f"📊 Encontrados {len(autores)} autores en la BD")
-            
-            # Limpiar solo las filas de datos, preservando las columnas
-            # Primero obtenemos todos los hijos de la tabla
-            children = dpg.get_item_children("table_autores", slot=1)  # slot 1 contiene las filas
-            if children:
-                for child in children:
-                    if dpg.get_item_type(child) == "mvAppItemType::mvTableRow":
-                        dpg.delete_item(child)
-            
-            # Agregar datos (sin encabezados, ya están definidos en las columnas)
-            for autor in autores:
-                with dpg.table_row(parent="table_autores"):
-                    dpg.add_text(str(autor[0]))
-                    dpg.add_text(autor[1])
-                    dpg.add_text(autor[2])
-                    dpg.add_text(autor[3] or "")
-                    dpg.add_text(autor[4] or "")
-                    with dpg.group(horizontal=True):
-                        dpg.add_button(
-                            label=f"Editar##edit_autor_{autor[0]}", 
-                            callback=self.editar_autor,
-                            user_data=autor[0],
-                            width=55
-                        )
-                        dpg.add_button(
-                            label=f"Eliminar##del_autor_{autor[0]}", 
-                            callback=self.eliminar_autor,
-                            user_data=autor[0],
-                            width=65
-                        )
-            
-            print(f"✅ Cargados {len(autores)} autores correctamente")
-            self._set_status(f"Cargados {len(autores)} autores")
-                        
-        except Exception as e:
-            print(f"❌ Error al cargar autores: {e}")
-            self._set_status(f"Error: {e}")
+        # Verificar que la tabla existe
+        if not dpg.does_item_exist("table_autores"):
+            print("❌ ERROR: table_autores no existe!")
+            self._set_status("Error: Tabla no disponible")
+            return
+        
+        # La consulta corre en el trabajador; las filas se agregan en el hilo de la interfaz
+        self.en_segundo_plano(self.listar_autores,
+                              al_terminar=self._mostrar_autores, clave="table_autores")
+    
+    def _mostrar_autores(self, autores):
+        """Agregar los autores a la tabla, de a una fila por paso (generador)"""
+        print(f"📊 Encontrados {len(autores)} autores en la BD")
+        
+        # Limpiar solo las filas de datos, preservando las columnas
+        dpg.delete_item("table_autores", children_only=True, slot=1)
+        
+        # Agregar datos (sin encabezados, ya están definidos en las columnas)
+        for autor in autores:
+            with dpg.table_row(parent="table_autores"):
+                dpg.add_text(str(autor[0]))
+                dpg.add_text(autor[1])
+                dpg.add_text(autor[2])
+                dpg.add_text(autor[3] or "")
+                dpg.add_text(autor[4] or "")
+                with dpg.group(horizontal=True):
+                    dpg.add_button(
+                        label=f"Editar##edit_autor_{autor[0]}", 
+                        callback=self.editar_autor,
+                        user_data=autor[0],
+                        width=55
+                    )
+                    dpg.add_button(
+                        label=f"Eliminar##del_autor_{autor[0]}", 
+                        callback=self.eliminar_autor,
+                        user_data=autor[0],
+                        width=65
+                    )
+            yield
+        
+        print(f"✅ Cargados {len(autores)} autores correctamente")
+        self._set_status(f"Cargados {len(autores)} autores")
     
     def eliminar_autor(self, sender=None, app_data=None, user_data=None):
         """Eliminar un autor (solo si no tiene libros asociados)"""
         autor_id = user_data if user_data is not None else app_data
-        try:
-            # Verificar si tiene libros asociados
-            count_result = self.execute_query(sql.CHECK_AUTOR_HAS_BOOKS, (autor_id,))
-            count = count_result[0][0] if count_result else 0
-            
-            if count > 0:
-                self._set_status("No se puede eliminar: el autor tiene libros asociados")
-                return
-            
-            # Eliminar autor
-            rows_affected = self.execute_command(sql.DELETE_AUTOR, (autor_id,))
-            
-            if rows_affected > 0:
-                self._set_status("Autor eliminado exitosamente")
-                self.cargar_autores()
-                
-                # Notificar a otros módulos si es necesario
-                if hasattr(self, 'on_autor_deleted'):
-                    self.on_autor_deleted()
-            else:
-                self._set_status("Error: No se pudo eliminar el autor")
+        self.en_segundo_plano(self.borrar_autor, autor_id,
+                              al_terminar=self._autor_eliminado, cancelable=False)
+    
+    def _autor_eliminado(self, rows_affected):
+        """Actualizar la interfaz después de intentar eliminar un autor"""
+        if rows_affected is None:
+            self._set_status("No se puede eliminar: el autor tiene libros asociados")
+        elif rows_affected > 0:
+            self._set_status("Autor eliminado exitosamente")
+            self.cargar_autores()
             
-        except Exception as e:
-            self._set_status(f"Error al eliminar autor: {e}")
+            # Notificar a otros módulos si es necesario
+            if hasattr(self, 'on_autor_deleted'):
+                self.on_autor_deleted()
+        else:
+            self._set_status("Error: No se pudo eliminar el autor")
     
     def editar_autor(self, sender=None, app_data=None, user_data=None):
         """Cargar datos del autor en el formulario para edición"""
         autor_id = user_data if user_data is not None else app_data
         print(f"🔍 Editando autor con ID: {autor_id} (tipo: {type(autor_id)})")
         
-        try:
-            # Obtener datos del autor
-            autor = self.execute_query(sql.SELECT_AUTOR_BY_ID, (autor_id,))
-            
-            if not autor:
-                self._set_status(f"Error: Autor con ID '{autor_id}' no encontrado")
-                return
-            
-            autor = autor[0]
-            
-            # Cargar datos en los campos del formulario
-            dpg.set_value("input_autor_nombre", autor[1])
-            dpg.set_value("input_autor_apellido", autor[2])
-            dpg.set_value("input_autor_nacionalidad", autor[3] or "")
-            dpg.set_value("input_autor_fecha", autor[4] or "")
-            
-            # Cambiar el botón a modo edición
-            dpg.set_item_label("btn_agregar_autor", "Actualizar Autor")
-            dpg.set_item_callback("btn_agregar_autor", self.actualizar_autor)
-            
-            # Mostrar botón de cancelar
-            dpg.show_item("btn_cancelar_edicion_autor")
-            
-            # Guardar el ID que se está editando
-            self.autor_editando = autor_id
-            
-            self._set_status(f"Editando autor: {autor[1]} {autor[2]}")
-            
-        except Exception as e:
-            self._set_status(f"Error al cargar autor para edición: {e}")
+        self.en_segundo_plano(self.obtener_autor, autor_id,
+                              al_terminar=lambda autor: self._cargar_formulario_autor(autor_id, autor),
+                              clave="formulario_autor")
+    
+    def _cargar_formulario_autor(self, autor_id, autor):
+        """Pasar el formulario a modo edición con los datos del autor"""
+        if not autor:
+            self._set_status(f"Error: Autor con ID '{autor_id}' no encontrado")
+            return
+        
+        # Cargar datos en los campos del formulario
+        dpg.set_value("input_autor_nombre", autor[1])
+        dpg.set_value("input_autor_apellido", autor[2])
+        dpg.set_value("input_autor_nacionalidad", autor[3] or "")
+        dpg.set_value("input_autor_fecha", autor[4] or "")
+        
+        # Cambiar el botón a modo edición
+        dpg.set_item_label("btn_agregar_autor", "Actualizar Autor")
+        dpg.set_item_callback("btn_agregar_autor", self.actualizar_autor)
+        
+        # Mostrar botón de cancelar
+        dpg.show_item("btn_cancelar_edicion_autor")
+        
+        # Guardar el ID que se está editando
+        self.autor_editando = autor_id
+        
+        self._set_status(f"Editando autor: {autor[1]} {autor[2]}")
     
     def actualizar_autor(self, sender=None, app_data=None):
         """Actualizar un autor existente"""
@@ -174,31 +149,12 @@ class AutoresManager(DatabaseManager):
         nacionalidad = dpg.get_value("input_autor_nacionalidad")
         fecha_nacimiento = dpg.get_value("input_autor_fecha")
         
-        if not nombre or not apellido:
-            self._set_status("Error: Nombre y apellido son obligatorios")
-            return
-        
-        try:
-            rows_affected = self.execute_command(
-                sql.UPDATE_AUTOR, 
-                (nombre, apellido, nacionalidad, fecha_nacimiento, self.autor_editando)
-            )
-            
-            if rows_affected > 0:
-                # Limpiar campos y resetear a modo agregar
-                self._reset_formulario_autor()
-                
-                self._set_status(f"Autor '{nombre} {apellido}' actualizado exitosamente")
-                self.cargar_autores()
-                
-                # Notificar a otros módulos si es necesario
-                if hasattr(self, 'on_autor_added'):
-                    self.on_autor_added()
-            else:
-                self._set_status("Error al actualizar autor")
-                
-        except Exception as e:
-            self._set_status(f"Error al actualizar autor: {e}")
+        self.en_segundo_plano(
+            self.modificar_autor, self.autor_editando, nombre, apellido, nacionalidad, fecha_nacimiento,
+            al_terminar=lambda actualizado: self._autor_guardado(
+                actualizado, f"Autor '{nombre} {apellido}' actualizado exitosamente", "Error al actualizar autor"),
+            cancelable=False
+        )
     
     def _reset_formulario_autor(self):
         """Resetear el formulario a modo agregar"""
@@ -216,43 +172,24 @@ class AutoresManager(DatabaseManager):
         if hasattr(self, 'autor_editando'):
             delattr(self, 'autor_editando')
     
-    def obtener_autores_para_combo(self):
-        """Obtener lista de autores para usar en combo boxes"""
-        try:
-            autores = self.execute_query(sql.SELECT_AUTORES_FOR_COMBO)
-            
-            # Crear lista para el combo
-            items = ["Sin autor"]
-            valores = [None]
-            
-            for autor in autores:
-                items.append(autor[1])  # nombre_completo
-                valores.append(autor[0])  # id
-            
-            return items, valores
-            
-        except Exception as e:
-            print(f"❌ Error al obtener autores para combo: {e}")
-            return ["Sin autor"], [None]
-    
     def actualizar_combo_autores(self, combo_tag="combo_autor_libro"):
         """Actualizar el combo box de autores"""
-        try:
-            items, valores = self.obtener_autores_para_combo()
-            
-            if dpg.does_item_exist(combo_tag):
-                dpg.configure_item(combo_tag, items=items)
-                # Guardar los valores para uso posterior
-                setattr(self, f"{combo_tag}_valores", valores)
-            
-        except Exception as e:
-            print(f"❌ Error al actualizar combo autores: {e}")
+        if not dpg.does_item_exist(combo_tag):
+            return
+        self.en_segundo_plano(self.obtener_autores_para_combo,
+                              al_terminar=lambda combo: self._llenar_combo(combo_tag, *combo),
+                              clave=combo_tag)
+    
+    def _llenar_combo(self, combo_tag, items, valores):
+        """Mostrar los items en el combo y guardar sus valores como user_data del combo"""
+        if dpg.does_item_exist(combo_tag):
+            dpg.configure_item(combo_tag, items=items, user_data=valores)
     
     def obtener_id_autor_seleccionado(self, combo_selection, combo_tag="combo_autor_libro"):
-        """Obtener el ID del autor seleccionado en un combo"""
+        """Obtener el ID del autor seleccionado en un combo (sin consultar la base)"""
         try:
-            valores = getattr(self, f"{combo_tag}_valores", [None])
-            items, _ = self.obtener_autores_para_combo()
+            items = dpg.get_item_configuration(combo_tag)['items']
+            valores = dpg.get_item_user_data(combo_tag) or [None]
             
             if combo_selection in items:
                 index = items.index(combo_selection)
@@ -292,7 +229,7 @@ class AutoresManager(DatabaseManager):
             # Lista de autores
             with dpg.child_window():
                 dpg.add_text("Lista de Autores:")
-                with dpg.table(tag="table_autores"):
+                with dpg.table(tag="table_autores", clipper=True):
                     dpg.add_table_column(label="ID", width_fixed=True, init_width_or_weight=0)  # Columna oculta
                     dpg.add_table_column(label="Nombre")
                     dpg.add_table_column(label="Apellido")
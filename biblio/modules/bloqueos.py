@@ -0,0 +1,136 @@
+# bloqueos.py - Reintentos ante bloqueos de escritura y métricas de espera
+
+"""
+SQLite admite un solo escritor por archivo. Cuando dos puestos escriben a la
+vez, el segundo espera hasta busy_timeout milisegundos (PRAGMA del perfil,
+ver db_config.py) y, si el bloqueo sigue, la sentencia falla con "database
+is locked". DatabaseManager envuelve sus escrituras con ``con_reintentos``:
+ante un bloqueo deshace, espera un tiempo al azar que crece con cada intento
+(para que los puestos no vuelvan a chocar al mismo tiempo) y reintenta hasta
+REINTENTOS_BLOQUEO veces. Si aun así no puede escribir lanza ErrorBloqueo,
+para que quien llama sepa que la operación no se hizo.
+
+Las escrituras toman el bloqueo al empezar (BEGIN IMMEDIATE, con
+``tomar_escritura``); el tiempo que tarda es la espera de bloqueo y se
+acumula aquí junto con los reintentos:
+
+    from modules import bloqueos
+    bloqueos.imprimir_resumen()
+"""
+
+import random
+import sqlite3
+import threading
+import time
+from . import db_config
+
+# Códigos primarios de SQLite para una base o tabla bloqueada
+_SQLITE_BUSY = 5
+_SQLITE_LOCKED = 6
+
+_lock = threading.Lock()
+_estadisticas = {}
+
+class ErrorBloqueo(sqlite3.OperationalError):
+    """La base siguió bloqueada por otro escritor después de todos los reintentos"""
+
+def _reiniciar_estadisticas():
+    _estadisticas.update({
+        'esperas': 0,
+        'espera_total_ms': 0.0,
+        'espera_max_ms': 0.0,
+        'bloqueos': 0,
+        'reintentos': 0,
+        'pausa_total_ms': 0.0,
+        'agotados': 0,
+    })
+
+_reiniciar_estadisticas()
+
+def es_bloqueo(error):
+    """True si ``error`` es un "database is locked" que vale la pena reintentar"""
+    if isinstance(error, ErrorBloqueo) or not isinstance(error, sqlite3.OperationalError):
+        return False
+    codigo = getattr(error, "sqlite_errorcode", None)
+    if codigo is not None:
+        return codigo & 0xFF in (_SQLITE_BUSY, _SQLITE_LOCKED)
+    mensaje = str(error)
+    return "database is locked" in mensaje or "database table is locked" in mensaje
+
+def pausa_reintento(intento):
+    """Segundos a esperar antes del reintento número ``intento`` (desde 0).
+
+    El tope crece al doble en cada intento, de ESPERA_BASE_REINTENTO_MS a
+    ESPERA_MAX_REINTENTO_MS, y la pausa se elige al azar entre la mitad del
+    tope y el tope: los puestos que chocaron se separan en el tiempo.
+    """
+    tope = min(db_config.ESPERA_MAX_REINTENTO_MS, db_config.ESPERA_BASE_REINTENTO_MS * 2 ** intento)
+    return random.uniform(tope / 2, tope) / 1000
+
+def tomar_escritura(conn):
+    """Abrir una transacción con el bloqueo de escritura (BEGIN IMMEDIATE) y
+    registrar cuánto tardó en conseguirlo"""
+    inicio = time.perf_counter()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+    finally:
+        milisegundos = (time.perf_counter() - inicio) * 1000
+        with _lock:
+            _estadisticas['esperas'] += 1
+            _estadisticas['espera_total_ms'] += milisegundos
+            _estadisticas['espera_max_ms'] = max(_estadisticas['espera_max_ms'], milisegundos)
+
+def con_reintentos(funcion, reintentos=None):
+    """Ejecutar ``funcion()`` y reintentarla si la base está bloqueada.
+
+    ``funcion`` debe poder repetirse: cada intento tiene que empezar y
+    terminar su propia transacción. Otros errores se propagan sin reintentar.
+    Lanza ErrorBloqueo si el último intento también encontró la base bloqueada.
+    """
+    reintentos = db_config.REINTENTOS_BLOQUEO if reintentos is None else reintentos
+    intento = 0
+    while True:
+        try:
+            return funcion()
+        except sqlite3.OperationalError as e:
+            if not es_bloqueo(e):
+                raise
+            with _lock:
+                _estadisticas['bloqueos'] += 1
+                if intento >= reintentos:
+                    _estadisticas['agotados'] += 1
+            if intento >= reintentos:
+                raise ErrorBloqueo(f"La base de datos sigue bloqueada por otra escritura "
+                                   f"después de {intento + 1} intentos: {e}") from e
+            pausa = pausa_reintento(intento)
+            with _lock:
+                _estadisticas['reintentos'] += 1
+                _estadisticas['pausa_total_ms'] += pausa * 1000
+            time.sleep(pausa)
+            intento += 1
+
+def resumen():
+    """Obtener las métricas de bloqueo del proceso.
+
+    esperas, espera_total_ms, espera_max_ms y espera_media_ms: tomas del
+    bloqueo de escritura y cuánto tardaron; bloqueos: operaciones que
+    encontraron la base bloqueada; reintentos y pausa_total_ms: reintentos
+    hechos y tiempo dormido entre ellos; agotados: ErrorBloqueo lanzados.
+    """
+    with _lock:
+        datos = dict(_estadisticas)
+    datos['espera_media_ms'] = datos['espera_total_ms'] / datos['esperas'] if datos['esperas'] else 0.0
+    return datos
+
+def imprimir_resumen():
+    """Imprimir las métricas de bloqueo"""
+    datos = resumen()
+    print(f"🔒 {datos['esperas']} tomas de escritura: media {datos['espera_media_ms']:.2f} ms, "
+          f"máx {datos['espera_max_ms']:.2f} ms")
+    print(f"🔁 {datos['bloqueos']} bloqueos, {datos['reintentos']} reintentos "
+          f"({datos['pausa_total_ms']:.0f} ms en pausa), {datos['agotados']} sin resolver")
+
+def reiniciar():
+    """Borrar las métricas acumuladas"""
+    with _lock:
+        _reiniciar_estadisticas()
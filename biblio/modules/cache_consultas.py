@@ -0,0 +1,246 @@
+# cache_consultas.py - Caché LRU de resultados de consultas, invalidada por versión de tabla
+
+"""
+DatabaseManager guarda aquí el resultado de cada SELECT ejecutado con
+execute_query, con la sentencia y sus parámetros como clave. Hay una caché
+por archivo de base de datos, compartida por todos los managers (igual que
+el pool de conexiones).
+
+Cada tabla tiene un número de versión que se incrementa al confirmar una
+escritura sobre ella (execute_command, execute_many o transaccion). Una
+entrada guarda la versión de las tablas que leyó y deja de valer cuando
+alguna cambia. Las tablas leídas y escritas por cada sentencia se obtienen
+una sola vez, compilándola con un autorizador de SQLite. Así se incluyen
+las tablas que modifican los triggers: un préstamo invalida también libros,
+contadores y el ranking de préstamos.
+
+Las escrituras de otros procesos no pasan por aquí; para acotar cuánto
+tiempo puede verse un dato viejo, las entradas vencen a los
+CACHE_TTL_SEGUNDOS.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from .db_config import CACHE_ACTIVA, CACHE_MAX_ENTRADAS, CACHE_MAX_FILAS, CACHE_TTL_SEGUNDOS
+
+_ACCIONES_ESCRITURA = {sqlite3.SQLITE_INSERT, sqlite3.SQLITE_UPDATE, sqlite3.SQLITE_DELETE}
+_ACCIONES_LECTURA = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION}
+_ACCIONES_ESQUEMA = {
+    valor for nombre, valor in vars(sqlite3).items()
+    if nombre.startswith(("SQLITE_CREATE_", "SQLITE_DROP_")) or nombre == "SQLITE_ALTER_TABLE"
+}
+
+# Funciones cuyo resultado cambia entre llamadas: una consulta que las usa no se guarda
+_FUNCIONES_VOLATILES = {"random", "randomblob", "changes", "total_changes", "last_insert_rowid"}
+
+# Sentencias analizadas que se recuerdan (las de sqlstatement.py son muchas menos)
+_MAX_ANALISIS = 1024
+
+class _Analisis:
+    """Tablas que lee y escribe una sentencia, según el autorizador de SQLite"""
+
+    __slots__ = ("leidas", "escritas", "cambia_esquema", "cacheable")
+
+    def __init__(self, leidas, escritas, cambia_esquema, cacheable):
+        self.leidas = leidas
+        self.escritas = escritas
+        self.cambia_esquema = cambia_esquema
+        self.cacheable = cacheable
+
+# Sentencias que SQLite no pudo compilar con EXPLAIN: no se guardan y, si
+# escriben, invalidan todo
+_SIN_ANALISIS = _Analisis(frozenset(), frozenset(), True, False)
+
+class CacheConsultas:
+    """Caché LRU de resultados con límite de entradas y de filas totales"""
+
+    _caches = {}
+    _caches_lock = threading.Lock()
+
+    def __init__(self, max_entradas=None, max_filas=None, ttl=None):
+        self.activa = CACHE_ACTIVA
+        self.max_entradas = max_entradas or CACHE_MAX_ENTRADAS
+        self.max_filas = max_filas or CACHE_MAX_FILAS
+        self.ttl = CACHE_TTL_SEGUNDOS if ttl is None else ttl
+        self._lock = threading.Lock()
+        # clave -> (filas, versiones de las tablas leídas, momento de carga)
+        self._entradas = OrderedDict()
+        self._filas = 0
+        self._versiones = {}
+        # Se incrementa al invalidar todo (cambios de esquema, escrituras sin analizar)
+        self._epoca = 0
+        self._analisis = {}
+        self._estadisticas = {'aciertos': 0, 'fallos': 0, 'invalidadas': 0, 'expiradas': 0, 'expulsadas': 0}
+
+    @classmethod
+    def obtener(cls, db_name):
+        """Obtener la caché compartida para un archivo de base de datos"""
+        clave = os.path.abspath(db_name)
+        with cls._caches_lock:
+            cache = cls._caches.get(clave)
+            if cache is None:
+                cache = cls._caches[clave] = cls()
+            return cache
+
+    # ================================
+    # ANÁLISIS DE SENTENCIAS
+    # ================================
+
+    def analizar(self, conn, query, params=None):
+        """Obtener (y recordar) las tablas que lee y escribe una sentencia.
+
+        La sentencia se compila con EXPLAIN, que no la ejecuta. Si no se
+        puede compilar así (por ejemplo EXPLAIN QUERY PLAN) se trata como no
+        cacheable y, si escribe, como un cambio de esquema.
+        """
+        analisis = self._analisis.get(query)
+        if analisis is not None:
+            return analisis
+
+        acciones = []
+        def autorizador(accion, arg1, arg2, base, trigger):
+            acciones.append((accion, arg1, arg2))
+            return sqlite3.SQLITE_OK
+
+        conn.set_authorizer(autorizador)
+        try:
+            conn.execute(f"EXPLAIN {query}", params or ()).fetchall()
+        except sqlite3.Error:
+            acciones = None
+        finally:
+            conn.set_authorizer(None)
+        if acciones is None:
+            self._recordar(query, _SIN_ANALISIS)
+            return _SIN_ANALISIS
+
+        leidas = frozenset(arg1 for accion, arg1, _ in acciones if accion == sqlite3.SQLITE_READ)
+        escritas = frozenset(arg1 for accion, arg1, _ in acciones if accion in _ACCIONES_ESCRITURA)
+        cambia_esquema = any(accion in _ACCIONES_ESQUEMA for accion, _, _ in acciones)
+        cacheable = (
+            bool(leidas)
+            and all(accion in _ACCIONES_LECTURA for accion, _, _ in acciones)
+            and not any(accion == sqlite3.SQLITE_FUNCTION and arg2.lower() in _FUNCIONES_VOLATILES
+                        for accion, _, arg2 in acciones)
+            and "'now'" not in query.lower()
+        )
+        analisis = _Analisis(leidas, escritas, cambia_esquema, cacheable)
+        self._recordar(query, analisis)
+        return analisis
+
+    def _recordar(self, query, analisis):
+        with self._lock:
+            if len(self._analisis) >= _MAX_ANALISIS:
+                self._analisis.clear()
+            self._analisis[query] = analisis
+
+    # ================================
+    # LECTURA Y CARGA
+    # ================================
+
+    def versiones(self, tablas):
+        """Versión actual de cada tabla (tomarla ANTES de ejecutar la consulta)"""
+        with self._lock:
+            return (self._epoca, tuple(self._versiones.get(tabla, 0) for tabla in sorted(tablas)))
+
+    def obtener_resultado(self, query, params):
+        """Filas guardadas para la sentencia y sus parámetros, o None si no hay,
+        no valen o la sentencia no es cacheable (o todavía no se analizó)"""
+        analisis = self._analisis.get(query)
+        if analisis is not None and not analisis.cacheable:
+            return None
+        if analisis is None:
+            with self._lock:
+                self._estadisticas['fallos'] += 1
+            return None
+
+        clave = (query, tuple(params) if params else ())
+        vigentes = self.versiones(analisis.leidas)
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                self._estadisticas['fallos'] += 1
+                return None
+            filas, versiones, momento = entrada
+            if versiones != vigentes:
+                motivo = 'invalidadas'
+            elif self.ttl and time.monotonic() - momento > self.ttl:
+                motivo = 'expiradas'
+            else:
+                self._entradas.move_to_end(clave)
+                self._estadisticas['aciertos'] += 1
+                # Copia: quien llama puede ordenar o invertir la lista
+                return list(filas)
+            self._quitar(clave)
+            self._estadisticas[motivo] += 1
+            self._estadisticas['fallos'] += 1
+            return None
+
+    def guardar(self, query, params, filas, versiones):
+        """Guardar el resultado con las versiones tomadas antes de ejecutar la consulta"""
+        if len(filas) > self.max_filas:
+            return
+        clave = (query, tuple(params) if params else ())
+        with self._lock:
+            if clave in self._entradas:
+                self._quitar(clave)
+            self._entradas[clave] = (tuple(filas), versiones, time.monotonic())
+            self._filas += len(filas)
+            while len(self._entradas) > self.max_entradas or self._filas > self.max_filas:
+                self._quitar(next(iter(self._entradas)))
+                self._estadisticas['expulsadas'] += 1
+
+    def _quitar(self, clave):
+        """Quitar una entrada (con el lock tomado)"""
+        filas, _, _ = self._entradas.pop(clave)
+        self._filas -= len(filas)
+
+    # ================================
+    # INVALIDACIÓN
+    # ================================
+
+    def registrar_escritura(self, analisis):
+        """Incrementar la versión de las tablas escritas (llamar después del COMMIT).
+
+        Un cambio de esquema (o una sentencia que no se pudo analizar)
+        invalida todo.
+        """
+        if analisis.cambia_esquema:
+            self.invalidar_todo(olvidar_analisis=True)
+            return
+        if not analisis.escritas:
+            return
+        with self._lock:
+            for tabla in analisis.escritas:
+                self._versiones[tabla] = self._versiones.get(tabla, 0) + 1
+
+    def invalidar_todo(self, olvidar_analisis=False):
+        """Descartar todas las entradas; ``olvidar_analisis`` tras un cambio de
+        esquema, porque los triggers de una tabla pueden haber cambiado"""
+        with self._lock:
+            self._epoca += 1
+            self._entradas.clear()
+            self._filas = 0
+            if olvidar_analisis:
+                self._analisis.clear()
+
+    # ================================
+    # ESTADÍSTICAS
+    # ================================
+
+    def estadisticas(self):
+        """Aciertos, fallos (de ellos invalidadas y expiradas), expulsadas, entradas,
+        filas guardadas y tasa de aciertos"""
+        with self._lock:
+            datos = dict(self._estadisticas, entradas=len(self._entradas), filas=self._filas)
+        consultas = datos['aciertos'] + datos['fallos']
+        datos['tasa_aciertos'] = datos['aciertos'] / consultas if consultas else 0.0
+        return datos
+
+    def reiniciar_estadisticas(self):
+        """Poner en cero los contadores de aciertos y fallos"""
+        with self._lock:
+            for nombre in self._estadisticas:
+                self._estadisticas[nombre] = 0
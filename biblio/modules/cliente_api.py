@@ -0,0 +1,202 @@
+# cliente_api.py - Cliente del servidor HTTP/JSON de la biblioteca
+
+"""
+ClienteBiblioteca llama a las operaciones de un ServidorBiblioteca (ver
+servidor_api.py) como si fueran métodos locales. Los managers lo usan solos:
+main.py lo asigna a ``DatabaseManager.cliente`` cuando está definida
+BIBLIO_SERVIDOR, y desde entonces cada método marcado con @remota se envía
+al servidor en lugar de leer o escribir el archivo.
+
+    cliente = ClienteBiblioteca("http://192.168.0.10:8765")
+    prestamo_id = cliente.llamar("prestar_libro", "978-84-376-0494-7", "Juan Pérez")
+    resultados = cliente.lote([("devolver_prestamo", prestamo_id),
+                               ("listar_prestamos_activos",)])
+
+Un ValueError, TypeError o ErrorBloqueo del servidor se lanza igual en el
+mostrador, así la interfaz muestra el mismo mensaje que con el archivo
+local. Los demás errores, y no poder conectarse, lanzan ErrorServidor.
+
+Cada hilo mantiene abierta su propia conexión HTTP con el servidor.
+
+``exportar`` descarga una exportación hecha en el servidor (ver
+exportador.py); exportador.exportar lo usa solo cuando el manager tiene un
+cliente, así el mostrador nunca abre el archivo de la base.
+"""
+
+import http.client
+import json
+import os
+import select
+import shutil
+import tempfile
+import threading
+import zipfile
+from urllib.parse import urlsplit, urlencode
+from .bloqueos import ErrorBloqueo
+from .db_config import SERVIDOR_CLAVE, SERVIDOR_TIEMPO_ESPERA
+
+# Cabecera con la clave compartida (BIBLIO_SERVIDOR_CLAVE)
+CABECERA_CLAVE = "X-Biblio-Clave"
+
+# Cabecera de la respuesta de /exportar con las filas de cada consulta
+CABECERA_FILAS = "X-Biblio-Filas"
+
+# Tipos de excepción que el servidor informa y se vuelven a lanzar tal cual
+_EXCEPCIONES = {"ValueError": ValueError, "TypeError": TypeError, "ErrorBloqueo": ErrorBloqueo}
+
+# Errores al enviar por una conexión reutilizada que el servidor ya cerró
+_CONEXION_CERRADA = (ConnectionResetError, BrokenPipeError)
+
+class ErrorServidor(Exception):
+    """El servidor falló o no se pudo hablar con él"""
+
+def _como_tuplas(valor):
+    # JSON no tiene tuplas: las filas (listas dentro de listas) vuelven a ser
+    # tuplas, como las que retorna sqlite3
+    if isinstance(valor, dict):
+        return {clave: _como_tuplas(v) for clave, v in valor.items()}
+    if isinstance(valor, list):
+        return [tuple(_como_tuplas(v)) if isinstance(v, list) else _como_tuplas(v) for v in valor]
+    return valor
+
+class ClienteBiblioteca:
+    """Cliente de un ServidorBiblioteca"""
+
+    def __init__(self, url, clave=None, tiempo_espera=None):
+        partes = urlsplit(url)
+        if partes.scheme != "http" or not partes.hostname:
+            raise ValueError(f"URL del servidor inválida: '{url}' (se espera http://host:puerto)")
+        self.url = url
+        self.host = partes.hostname
+        self.puerto = partes.port or 80
+        self.clave = SERVIDOR_CLAVE if clave is None else clave
+        self.tiempo_espera = tiempo_espera or SERVIDOR_TIEMPO_ESPERA
+        self._local = threading.local()
+
+    def _conexion(self):
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            conexion = http.client.HTTPConnection(self.host, self.puerto, timeout=self.tiempo_espera)
+            self._local.conexion = conexion
+        elif conexion.sock is not None and select.select([conexion.sock], [], [], 0)[0]:
+            # Una conexión ociosa no debería tener nada para leer: el servidor
+            # la cerró. Se cierra aquí y request() abre otra antes de enviar
+            conexion.close()
+        return conexion
+
+    def _pedir(self, metodo, ruta, datos=None, archivo=None):
+        """Enviar un pedido y retornar (código HTTP, respuesta decodificada).
+        
+        Con ``archivo``, un cuerpo 200 se copia a él de a partes y la
+        respuesta decodificada es la cabecera CABECERA_FILAS.
+        """
+        cuerpo = None if datos is None else json.dumps(datos, ensure_ascii=False, default=str).encode("utf-8")
+        cabeceras = {"Content-Type": "application/json"}
+        if self.clave:
+            cabeceras[CABECERA_CLAVE] = self.clave
+
+        reutilizada = getattr(self._local, "conexion", None) is not None
+        for intento in range(2):
+            conexion = self._conexion()
+            try:
+                conexion.request(metodo, ruta, body=cuerpo, headers=cabeceras)
+            except OSError as e:
+                self.cerrar()
+                # Si falló el envío por una conexión reutilizada que el servidor
+                # ya cerró, el pedido no llegó: se reintenta una vez con otra nueva
+                if isinstance(e, _CONEXION_CERRADA) and reutilizada and not intento:
+                    continue
+                raise ErrorServidor(f"No se pudo conectar con el servidor {self.url}: {e}") from e
+            try:
+                respuesta = conexion.getresponse()
+                if archivo is not None and respuesta.status == 200:
+                    archivo.seek(0)
+                    archivo.truncate()
+                    shutil.copyfileobj(respuesta, archivo)
+                    contenido = respuesta.getheader(CABECERA_FILAS, "{}")
+                else:
+                    contenido = respuesta.read()
+                break
+            except OSError as e:
+                self.cerrar()
+                # El pedido ya salió y el servidor pudo haberlo ejecutado:
+                # repetir un préstamo o una devolución la haría dos veces.
+                # Solo se repiten las consultas (GET).
+                if metodo == "GET" and reutilizada and not intento:
+                    continue
+                raise ErrorServidor(f"Se perdió la conexión con el servidor {self.url} antes de la "
+                                    f"respuesta; la operación pudo haberse hecho o no: {e}") from e
+
+        try:
+            return respuesta.status, json.loads(contenido)
+        except ValueError as e:
+            raise ErrorServidor(f"Respuesta inválida del servidor ({respuesta.status})") from e
+
+    def _resultado(self, respuesta):
+        if "error" in respuesta:
+            excepcion = _EXCEPCIONES.get(respuesta.get("tipo"), ErrorServidor)
+            return excepcion(respuesta["error"])
+        return _como_tuplas(respuesta.get("resultado"))
+
+    def llamar(self, operacion, *args, **kwargs):
+        """Ejecutar una operación en el servidor y retornar su resultado"""
+        _, respuesta = self._pedir("POST", f"/operacion/{operacion}", {"args": args, "kwargs": kwargs})
+        resultado = self._resultado(respuesta)
+        if isinstance(resultado, Exception):
+            raise resultado
+        return resultado
+
+    def lote(self, operaciones):
+        """Ejecutar varias operaciones en un solo pedido, en orden.
+
+        Cada operación es una tupla (nombre, *args) o, para pasar argumentos
+        por nombre, un diccionario {"operacion", "args", "kwargs"}. Retorna un
+        resultado por operación; las que fallaron traen la excepción en
+        lugar del resultado (no se lanza).
+        """
+        pedido = []
+        for operacion in operaciones:
+            if not isinstance(operacion, dict):
+                nombre, *args = operacion
+                operacion = {"operacion": nombre, "args": args}
+            pedido.append(operacion)
+
+        codigo, respuesta = self._pedir("POST", "/lote", {"operaciones": pedido})
+        if codigo != 200:
+            raise ErrorServidor(respuesta.get("error", f"Error {codigo} del servidor"))
+        return [self._resultado(r) for r in respuesta["resultados"]]
+
+    def estado(self):
+        """Estado del servidor y operaciones que ofrece"""
+        codigo, respuesta = self._pedir("GET", "/estado")
+        if codigo != 200:
+            raise ErrorServidor(respuesta.get("error", f"Error {codigo} del servidor"))
+        return respuesta
+
+    def exportar(self, directorio, consultas=None, formato="csv"):
+        """Exportar consultas en el servidor y guardarlas en ``directorio``.
+
+        Mismos argumentos y resultado que exportador.exportar: un
+        diccionario nombre -> (ruta, filas). El ZIP del servidor se descarga
+        a un archivo temporal y se extrae recién cuando llegó completo.
+        """
+        ruta = "/exportar?" + urlencode({"formato": formato, "consultas": ",".join(consultas or [])})
+        with tempfile.TemporaryFile() as archivo:
+            codigo, respuesta = self._pedir("GET", ruta, archivo=archivo)
+            if codigo != 200:
+                error = self._resultado(respuesta)
+                raise error if isinstance(error, Exception) else ErrorServidor(f"Error {codigo} del servidor")
+            os.makedirs(directorio, exist_ok=True)
+            with zipfile.ZipFile(archivo) as archivo_zip:
+                archivo_zip.extractall(directorio)
+        return {
+            nombre: (os.path.join(directorio, f"{nombre.lower()}.{formato}"), filas)
+            for nombre, filas in respuesta.items()
+        }
+
+    def cerrar(self):
+        """Cerrar la conexión del hilo actual (se vuelve a abrir en el próximo pedido)"""
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is not None:
+            conexion.close()
+            self._local.conexion = None
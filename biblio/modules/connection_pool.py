@@ -0,0 +1,192 @@
+# connection_pool.py - Pool de conexiones SQLite compartido entre managers
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from . import db_config
+from . import mantenimiento
+
+# Orden de aplicación: busy_timeout primero para que el cambio de journal_mode
+# espere si otro proceso tiene la base bloqueada
+_ORDEN_PRAGMAS = ("busy_timeout", "journal_mode", "synchronous", "cache_size", "mmap_size", "temp_store")
+
+class ConnectionPool:
+    """Pool de conexiones de larga vida para un archivo de base de datos.
+
+    Todos los managers que trabajan sobre el mismo archivo comparten un único
+    pool (ver ``ConnectionPool.obtener``). Cada conexión se presta a un solo
+    hilo a la vez, por lo que el pool puede usarse desde varios hilos.
+    """
+
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    def __init__(self, db_name, max_conexiones=None, perfil=None, timeout=30.0):
+        if db_name in ("", ":memory:"):
+            # Cada conexión del pool tendría su propia base, vacía
+            raise ValueError(f"El pool necesita un archivo de base de datos, no '{db_name}' "
+                             f"(para pruebas, usar un archivo temporal)")
+        self.db_name = db_name
+        self.max_conexiones = max_conexiones or db_config.MAX_CONEXIONES
+        self.perfil = perfil or db_config.PERFIL_POR_DEFECTO
+        self.pragmas = db_config.obtener_perfil(self.perfil)
+        self.timeout = timeout
+        self._disponibles = queue.LifoQueue()
+        self._creadas = 0
+        self._lock = threading.Lock()
+        # Perfil aplicado a cada conexión viva
+        self._perfil_aplicado = {}
+        # Conexión prestada -> hilo que la tiene (para interrumpir sus consultas)
+        self._prestadas = {}
+
+    @classmethod
+    def obtener(cls, db_name, max_conexiones=None, perfil=None):
+        """Obtener el pool compartido para un archivo de base de datos.
+        
+        ``perfil`` solo se usa al crear el pool; para cambiar el perfil de un
+        pool existente usar ``cambiar_perfil``.
+        """
+        clave = os.path.abspath(db_name)
+        with cls._pools_lock:
+            pool = cls._pools.get(clave)
+            if pool is None:
+                pool = cls(db_name, max_conexiones, perfil)
+                cls._pools[clave] = pool
+            return pool
+
+    @classmethod
+    def interrumpir_hilo(cls, hilo):
+        """Interrumpir las consultas en curso de las conexiones prestadas a un hilo.
+        
+        La consulta interrumpida falla con sqlite3.OperationalError
+        ('interrupted'); si era parte de una transacción, se deshace.
+        """
+        with cls._pools_lock:
+            pools = list(cls._pools.values())
+        for pool in pools:
+            pool.interrumpir(hilo)
+
+    @classmethod
+    def cerrar_todos(cls):
+        """Cerrar todas las conexiones de todos los pools"""
+        with cls._pools_lock:
+            pools = list(cls._pools.values())
+            cls._pools.clear()
+        for pool in pools:
+            pool.cerrar()
+
+    def _crear_conexion(self):
+        """Crear una nueva conexión física"""
+        return sqlite3.connect(self.db_name, check_same_thread=False)
+
+    def _aplicar_perfil(self, conn):
+        """Aplicar los PRAGMAs del perfil actual a una conexión"""
+        for nombre in _ORDEN_PRAGMAS:
+            if nombre == "journal_mode" and not conn.execute("PRAGMA page_count").fetchone()[0]:
+                # Archivo recién creado: auto_vacuum solo se puede elegir antes de
+                # escribir la primera página (después exige un VACUUM completo)
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            if nombre in self.pragmas:
+                conn.execute(f"PRAGMA {nombre} = {self.pragmas[nombre]}").fetchall()
+        self._perfil_aplicado[conn] = self.perfil
+        return conn
+
+    def cambiar_perfil(self, perfil):
+        """Cambiar el perfil del pool; cada conexión lo adopta la próxima vez que se presta"""
+        self.pragmas = db_config.obtener_perfil(perfil)
+        self.perfil = perfil
+
+    def adquirir(self):
+        """Tomar una conexión del pool (crea una nueva si hay cupo)"""
+        conn = self._tomar()
+        if self._perfil_aplicado.get(conn) != self.perfil:
+            try:
+                self._aplicar_perfil(conn)
+            except Exception:
+                self._descartar(conn)
+                raise
+        with self._lock:
+            self._prestadas[conn] = threading.get_ident()
+        return conn
+
+    def _descartar(self, conn):
+        """Cerrar una conexión y liberar su cupo"""
+        self._perfil_aplicado.pop(conn, None)
+        with self._lock:
+            self._creadas -= 1
+        conn.close()
+
+    def _tomar(self):
+        """Obtener una conexión ociosa o crear una nueva"""
+        try:
+            return self._disponibles.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._creadas < self.max_conexiones:
+                self._creadas += 1
+                crear = True
+            else:
+                crear = False
+
+        if crear:
+            try:
+                return self._crear_conexion()
+            except Exception:
+                with self._lock:
+                    self._creadas -= 1
+                raise
+
+        try:
+            return self._disponibles.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No hay conexiones libres en el pool de '{self.db_name}'")
+
+    def liberar(self, conn):
+        """Devolver una conexión al pool, descartando transacciones pendientes"""
+        with self._lock:
+            self._prestadas.pop(conn, None)
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Conexión inutilizable: se descarta y se libera su cupo
+            self._descartar(conn)
+            return
+        self._disponibles.put(conn)
+
+    def interrumpir(self, hilo):
+        """Interrumpir las consultas de las conexiones de este pool prestadas a un hilo"""
+        # Con el lock tomado ninguna de ellas puede volver al pool y prestarse a otro hilo
+        with self._lock:
+            for conn, dueño in self._prestadas.items():
+                if dueño == hilo:
+                    conn.interrupt()
+
+    @contextmanager
+    def conexion(self):
+        """Context manager que presta una conexión y la devuelve al terminar"""
+        conn = self.adquirir()
+        try:
+            yield conn
+        finally:
+            self.liberar(conn)
+
+    def cerrar(self, optimizar=False):
+        """Cerrar las conexiones ociosas del pool.
+        
+        Con ``optimizar`` cada conexión ejecuta antes PRAGMA optimize (ver
+        mantenimiento.py), que usa las consultas que hizo para decidir qué
+        estadísticas actualizar.
+        """
+        while True:
+            try:
+                conn = self._disponibles.get_nowait()
+            except queue.Empty:
+                break
+            if optimizar:
+                mantenimiento.optimizar(conn)
+            self._descartar(conn)
@@ -1,79 +1,507 @@
 # database_manager.py - Clase base para el manejo de la base de datos
 
+import functools
+import inspect
 import sqlite3
+import time
+from contextlib import contextmanager
+from itertools import islice
 from . import sqlstatement as sql
+from . import query_metrics
+from . import bloqueos
+from . import mantenimiento
+from .cache_consultas import CacheConsultas
+from .connection_pool import ConnectionPool
+from .schema_migrations import asegurar_esquema
+from .db_config import TAMAÑO_PAGINA, TAMAÑO_LOTE, OPTIMIZAR_AL_CERRAR
+
+def remota(metodo):
+    """Marcar una operación que puede atenderse en el servidor de la biblioteca.
+    
+    Si el manager tiene un ``cliente`` (ver cliente_api.py), la llamada se
+    envía al servidor con el nombre del método y sus argumentos; si no, se
+    ejecuta sobre el archivo local. El servidor expone exactamente los
+    métodos marcados así.
+    """
+    @functools.wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        if self.cliente is not None:
+            return self.cliente.llamar(metodo.__name__, *args, **kwargs)
+        return metodo(self, *args, **kwargs)
+    envoltura.remota = True
+    return envoltura
+
+class _CursorMedido:
+    """Cursor que registra en query_metrics la duración de cada execute y
+    anota las tablas escritas para invalidar la caché al confirmar"""
+    
+    def __init__(self, cursor, cache):
+        self._cursor = cursor
+        self._cache = cache
+        self.escrituras = []
+    
+    def execute(self, query, params=()):
+        self.escrituras.append(self._cache.analizar(self._cursor.connection, query, params))
+        inicio = time.perf_counter()
+        try:
+            self._cursor.execute(query, params)
+        except sqlite3.Error as e:
+            query_metrics.registrar(query, time.perf_counter() - inicio, error=e, params=params)
+            raise
+        query_metrics.registrar(query, time.perf_counter() - inicio,
+                                max(self._cursor.rowcount, 0), params=params)
+        return self
+    
+    def __iter__(self):
+        return iter(self._cursor)
+    
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
 
 class DatabaseManager:
     """Clase base para manejar operaciones comunes de base de datos"""
     
-    def __init__(self, db_name="biblioteca.db"):
+    # TrabajadorDB de la interfaz (lo asigna main.py); sin él, en_segundo_plano
+    # ejecuta todo en el hilo que llama, como necesitan los scripts
+    trabajador = None
+    
+    # ClienteBiblioteca cuando la base la atiende un servidor (BIBLIO_SERVIDOR);
+    # las operaciones marcadas con @remota se envían a él
+    cliente = None
+    
+    def __init__(self, db_name="biblioteca.db", perfil=None):
         self.db_name = db_name
+        self._perfil = perfil
+        self._pool = None
+        if self.cliente is None:
+            # Sin servidor el pool se obtiene ya: un perfil inválido falla aquí
+            self._pool = ConnectionPool.obtener(db_name, perfil=perfil)
+        # Caché de resultados, también compartida por archivo
+        self.cache = CacheConsultas.obtener(db_name)
         self.init_database()
     
+    @property
+    def pool(self):
+        """Pool compartido por todos los managers que usan el mismo archivo.
+        
+        Se obtiene al usarlo por primera vez, con el perfil de PRAGMAs de
+        db_config (BIBLIO_DB_PERFIL) si no se indicó uno. Con un servidor el
+        mostrador no abre el archivo: usarlo lanza RuntimeError en lugar de
+        crear una base vacía o tomar bloqueos sobre la carpeta compartida.
+        """
+        if self._pool is None:
+            if self.cliente is not None:
+                raise RuntimeError(f"Con el servidor {self.cliente.url} el mostrador no abre "
+                                   f"'{self.db_name}'; la operación debe atenderla el servidor")
+            self._pool = ConnectionPool.obtener(self.db_name, perfil=self._perfil)
+        return self._pool
+    
     def init_database(self):
-        """Inicializar la base de datos y crear las tablas"""
+        """Inicializar la base de datos aplicando las migraciones pendientes.
+        
+        El esquema se verifica una sola vez por proceso y por archivo; las
+        llamadas siguientes (un manager por módulo) no tocan la base. Con un
+        servidor el esquema lo mantiene él.
+        """
+        if self.cliente is not None:
+            return
         try:
-            conn = sqlite3.connect(self.db_name)
-            cursor = conn.cursor()
-            
-            # Crear tablas
-            cursor.execute(sql.CREATE_TABLE_AUTORES)
-            cursor.execute(sql.CREATE_TABLE_LIBROS)
-            cursor.execute(sql.CREATE_TABLE_PRESTAMOS)
-            
-            conn.commit()
-            conn.close()
-            print("✅ Base de datos inicializada correctamente")
+            aplicadas = asegurar_esquema(self.pool)
+            if aplicadas:
+                print(f"✅ Base de datos migrada a la versión {aplicadas[-1]}")
+            elif aplicadas is not None:
+                print("✅ Base de datos inicializada correctamente")
         except Exception as e:
             print(f"❌ Error al inicializar la base de datos: {e}")
     
+    def en_segundo_plano(self, funcion, *args, al_terminar=None, al_fallar=None, clave=None,
+                         cancelable=True):
+        """Ejecutar ``funcion(*args)`` en el trabajador y pasar el resultado a ``al_terminar``.
+        
+        Los callbacks corren en el hilo de la interfaz (ver trabajador_db.py);
+        si ``al_terminar`` es un generador se avanza de a partes en cada
+        cuadro. Sin trabajador todo se ejecuta en el acto. Por defecto un
+        error se muestra con el _set_status del manager.
+        """
+        if al_fallar is None:
+            al_fallar = lambda e: getattr(self, '_set_status', print)(f"Error: {e}")
+        if self.trabajador is not None:
+            return self.trabajador.enviar(funcion, *args, al_terminar=al_terminar, al_fallar=al_fallar,
+                                          clave=clave, cancelable=cancelable)
+        try:
+            resultado = funcion(*args)
+        except Exception as e:
+            al_fallar(e)
+            return None
+        if al_terminar is not None:
+            salida = al_terminar(resultado)
+            if inspect.isgenerator(salida):
+                for _ in salida:
+                    pass
+        return None
+    
     def get_connection(self):
-        """Obtener una conexión a la base de datos"""
+        """Obtener una conexión independiente (fuera del pool) a la base de datos"""
         return sqlite3.connect(self.db_name)
     
-    def execute_query(self, query, params=None):
-        """Ejecutar una consulta SELECT y retornar resultados"""
+    def cerrar_conexiones(self):
+        """Cerrar las conexiones del pool compartido (llamar al salir de la aplicación).
+        
+        Antes de cerrarlas actualiza las estadísticas que hagan falta con
+        PRAGMA optimize (OPTIMIZAR_AL_CERRAR).
+        """
+        if self._pool is not None:
+            self._pool.cerrar(optimizar=OPTIMIZAR_AL_CERRAR)
+    
+    def execute_query(self, query, params=None, usar_cache=True):
+        """Ejecutar una consulta SELECT y retornar resultados.
+        
+        Con la caché activa, el resultado de una consulta que solo lee se
+        reutiliza mientras no se escriba ninguna de las tablas que lee (ver
+        cache_consultas.py). Los aciertos no se registran en query_metrics.
+        ``usar_cache=False`` lee siempre de la base (verificaciones). Si la base
+        sigue bloqueada después de los reintentos lanza ErrorBloqueo.
+        """
+        usar_cache = usar_cache and self.cache.activa
+        if usar_cache:
+            results = self.cache.obtener_resultado(query, params)
+            if results is not None:
+                return results
+        
+        inicio = time.perf_counter()
+        
+        def consultar():
+            with self.pool.conexion() as conn:
+                analisis = self.cache.analizar(conn, query, params) if usar_cache else None
+                versiones = None
+                if analisis is not None and analisis.cacheable:
+                    versiones = self.cache.versiones(analisis.leidas)
+                cursor = conn.cursor()
+                
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+                
+                return cursor.fetchall(), analisis, versiones
+        
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-            
-            results = cursor.fetchall()
-            conn.close()
+            results, analisis, versiones = bloqueos.con_reintentos(consultar)
+            query_metrics.registrar(query, time.perf_counter() - inicio, len(results), params=params)
+            if analisis is not None and analisis.cacheable:
+                self.cache.guardar(query, params, results, versiones)
             return results
+        except bloqueos.ErrorBloqueo as e:
+            # Una lista vacía se confundiría con "no hay datos"
+            query_metrics.registrar(query, time.perf_counter() - inicio, error=e, params=params)
+            raise
         except Exception as e:
+            query_metrics.registrar(query, time.perf_counter() - inicio, error=e, params=params)
             print(f"❌ Error ejecutando consulta: {e}")
             return []
     
+    def iter_query(self, query, params=None, tamaño_lote=None):
+        """Iterar los resultados de una consulta SELECT sin materializarlos.
+        
+        Las filas se leen con fetchmany de a ``tamaño_lote``, por lo que la
+        memoria no crece con el tamaño del resultado. La conexión queda
+        prestada hasta que el iterador se agota o se cierra (``close()`` o un
+        ``break`` dentro del for). A diferencia de execute_query, los errores
+        se propagan: un resultado truncado en silencio no sirve para exportar.
+        """
+        tamaño_lote = tamaño_lote or TAMAÑO_LOTE
+        # Solo se mide el tiempo dentro de SQLite, no el del consumidor
+        medido = 0.0
+        leidas = 0
+        error = None
+        
+        with self.pool.conexion() as conn:
+            cursor = conn.cursor()
+            try:
+                inicio = time.perf_counter()
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+                
+                while True:
+                    filas = cursor.fetchmany(tamaño_lote)
+                    medido += time.perf_counter() - inicio
+                    if not filas:
+                        break
+                    leidas += len(filas)
+                    yield from filas
+                    inicio = time.perf_counter()
+            except sqlite3.Error as e:
+                error = e
+                raise
+            finally:
+                cursor.close()
+                query_metrics.registrar(query, medido, leidas, error=error, params=params)
+    
     def execute_command(self, command, params=None):
-        """Ejecutar un comando INSERT, UPDATE o DELETE"""
+        """Ejecutar un comando INSERT, UPDATE o DELETE y retornar las filas afectadas.
+        
+        Toma el bloqueo de escritura al empezar y, si otro puesto lo tiene,
+        reintenta con pausas al azar (ver bloqueos.py). Un comando que falla
+        por otro motivo retorna 0; si la base sigue bloqueada después de los
+        reintentos lanza ErrorBloqueo en lugar de perder la escritura.
+        """
+        inicio = time.perf_counter()
+        
+        def escribir():
+            with self.pool.conexion() as conn:
+                analisis = self.cache.analizar(conn, command, params)
+                bloqueos.tomar_escritura(conn)
+                cursor = conn.cursor()
+                
+                if params:
+                    cursor.execute(command, params)
+                else:
+                    cursor.execute(command)
+                
+                conn.commit()
+            return analisis, cursor.rowcount
+        
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            if params:
-                cursor.execute(command, params)
-            else:
-                cursor.execute(command)
-            
-            conn.commit()
-            rows_affected = cursor.rowcount
-            conn.close()
-            return rows_affected
+            analisis, rowcount = bloqueos.con_reintentos(escribir)
+            self.cache.registrar_escritura(analisis)
+            query_metrics.registrar(command, time.perf_counter() - inicio, rowcount, params=params)
+            return rowcount
+        except bloqueos.ErrorBloqueo as e:
+            query_metrics.registrar(command, time.perf_counter() - inicio, error=e, params=params)
+            print(f"❌ Base de datos bloqueada: {e}")
+            raise
         except Exception as e:
+            query_metrics.registrar(command, time.perf_counter() - inicio, error=e, params=params)
             print(f"❌ Error ejecutando comando: {e}")
             return 0
     
+    def obtener_pagina(self, consultas, clave, desde=None, direccion="siguiente", tamaño=None):
+        """Obtener una página de un listado con paginación por clave (keyset).
+        
+        ``consultas`` es la terna (primera, siguiente, anterior) de sentencias;
+        las dos últimas reciben los valores de la clave y el límite. ``clave``
+        extrae de una fila la tupla por la que se ordena, y ``desde`` es la clave
+        de la última fila (siguiente) o la primera (anterior) de la página actual.
+        El costo no depende de cuántas páginas se hayan recorrido.
+        """
+        tamaño = tamaño or TAMAÑO_PAGINA
+        primera, siguiente, anterior = consultas
+        
+        if desde is None:
+            direccion = "siguiente"
+            filas = self.execute_query(primera, (tamaño + 1,))
+        elif direccion == "siguiente":
+            filas = self.execute_query(siguiente, (*desde, tamaño + 1))
+        else:
+            filas = self.execute_query(anterior, (*desde, tamaño + 1))
+        return self.armar_pagina(filas, clave, desde, direccion, tamaño)
+    
+    def armar_pagina(self, filas, clave, desde, direccion, tamaño):
+        """Armar el resultado de obtener_pagina a partir de hasta ``tamaño + 1`` filas.
+        
+        Las filas vienen en el orden en que se recorrieron: al revés si la
+        dirección es "anterior". Sirve para listados que no se resuelven con
+        una sola terna de sentencias, como la búsqueda de libros.
+        """
+        # Se pide una fila extra para saber si hay más allá de esta página
+        hay_mas = len(filas) > tamaño
+        filas = filas[:tamaño]
+        
+        if direccion == "anterior":
+            filas.reverse()
+            hay_anterior, hay_siguiente = hay_mas, True
+        else:
+            hay_anterior, hay_siguiente = desde is not None, hay_mas
+        
+        return {
+            'filas': filas,
+            'hay_anterior': hay_anterior,
+            'hay_siguiente': hay_siguiente,
+            'primera': clave(filas[0]) if filas else None,
+            'ultima': clave(filas[-1]) if filas else None,
+        }
+    
+    def execute_many(self, command, filas, tamaño_lote=None):
+        """Ejecutar un comando INSERT, UPDATE o DELETE para muchos juegos de parámetros.
+        
+        ``filas`` puede ser cualquier iterable (incluso un generador); se
+        consume de a ``tamaño_lote`` filas y cada lote se confirma en su
+        propia transacción con executemany. Si un lote falla, se deshace y se
+        reintenta fila por fila para aislar las filas con error; el resto del
+        lote se confirma igual. Un lote que encuentra la base bloqueada se
+        repite entero (ver bloqueos.py); si no se puede, lanza ErrorBloqueo
+        y los lotes anteriores quedan confirmados.
+        
+        Retorna un diccionario con las filas procesadas, las afectadas y la
+        lista de errores como tuplas (índice, parámetros, mensaje).
+        """
+        tamaño_lote = tamaño_lote or TAMAÑO_LOTE
+        resultado = {'procesadas': 0, 'afectadas': 0, 'errores': []}
+        filas = iter(filas)
+        comienzo = time.perf_counter()
+        
+        with self.pool.conexion() as conn:
+            cursor = conn.cursor()
+            analisis = None
+            while True:
+                lote = list(islice(filas, tamaño_lote))
+                if not lote:
+                    break
+                inicio = resultado['procesadas']
+                if analisis is None:
+                    analisis = self.cache.analizar(conn, command, lote[0])
+                
+                afectadas, errores = bloqueos.con_reintentos(
+                    lambda: self._escribir_lote(conn, cursor, command, lote, inicio))
+                resultado['afectadas'] += afectadas
+                resultado['errores'].extend(errores)
+                self.cache.registrar_escritura(analisis)
+                
+                resultado['procesadas'] += len(lote)
+        
+        # Una medición por llamada (todos los lotes), no por fila
+        query_metrics.registrar(command, time.perf_counter() - comienzo, resultado['afectadas'],
+                                error=resultado['errores'][0][2] if resultado['errores'] else None)
+        if resultado['errores']:
+            print(f"⚠️ {len(resultado['errores'])} de {resultado['procesadas']} filas con error")
+        return resultado
+    
+    def _escribir_lote(self, conn, cursor, command, lote, inicio):
+        """Confirmar un lote de execute_many; retorna (afectadas, errores)"""
+        bloqueos.tomar_escritura(conn)
+        try:
+            cursor.executemany(command, lote)
+            conn.commit()
+            return cursor.rowcount, []
+        except sqlite3.Error as e:
+            conn.rollback()
+            if bloqueos.es_bloqueo(e):
+                raise
+        
+        afectadas = 0
+        errores = []
+        bloqueos.tomar_escritura(conn)
+        for indice, params in enumerate(lote, start=inicio):
+            try:
+                cursor.execute(command, params)
+                afectadas += cursor.rowcount
+            except sqlite3.Error as e:
+                if bloqueos.es_bloqueo(e):
+                    conn.rollback()
+                    raise
+                errores.append((indice, params, str(e)))
+        conn.commit()
+        return afectadas, errores
+    
+    @contextmanager
+    def transaccion(self):
+        """Unidad de trabajo: ejecutar varias sentencias en una sola transacción.
+        
+        Abre ``BEGIN IMMEDIATE`` (toma el bloqueo de escritura al inicio, así
+        dos puestos no pueden intercalar lecturas y escrituras) y entrega un
+        cursor. Al salir del bloque hace COMMIT, o ROLLBACK si hubo una excepción.
+        Cada sentencia ejecutada con el cursor se registra en query_metrics, y
+        después del COMMIT se invalidan en la caché las tablas que escribió.
+        Si otro puesto tiene el bloqueo, el BEGIN se reintenta con pausas al
+        azar y, si no se consigue, lanza ErrorBloqueo antes de entrar al bloque.
+        """
+        with self.pool.conexion() as conn:
+            bloqueos.con_reintentos(lambda: bloqueos.tomar_escritura(conn))
+            try:
+                cursor = _CursorMedido(conn.cursor(), self.cache)
+                yield cursor
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        for analisis in cursor.escrituras:
+            self.cache.registrar_escritura(analisis)
+    
+    @contextmanager
+    def lectura_consistente(self):
+        """Instantánea de lectura: entrega una conexión dentro de una transacción de solo lectura.
+        
+        Todas las consultas hechas con la conexión ven los datos tal como
+        estaban al iniciar el bloque. Con journal_mode WAL (perfiles
+        rendimiento y carga_masiva) los escritores no quedan bloqueados
+        mientras dura; con el perfil seguro no pueden confirmar hasta que
+        termine.
+        """
+        with self.pool.conexion() as conn:
+            conn.execute("BEGIN")
+            try:
+                # La instantánea se fija con la primera lectura, no con el BEGIN
+                conn.execute(sql.SELECT_SCHEMA_VERSION).fetchall()
+                yield conn
+            finally:
+                conn.rollback()
+    
+    def explicar_consulta(self, query, params=None):
+        """Obtener el plan de ejecución (EXPLAIN QUERY PLAN) de una consulta"""
+        filas = self.execute_query(f"EXPLAIN QUERY PLAN {query}", params, usar_cache=False)
+        return [fila[3] for fila in filas]
+    
+    def espacio(self):
+        """Páginas en uso y libres de la base y su modo de auto_vacuum (ver mantenimiento.py)"""
+        with self.pool.conexion() as conn:
+            return mantenimiento.espacio(conn)
+    
+    def analizar(self):
+        """Recalcular las estadísticas del planificador (ANALYZE) después de una carga masiva"""
+        with self.pool.conexion() as conn:
+            return mantenimiento.analizar(conn)
+    
+    def vaciar_incremental(self, paginas=None):
+        """Devolver al sistema hasta ``paginas`` páginas libres y retornar el espacio recuperado"""
+        with self.pool.conexion() as conn:
+            return mantenimiento.vaciar_incremental(conn, paginas)
+    
+    @remota
+    def obtener_contadores(self):
+        """Obtener los contadores mantenidos por triggers como diccionario clave -> valor.
+        
+        Claves: 'autores', 'libros', 'prestamos', 'libros.estado:<estado>' y
+        'prestamos.estado:<estado>'. Leerlos no recorre las tablas.
+        """
+        return dict(self.execute_query(sql.SELECT_CONTADORES))
+    
+    def reconstruir_contadores(self):
+        """Recalcular los contadores desde las tablas (si se modificaron sin triggers)"""
+        with self.transaccion() as cursor:
+            cursor.execute(sql.DELETE_CONTADORES)
+            cursor.execute(sql.INSERT_CONTADORES_DESDE_TABLAS)
+    
+    @remota
+    def obtener_libros_mas_prestados(self, limite=10, desde=None, hasta=None):
+        """Obtener (isbn, titulo, autor, total_prestamos) de los libros más prestados.
+        
+        Sin ``desde``/``hasta`` cuenta todo el historial; con ellos, los
+        préstamos entre esos meses 'AAAA-MM' (inclusive; uno solo deja el
+        período abierto por ese extremo). Lee el ranking mantenido por
+        triggers, no agrupa la tabla prestamos.
+        """
+        if desde is None and hasta is None:
+            return self.execute_query(sql.SELECT_LIBROS_MAS_PRESTADOS, (limite,))
+        return self.execute_query(sql.SELECT_LIBROS_MAS_PRESTADOS_PERIODO,
+                                  (desde or "0000-00", hasta or "9999-99", limite))
+    
+    def reconstruir_ranking_prestamos(self):
+        """Recalcular el ranking de préstamos por libro desde la tabla prestamos"""
+        with self.transaccion() as cursor:
+            cursor.execute(sql.DELETE_PRESTAMOS_POR_LIBRO)
+            cursor.execute(sql.DELETE_PRESTAMOS_POR_LIBRO_MES)
+            cursor.execute(sql.INSERT_PRESTAMOS_POR_LIBRO_DESDE_PRESTAMOS)
+            cursor.execute(sql.INSERT_PRESTAMOS_POR_LIBRO_MES_DESDE_PRESTAMOS)
+    
     def verificar_datos(self):
         """Verificar que hay datos en la base de datos"""
         try:
-            count_autores = self.execute_query("SELECT COUNT(*) FROM autores")[0][0]
-            count_libros = self.execute_query("SELECT COUNT(*) FROM libros")[0][0]
-            count_prestamos = self.execute_query("SELECT COUNT(*) FROM prestamos")[0][0]
+            contadores = self.obtener_contadores()
+            count_autores = contadores.get('autores', 0)
+            count_libros = contadores.get('libros', 0)
+            count_prestamos = contadores.get('prestamos', 0)
             
             info = {
                 'autores': count_autores,
@@ -86,4 +514,4 @@ class DatabaseManager:
             
         except Exception as e:
             print(f"❌ Error verificando datos: {e}")
-            return {'autores': 0, 'libros': 0, 'prestamos': 0}
\ No newline at end of file
+            return {'autores': 0, 'libros': 0, 'prestamos': 0}
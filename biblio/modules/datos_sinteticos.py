@@ -0,0 +1,173 @@
+# datos_sinteticos.py - Generación reproducible de datos sintéticos a escala
+
+"""
+Genera autores, libros y préstamos sintéticos para medir la aplicación con
+volúmenes reales. La misma escala y semilla producen siempre los mismos
+datos, así que dos mediciones hechas en distintas versiones del código son
+comparables.
+
+La escala 1 corresponde a 10.000 autores, 1.000.000 de libros y 10.000.000
+de préstamos; cada cantidad puede fijarse por separado. Los préstamos
+cubren AÑOS_HISTORIAL años hasta DIA_REFERENCIA (una fecha fija, no la de
+hoy), con más préstamos en los libros de menor id. Una fracción de los
+libros queda con un préstamo activo, parte de ellos ya vencido.
+
+La carga suspende los triggers de libros y prestamos y al terminar
+reconstruye lo que mantienen (contadores, ranking e índice de búsqueda),
+como el modo masivo de la importación.
+"""
+
+import random
+import time
+from . import sqlstatement as sql
+from .servicios import ServicioLibros
+from .db_config import DIAS_PRESTAMO
+from .fechas import a_dia, formatear
+from .isbn import normalizar_isbn
+
+# Cantidades de la escala 1
+AUTORES_POR_ESCALA = 10_000
+LIBROS_POR_ESCALA = 1_000_000
+PRESTAMOS_POR_ESCALA = 10_000_000
+
+ESCALA_POR_DEFECTO = 0.01
+SEMILLA_POR_DEFECTO = 42
+
+# Último día con préstamos y años de historial hacia atrás
+DIA_REFERENCIA = a_dia("2025-06-30")
+AÑOS_HISTORIAL = 5
+
+# Fracción de libros con un préstamo activo y préstamos por usuario
+FRACCION_ACTIVOS = 0.05
+PRESTAMOS_POR_USUARIO = 20
+
+# Filas por transacción durante la carga
+TAMAÑO_LOTE_CARGA = 50_000
+
+SILABAS = ["ba", "ce", "di", "fo", "gu", "la", "me", "ni", "po", "ru", "sa", "te", "vi", "zo"]
+
+NACIONALIDADES = ["Argentina", "Chilena", "Colombiana", "Española", "Mexicana", "Peruana", "Uruguaya"]
+
+def vocabulario(cantidad=3000, semilla=7):
+    """Generar palabras sintéticas reproducibles para títulos"""
+    rnd = random.Random(semilla)
+    palabras = set()
+    while len(palabras) < cantidad:
+        palabras.add("".join(rnd.choice(SILABAS) for _ in range(rnd.randint(2, 4))))
+    return sorted(palabras)
+
+def cantidades(escala=ESCALA_POR_DEFECTO, autores=None, libros=None, prestamos=None):
+    """Cantidades de autores, libros y préstamos para una escala (al menos uno de cada)"""
+    return {
+        'autores': autores if autores is not None else max(1, round(AUTORES_POR_ESCALA * escala)),
+        'libros': libros if libros is not None else max(1, round(LIBROS_POR_ESCALA * escala)),
+        'prestamos': prestamos if prestamos is not None else max(1, round(PRESTAMOS_POR_ESCALA * escala)),
+    }
+
+def isbn_sintetico(numero):
+    """ISBN-13 del libro número ``numero`` (desde 0) de los datos sintéticos"""
+    return normalizar_isbn(f"{numero:09d}0")
+
+def usuario_sintetico(numero):
+    """Nombre del usuario número ``numero`` de los datos sintéticos"""
+    return f"Usuario {numero:07d}"
+
+def _filas_autores(cantidad, rnd):
+    for i in range(cantidad):
+        yield (f"Nombre{i}", f"Apellido{i}", rnd.choice(NACIONALIDADES),
+               formatear(rnd.randint(a_dia("1900-01-01"), a_dia("1990-12-31"))))
+
+def _filas_libros(cantidad, cantidad_autores, prestados, rnd, palabras):
+    for i in range(cantidad):
+        yield (isbn_sintetico(i), " ".join(rnd.sample(palabras, rnd.randint(2, 5))),
+               rnd.randrange(cantidad_autores) + 1, rnd.randint(1900, 2024),
+               f"Editorial {rnd.randrange(200)}", f"Genero {rnd.randrange(40)}",
+               "Prestado" if i in prestados else "Disponible")
+
+def _libro_popular(cantidad_libros, rnd):
+    """Libro al azar sesgado hacia los primeros: unos pocos concentran los préstamos"""
+    return int(cantidad_libros * rnd.random() ** 3)
+
+def _filas_devueltos(cantidad, cantidad_libros, usuarios, rnd):
+    # Fechas crecientes con el id, como se registran los préstamos reales
+    inicio = DIA_REFERENCIA - AÑOS_HISTORIAL * 365
+    dias = DIA_REFERENCIA - DIAS_PRESTAMO - inicio
+    for k in range(cantidad):
+        fecha = inicio + k * dias // cantidad
+        yield (isbn_sintetico(_libro_popular(cantidad_libros, rnd)),
+               usuario_sintetico(rnd.randrange(usuarios)), fecha, fecha + DIAS_PRESTAMO,
+               fecha + rnd.randint(1, DIAS_PRESTAMO + 10), "Devuelto")
+
+def _filas_activos(elegidos, usuarios, rnd):
+    # Hasta el doble del plazo antes del día de referencia: la mitad ya vencidos
+    for numero in elegidos:
+        fecha = DIA_REFERENCIA - rnd.randrange(2 * DIAS_PRESTAMO)
+        yield (isbn_sintetico(numero), usuario_sintetico(rnd.randrange(usuarios)),
+               fecha, fecha + DIAS_PRESTAMO)
+
+def generar(db_name, escala=ESCALA_POR_DEFECTO, semilla=SEMILLA_POR_DEFECTO,
+            autores=None, libros=None, prestamos=None, on_progreso=None):
+    """Poblar una base vacía con datos sintéticos y retornar un resumen de la carga.
+
+    ``autores``, ``libros`` y ``prestamos`` reemplazan la cantidad que da la
+    escala. ``on_progreso`` recibe el nombre de cada etapa al comenzarla.
+    Lanza ValueError si la base ya tiene autores o libros.
+    """
+    total = cantidades(escala, autores, libros, prestamos)
+    rnd = random.Random(semilla)
+    palabras = vocabulario()
+    avisar = on_progreso or (lambda etapa: None)
+
+    manager = ServicioLibros(db_name)
+    contadores = manager.obtener_contadores()
+    if contadores.get('autores', 0) or contadores.get('libros', 0):
+        raise ValueError(f"La base '{db_name}' ya tiene datos; los datos sintéticos "
+                         f"se generan sobre una base vacía")
+
+    activos = min(round(total['libros'] * FRACCION_ACTIVOS), total['prestamos'])
+    elegidos = rnd.sample(range(total['libros']), activos)
+    prestados = set(elegidos)
+    usuarios = max(1, total['prestamos'] // PRESTAMOS_POR_USUARIO)
+
+    perfil_anterior = manager.pool.perfil
+    inicio = time.perf_counter()
+    manager.pool.cambiar_perfil("carga_masiva")
+    with manager.transaccion() as cursor:
+        triggers = cursor.execute(sql.SELECT_TRIGGERS_CARGA).fetchall()
+        for nombre, _ in triggers:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+    try:
+        avisar("autores")
+        manager.execute_many(sql.INSERT_AUTOR, _filas_autores(total['autores'], rnd),
+                             tamaño_lote=TAMAÑO_LOTE_CARGA)
+        avisar("libros")
+        manager.execute_many(sql.INSERT_LIBRO,
+                             _filas_libros(total['libros'], total['autores'], prestados, rnd, palabras),
+                             tamaño_lote=TAMAÑO_LOTE_CARGA)
+        avisar("prestamos")
+        manager.execute_many(sql.INSERT_PRESTAMO_DEVUELTO,
+                             _filas_devueltos(total['prestamos'] - activos, total['libros'], usuarios, rnd),
+                             tamaño_lote=TAMAÑO_LOTE_CARGA)
+        manager.execute_many(sql.INSERT_PRESTAMO, _filas_activos(elegidos, usuarios, rnd),
+                             tamaño_lote=TAMAÑO_LOTE_CARGA)
+    finally:
+        avisar("triggers")
+        with manager.transaccion() as cursor:
+            for _, trigger in triggers:
+                cursor.execute(trigger)
+        manager.reconstruir_contadores()
+        manager.reconstruir_ranking_prestamos()
+        avisar("busqueda")
+        manager.reconstruir_indice_busqueda()
+        avisar("estadisticas")
+        manager.analizar()
+        manager.pool.cambiar_perfil(perfil_anterior)
+
+    return {
+        **total,
+        'activos': activos,
+        'usuarios': usuarios,
+        'escala': escala,
+        'semilla': semilla,
+        'segundos': time.perf_counter() - inicio,
+    }
@@ -0,0 +1,177 @@
+# db_config.py - Configuración de la base de datos de la biblioteca
+
+"""
+Valores configurables de la capa de datos. Cada valor puede sobreescribirse
+con una variable de entorno (indicada junto a cada constante) sin tocar el
+código.
+"""
+
+import os
+
+# ================================
+# PERFILES DE RENDIMIENTO (PRAGMA)
+# ================================
+
+# Cada perfil se aplica a todas las conexiones del pool al crearlas.
+# cache_size negativo = KiB; mmap_size y busy_timeout en bytes y milisegundos.
+#
+# journal_mode WAL necesita memoria compartida entre los procesos que abren
+# el archivo, así que todos deben estar en la misma máquina: no sirve para un
+# biblioteca.db en una carpeta compartida por varios puestos. Además el modo
+# queda grabado en el archivo y lo adopta el próximo que lo abra. Por eso
+# los perfiles con WAL son para el servidor (servidor_biblioteca.py) o para
+# una base que usa un solo equipo.
+PERFILES_PRAGMA = {
+    # Valores por defecto de SQLite: máxima durabilidad, sin concurrencia
+    # lectora; el único seguro con el archivo en una carpeta compartida
+    "seguro": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "cache_size": -2000,
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+        "busy_timeout": 5000,
+    },
+    # Servidor o un solo equipo: lectores concurrentes (WAL) y un fsync por checkpoint
+    "rendimiento": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    # Importaciones sobre una base "seguro": mismo journal y fsync, pero con la
+    # caché grande que necesitan los índices de libros al crecer
+    "importacion": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "cache_size": -256000,
+        "mmap_size": 0,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    # Importaciones y datos de prueba en el equipo que tiene el archivo: sin fsync, caché grande
+    "carga_masiva": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -256000,
+        "mmap_size": 1024 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 30000,
+    },
+}
+
+# Milisegundos que SQLite espera un bloqueo antes de fallar con "database is
+# locked"; reemplaza el busy_timeout de todos los perfiles (BIBLIO_BUSY_TIMEOUT_MS)
+BUSY_TIMEOUT_MS = os.environ.get("BIBLIO_BUSY_TIMEOUT_MS")
+BUSY_TIMEOUT_MS = int(BUSY_TIMEOUT_MS) if BUSY_TIMEOUT_MS else None
+
+# Reintentos de una operación que encontró la base bloqueada, con esperas
+# crecientes al azar entre ESPERA_BASE_REINTENTO_MS y ESPERA_MAX_REINTENTO_MS
+# (BIBLIO_REINTENTOS_BLOQUEO; 0 para fallar al primer bloqueo)
+REINTENTOS_BLOQUEO = int(os.environ.get("BIBLIO_REINTENTOS_BLOQUEO", "5"))
+ESPERA_BASE_REINTENTO_MS = float(os.environ.get("BIBLIO_ESPERA_REINTENTO_MS", "20"))
+ESPERA_MAX_REINTENTO_MS = float(os.environ.get("BIBLIO_ESPERA_MAX_REINTENTO_MS", "1000"))
+
+# Perfil usado cuando el manager no indica uno (BIBLIO_DB_PERFIL); "rendimiento"
+# solo si ningún otro equipo abre el archivo
+PERFIL_POR_DEFECTO = os.environ.get("BIBLIO_DB_PERFIL", "seguro")
+
+# Máximo de conexiones abiertas por archivo de base de datos (BIBLIO_DB_MAX_CONEXIONES)
+MAX_CONEXIONES = int(os.environ.get("BIBLIO_DB_MAX_CONEXIONES", "5"))
+
+# Filas por página en los listados paginados (BIBLIO_TAMANO_PAGINA)
+TAMAÑO_PAGINA = int(os.environ.get("BIBLIO_TAMANO_PAGINA", "50"))
+
+# Filas pedidas por fetchmany en las consultas iteradas (BIBLIO_TAMANO_LOTE)
+TAMAÑO_LOTE = int(os.environ.get("BIBLIO_TAMANO_LOTE", "1000"))
+
+# Filas por transacción al importar catálogos: cada lote toma el bloqueo de
+# escritura alrededor de un segundo cada 10.000 filas, y los lotes chicos multiplican los
+# COMMIT y las fusiones del índice de búsqueda (BIBLIO_LOTE_IMPORTACION)
+TAMAÑO_LOTE_IMPORTACION = int(os.environ.get("BIBLIO_LOTE_IMPORTACION", "10000"))
+
+# Días de préstamo hasta el vencimiento (BIBLIO_DIAS_PRESTAMO)
+DIAS_PRESTAMO = int(os.environ.get("BIBLIO_DIAS_PRESTAMO", "15"))
+
+# Caché de resultados de execute_query (BIBLIO_CACHE=0 para desactivarla)
+CACHE_ACTIVA = os.environ.get("BIBLIO_CACHE", "1") != "0"
+
+# Máximo de consultas guardadas y de filas entre todas ellas
+# (BIBLIO_CACHE_ENTRADAS, BIBLIO_CACHE_FILAS)
+CACHE_MAX_ENTRADAS = int(os.environ.get("BIBLIO_CACHE_ENTRADAS", "256"))
+CACHE_MAX_FILAS = int(os.environ.get("BIBLIO_CACHE_FILAS", "50000"))
+
+# Segundos que vale una entrada aunque ninguna escritura local la invalide;
+# acota cuánto tarda en verse lo que escriben otros procesos (BIBLIO_CACHE_TTL, 0 = sin límite)
+CACHE_TTL_SEGUNDOS = float(os.environ.get("BIBLIO_CACHE_TTL", "30"))
+
+# Hilos de fondo que ejecutan las consultas de la interfaz; cada uno usa una
+# conexión del pool mientras trabaja (BIBLIO_HILOS_TRABAJADOR)
+HILOS_TRABAJADOR = int(os.environ.get("BIBLIO_HILOS_TRABAJADOR", "2"))
+
+# Milisegundos por cuadro que la interfaz dedica a mostrar resultados del
+# trabajador; a 60 cuadros por segundo un cuadro dura 16,7 ms (BIBLIO_PRESUPUESTO_CUADRO_MS)
+PRESUPUESTO_CUADRO_MS = float(os.environ.get("BIBLIO_PRESUPUESTO_CUADRO_MS", "8"))
+
+# Registro de latencia por sentencia (BIBLIO_METRICAS=0 para desactivarlo)
+METRICAS_ACTIVAS = os.environ.get("BIBLIO_METRICAS", "1") != "0"
+
+# Sentencias más lentas que este umbral van al registro de consultas lentas (BIBLIO_UMBRAL_LENTA_MS)
+UMBRAL_CONSULTA_LENTA_MS = float(os.environ.get("BIBLIO_UMBRAL_LENTA_MS", "100"))
+
+# Archivo del registro de consultas lentas; vacío (por defecto) para no
+# escribirlo. Conviene una ruta absoluta: una relativa depende de la carpeta
+# desde la que se ejecuta cada script (BIBLIO_LOG_CONSULTAS_LENTAS)
+ARCHIVO_CONSULTAS_LENTAS = os.environ.get("BIBLIO_LOG_CONSULTAS_LENTAS", "")
+
+# Escribir los valores de los parámetros en el registro de consultas lentas;
+# incluyen datos personales como el nombre de quien pide un libro, así que por
+# defecto solo se anota cuántos son (BIBLIO_LOG_PARAMETROS=1 para escribirlos)
+REGISTRAR_PARAMETROS = os.environ.get("BIBLIO_LOG_PARAMETROS", "0") == "1"
+
+# PRAGMA optimize sobre cada conexión del pool al cerrarlo (BIBLIO_OPTIMIZAR_AL_CERRAR=0 para no hacerlo)
+OPTIMIZAR_AL_CERRAR = os.environ.get("BIBLIO_OPTIMIZAR_AL_CERRAR", "1") != "0"
+
+# Filas que PRAGMA optimize examina por índice al actualizar estadísticas;
+# acota lo que tarda el cierre (BIBLIO_LIMITE_ANALISIS, 0 = todas)
+LIMITE_ANALISIS = int(os.environ.get("BIBLIO_LIMITE_ANALISIS", "1000"))
+
+# Segundos sin consultas de la interfaz antes de cada paso de vacío
+# incremental (BIBLIO_REPOSO_MANTENIMIENTO)
+REPOSO_MANTENIMIENTO_S = float(os.environ.get("BIBLIO_REPOSO_MANTENIMIENTO", "3"))
+
+# Páginas libres que devuelve cada paso; el bloqueo de escritura dura unos
+# 30 ms cada 1000 páginas (BIBLIO_VACIO_PAGINAS, 0 para no hacerlo en reposo)
+PAGINAS_VACIO_POR_PASO = int(os.environ.get("BIBLIO_VACIO_PAGINAS", "1024"))
+
+# URL del servidor de la biblioteca (servidor_biblioteca.py); vacía para usar
+# el archivo directamente (BIBLIO_SERVIDOR, p. ej. http://192.168.0.10:8765)
+SERVIDOR_URL = os.environ.get("BIBLIO_SERVIDOR", "")
+
+# Puerto por defecto del servidor (BIBLIO_SERVIDOR_PUERTO)
+SERVIDOR_PUERTO = int(os.environ.get("BIBLIO_SERVIDOR_PUERTO", "8765"))
+
+# Clave compartida entre el servidor y los mostradores; vacía para no pedirla (BIBLIO_SERVIDOR_CLAVE)
+SERVIDOR_CLAVE = os.environ.get("BIBLIO_SERVIDOR_CLAVE", "")
+
+# Perfil del servidor: es el único proceso que abre el archivo, en su propia
+# máquina, así que puede usar WAL (BIBLIO_SERVIDOR_PERFIL)
+SERVIDOR_PERFIL = os.environ.get("BIBLIO_SERVIDOR_PERFIL", "rendimiento")
+
+# Segundos que un mostrador espera la respuesta del servidor (BIBLIO_SERVIDOR_ESPERA)
+SERVIDOR_TIEMPO_ESPERA = float(os.environ.get("BIBLIO_SERVIDOR_ESPERA", "30"))
+
+# Operaciones como máximo por pedido de lote
+MAX_OPERACIONES_LOTE = 1000
+
+def obtener_perfil(nombre=None):
+    """Obtener el diccionario de PRAGMAs de un perfil por nombre"""
+    nombre = nombre or PERFIL_POR_DEFECTO
+    if nombre not in PERFILES_PRAGMA:
+        raise ValueError(f"Perfil de base de datos desconocido: '{nombre}' "
+                         f"(opciones: {', '.join(PERFILES_PRAGMA)})")
+    if BUSY_TIMEOUT_MS is not None:
+        return {**PERFILES_PRAGMA[nombre], "busy_timeout": BUSY_TIMEOUT_MS}
+    return PERFILES_PRAGMA[nombre]
@@ -0,0 +1,121 @@
+# exportador.py - Exportación en streaming de consultas de sqlstatement.py (CSV / JSONL)
+
+"""
+Exporta el resultado de cualquier consulta SELECT con nombre de
+sqlstatement.py (por ejemplo SELECT_ALL_LIBROS) a un archivo CSV o JSONL.
+Las filas se leen con fetchmany y se escriben a medida que llegan, así que
+la memoria no depende de la cantidad de filas. Todas las consultas de una
+misma exportación se leen desde una única instantánea (ver
+DatabaseManager.lectura_consistente). Las fechas de préstamos, guardadas
+como número de día, se escriben como 'AAAA-MM-DD'.
+"""
+
+import csv
+import json
+import os
+from . import sqlstatement as sql
+from . import fechas
+from .db_config import TAMAÑO_LOTE
+
+FORMATOS = ("csv", "jsonl")
+
+# Exportación por defecto: catálogo, autores e historial completo de préstamos
+CONSULTAS_POR_DEFECTO = ("SELECT_ALL_AUTORES", "SELECT_ALL_LIBROS", "SELECT_ALL_PRESTAMOS")
+
+def consultas_exportables():
+    """Nombres de las consultas SELECT de sqlstatement.py que no llevan parámetros"""
+    return sorted(
+        nombre for nombre, valor in vars(sql).items()
+        if nombre.startswith("SELECT_") and isinstance(valor, str) and "?" not in valor
+    )
+
+def obtener_consulta(nombre):
+    """Obtener el SQL de una consulta exportable por nombre"""
+    if nombre not in consultas_exportables():
+        raise ValueError(f"Consulta no exportable: '{nombre}' "
+                         f"(debe ser un SELECT_* de sqlstatement.py sin parámetros)")
+    return getattr(sql, nombre)
+
+def _escribir_csv(archivo, columnas, filas):
+    escritor = csv.writer(archivo)
+    escritor.writerow(columnas)
+    escritor.writerows(filas)
+
+def _escribir_jsonl(archivo, columnas, filas):
+    for fila in filas:
+        archivo.write(json.dumps(dict(zip(columnas, fila)), ensure_ascii=False, default=str))
+        archivo.write("\n")
+
+def _filas(cursor, tamaño_lote):
+    """Iterar un cursor de a tamaño_lote filas"""
+    while True:
+        lote = cursor.fetchmany(tamaño_lote)
+        if not lote:
+            break
+        yield from lote
+
+def _formatear_fechas(filas, indices):
+    """Convertir a 'AAAA-MM-DD' las columnas de número de día indicadas"""
+    for fila in filas:
+        fila = list(fila)
+        for i in indices:
+            fila[i] = fechas.formatear(fila[i], None)
+        yield fila
+
+def exportar_consulta(conn, nombre, ruta, formato="csv", tamaño_lote=None):
+    """Exportar una consulta a un archivo usando la conexión dada; retorna las filas escritas.
+
+    El archivo se escribe con un nombre temporal y se renombra al terminar,
+    para no dejar exportaciones a medias con el nombre final.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de exportación desconocido: '{formato}' "
+                         f"(opciones: {', '.join(FORMATOS)})")
+    escribir = _escribir_csv if formato == "csv" else _escribir_jsonl
+
+    cursor = conn.execute(obtener_consulta(nombre))
+    columnas = [descripcion[0] for descripcion in cursor.description]
+    indices_fecha = [i for i, columna in enumerate(columnas) if columna in fechas.COLUMNAS_DIA]
+    contador = {'filas': 0}
+
+    def contar(filas):
+        for fila in filas:
+            contador['filas'] += 1
+            yield fila
+
+    temporal = f"{ruta}.tmp"
+    try:
+        with open(temporal, "w", newline="", encoding="utf-8") as archivo:
+            filas = _filas(cursor, tamaño_lote or TAMAÑO_LOTE)
+            if indices_fecha:
+                filas = _formatear_fechas(filas, indices_fecha)
+            escribir(archivo, columnas, contar(filas))
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    finally:
+        cursor.close()
+    return contador['filas']
+
+def exportar(db_manager, directorio, consultas=None, formato="csv", tamaño_lote=None):
+    """Exportar varias consultas a ``directorio`` desde una misma instantánea.
+
+    Cada consulta se escribe en ``<nombre en minúsculas>.<formato>``.
+    Retorna un diccionario nombre -> (ruta, filas). Si el manager tiene un
+    cliente (BIBLIO_SERVIDOR), las lee el servidor y se descargan.
+    """
+    consultas = consultas or CONSULTAS_POR_DEFECTO
+    for nombre in consultas:
+        obtener_consulta(nombre)
+    if db_manager.cliente is not None:
+        return db_manager.cliente.exportar(directorio, consultas, formato)
+    os.makedirs(directorio, exist_ok=True)
+
+    resultado = {}
+    with db_manager.lectura_consistente() as conn:
+        for nombre in consultas:
+            ruta = os.path.join(directorio, f"{nombre.lower()}.{formato}")
+            resultado[nombre] = (ruta, exportar_consulta(conn, nombre, ruta, formato, tamaño_lote))
+    return resultado
@@ -0,0 +1,45 @@
+# fechas.py - Fechas de préstamos guardadas como número de día
+
+"""
+Las fechas de prestamos (fecha_prestamo, fecha_devolucion y
+fecha_vencimiento) se guardan como enteros: días transcurridos desde el
+1970-01-01 (esquema v9). Un entero ocupa 2 o 3 bytes en la fila contra los
+10 del texto 'AAAA-MM-DD', se compara sin ordenar cadenas y la diferencia
+entre dos fechas es una resta.
+
+Los managers trabajan con números de día; el texto 'AAAA-MM-DD' solo se
+arma al mostrar o exportar una fecha (``formatear``). En SQL el mismo
+número se convierte con ``date(dia * 86400, 'unixepoch')``.
+"""
+
+from datetime import date, timedelta
+
+_EPOCA = date(1970, 1, 1)
+
+# Columnas de prestamos guardadas como número de día
+COLUMNAS_DIA = ("fecha_prestamo", "fecha_devolucion", "fecha_vencimiento")
+
+def a_dia(fecha):
+    """Número de día de una fecha (date, 'AAAA-MM-DD' o un número de día); None queda None"""
+    if fecha is None or isinstance(fecha, int):
+        return fecha
+    if isinstance(fecha, str):
+        fecha = date.fromisoformat(fecha[:10])
+    return (fecha - _EPOCA).days
+
+def a_fecha(dia):
+    """date correspondiente a un número de día"""
+    return _EPOCA + timedelta(days=dia)
+
+def formatear(dia, vacio=""):
+    """Texto 'AAAA-MM-DD' de un número de día, o ``vacio`` si es None"""
+    if dia is None:
+        return vacio
+    return a_fecha(dia).isoformat()
+
+def hoy():
+    """Número de día de la fecha actual"""
+    return a_dia(date.today())
+
+# Clave inicial de las paginaciones por (fecha, id): menor que cualquier día guardado
+DIA_MINIMO = a_dia(date.min)
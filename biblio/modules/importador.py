@@ -0,0 +1,261 @@
+# importador.py - Importación en streaming de catálogos de editoriales (CSV / JSONL)
+
+"""
+Lee el archivo registro por registro (nunca lo carga entero en memoria),
+resuelve los autores por nombre con un diccionario en memoria construido con
+ServicioAutores y da de alta o actualiza los libros por ISBN (normalizado a
+ISBN-13) en lotes de ``tamaño_lote`` filas, cada uno en su propia transacción.
+
+Cada lote se escribe con una sentencia para todo el lote, y el índice de
+búsqueda (libros_fts) también se actualiza una vez por lote en lugar de fila
+por fila con sus triggers: es lo que más tardaba. Los demás puestos siguen
+viendo el índice al día después de cada lote.
+
+Columnas reconocidas (encabezado del CSV o claves del objeto JSON):
+isbn y titulo (obligatorias), autor (nombre completo) o bien autor_nombre y
+autor_apellido, año_publicacion, editorial y genero.
+"""
+
+import csv
+import json
+import os
+import sqlite3
+import time
+from . import sqlstatement as sql
+from . import bloqueos
+from .servicios import ServicioAutores, clave_autor
+from .db_config import TAMAÑO_LOTE_IMPORTACION
+from .isbn import normalizar_isbn
+from .schema_migrations import TRIGGERS_BUSQUEDA_LIBROS
+
+FORMATOS = ("csv", "jsonl")
+
+# Rechazos que se guardan en el resultado; el resto solo se cuenta (y se
+# escribe en el archivo de rechazos si se indicó uno)
+MAX_RECHAZOS_EN_RESULTADO = 1000
+
+# Triggers de libros_fts que dispararía un UPSERT; mientras se escribe un lote
+# se reemplazan por la actualización del índice para todo el lote
+_TRIGGERS_FTS_LOTE = ("trg_libros_fts_insert", "trg_libros_fts_update")
+
+def leer_registros(ruta, formato=None):
+    """Generar (número de línea, registro) a partir del archivo.
+
+    Las líneas JSONL que no son un objeto válido se entregan con registro None.
+    """
+    formato = formato or os.path.splitext(ruta)[1].lstrip(".").lower()
+    if formato == "csv":
+        with open(ruta, newline="", encoding="utf-8-sig") as archivo:
+            lector = csv.DictReader(archivo)
+            for registro in lector:
+                yield lector.line_num, registro
+    elif formato in ("jsonl", "ndjson"):
+        with open(ruta, encoding="utf-8") as archivo:
+            for numero, linea in enumerate(archivo, start=1):
+                if not linea.strip():
+                    continue
+                try:
+                    registro = json.loads(linea)
+                except json.JSONDecodeError:
+                    registro = None
+                yield numero, registro if isinstance(registro, dict) else None
+    else:
+        raise ValueError(f"Formato de importación desconocido: '{formato}' "
+                         f"(opciones: {', '.join(FORMATOS)})")
+
+def _texto(registro, campo):
+    """Valor de texto de un campo, None si falta o está vacío"""
+    valor = registro.get(campo)
+    if valor is None:
+        return None
+    valor = str(valor).strip()
+    return valor or None
+
+def normalizar_registro(registro):
+    """Validar un registro y convertirlo en (isbn, titulo, autor, año, editorial, genero).
+
+    ``autor`` es una tupla (nombre, apellido) o None. Lanza ValueError con el
+    motivo del rechazo si el registro no es válido.
+    """
+    if registro is None:
+        raise ValueError("registro con formato inválido")
+
+    isbn = _texto(registro, "isbn")
+    titulo = _texto(registro, "titulo")
+    if not isbn or not titulo:
+        raise ValueError("ISBN y título son obligatorios")
+    isbn = normalizar_isbn(isbn)
+
+    año = _texto(registro, "año_publicacion")
+    if año is not None:
+        try:
+            año = int(año)
+        except ValueError:
+            raise ValueError(f"año de publicación inválido: '{año}'")
+
+    nombre = _texto(registro, "autor_nombre")
+    apellido = _texto(registro, "autor_apellido")
+    if not (nombre or apellido):
+        # "Gabriel García Márquez" -> ("Gabriel", "García Márquez")
+        completo = _texto(registro, "autor")
+        if completo:
+            nombre, _, apellido = completo.partition(" ")
+    autor = (nombre or "", apellido or "") if (nombre or apellido) else None
+
+    return isbn, titulo, autor, año, _texto(registro, "editorial"), _texto(registro, "genero")
+
+class ImportadorCatalogo:
+    """Importación de un archivo de catálogo a la tabla libros"""
+
+    def __init__(self, db_name="biblioteca.db", tamaño_lote=None, masivo=False):
+        self.autores = ServicioAutores(db_name)
+        self.tamaño_lote = tamaño_lote or TAMAÑO_LOTE_IMPORTACION
+        self.masivo = masivo
+
+    # ================================
+    # ÍNDICE DE BÚSQUEDA EN MODO MASIVO
+    # ================================
+
+    def _suspender_indice_busqueda(self):
+        """Quitar los triggers de libros_fts; se reconstruye completo al terminar"""
+        with self.autores.transaccion() as cursor:
+            for nombre in TRIGGERS_BUSQUEDA_LIBROS:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+
+    def _restaurar_indice_busqueda(self):
+        """Reconstruir libros_fts y volver a crear sus triggers en una transacción"""
+        with self.autores.transaccion() as cursor:
+            cursor.execute(sql.DELETE_LIBROS_FTS)
+            cursor.execute(sql.INSERT_LIBROS_FTS_FROM_LIBROS)
+            for trigger in TRIGGERS_BUSQUEDA_LIBROS.values():
+                cursor.execute(trigger)
+
+    # ================================
+    # IMPORTACIÓN
+    # ================================
+
+    def _procesar_lote(self, lote, mapa_autores, resultado, rechazar):
+        """Crear los autores nuevos del lote y dar de alta o actualizar sus libros"""
+        nuevos = {}
+        for _, (_, _, autor, _, _, _) in lote:
+            if autor is not None:
+                clave = clave_autor(" ".join(autor))
+                if clave not in mapa_autores and clave not in nuevos:
+                    nuevos[clave] = autor
+        if nuevos:
+            ids = self.autores.crear_autores(nuevos.values())
+            mapa_autores.update(zip(nuevos, ids))
+            resultado['autores_creados'] += len(ids)
+
+        filas = [
+            (isbn, titulo, mapa_autores[clave_autor(" ".join(autor))] if autor else None,
+             año, editorial, genero)
+            for _, (isbn, titulo, autor, año, editorial, genero) in lote
+        ]
+        try:
+            resultado['importadas'] += self._escribir_lote(filas)
+            return
+        except sqlite3.Error as e:
+            if isinstance(e, bloqueos.ErrorBloqueo) or bloqueos.es_bloqueo(e):
+                raise
+        # Alguna fila viola una restricción: el lote se repite fila por fila
+        # (con los triggers de libros_fts) para rechazar solo esas
+        escritura = self.autores.execute_many(sql.UPSERT_LIBRO, filas, tamaño_lote=len(filas))
+        resultado['importadas'] += escritura['afectadas']
+        for indice, _, mensaje in escritura['errores']:
+            rechazar(lote[indice][0], mensaje)
+
+    def _escribir_lote(self, filas):
+        """Dar de alta o actualizar un lote de libros en una transacción; retorna los escritos.
+
+        Dentro de la transacción se quitan los triggers de libros_fts, el
+        índice se actualiza con una sentencia para todo el lote y los
+        triggers se vuelven a crear antes del COMMIT: ningún otro puesto ve
+        la base sin ellos. En modo masivo ya no están y el índice se
+        reconstruye al final.
+        """
+        with self.autores.transaccion() as cursor:
+            cursor.execute(sql.CREATE_LOTE_IMPORTACION)
+            cursor.execute(sql.DELETE_LOTE_IMPORTACION)
+            cursor.executemany(sql.INSERT_LOTE_IMPORTACION, filas)
+            if not self.masivo:
+                for nombre in _TRIGGERS_FTS_LOTE:
+                    cursor.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+                cursor.execute(sql.DELETE_LIBROS_FTS_LOTE)
+            cursor.execute(sql.UPSERT_LIBROS_LOTE)
+            escritos = cursor.rowcount
+            if not self.masivo:
+                cursor.execute(sql.INSERT_LIBROS_FTS_LOTE)
+                for nombre in _TRIGGERS_FTS_LOTE:
+                    cursor.execute(TRIGGERS_BUSQUEDA_LIBROS[nombre])
+            cursor.execute(sql.DELETE_LOTE_IMPORTACION)
+        return escritos
+
+    def importar(self, ruta, formato=None, archivo_rechazos=None, on_progreso=None):
+        """Importar el archivo y retornar un resumen de la importación.
+
+        ``archivo_rechazos`` (opcional) recibe un CSV con la línea y el motivo
+        de cada registro rechazado. ``on_progreso`` se llama después de cada
+        lote con el resultado parcial.
+        """
+        resultado = {
+            'leidas': 0, 'importadas': 0, 'autores_creados': 0,
+            'rechazadas': 0, 'rechazos': [], 'segundos': 0.0, 'filas_por_segundo': 0.0,
+            'analisis_ms': 0.0,
+        }
+        salida_rechazos = open(archivo_rechazos, "w", newline="", encoding="utf-8") if archivo_rechazos else None
+        escritor_rechazos = csv.writer(salida_rechazos) if salida_rechazos else None
+        if escritor_rechazos:
+            escritor_rechazos.writerow(["linea", "motivo"])
+
+        def rechazar(linea, motivo):
+            resultado['rechazadas'] += 1
+            if len(resultado['rechazos']) < MAX_RECHAZOS_EN_RESULTADO:
+                resultado['rechazos'].append((linea, motivo))
+            if escritor_rechazos:
+                escritor_rechazos.writerow([linea, motivo])
+
+        perfil_anterior = self.autores.pool.perfil
+        inicio = time.perf_counter()
+        try:
+            mapa_autores = self.autores.obtener_mapa_autores()
+            if self.masivo:
+                self.autores.pool.cambiar_perfil("carga_masiva")
+                self._suspender_indice_busqueda()
+            elif perfil_anterior == "seguro":
+                self.autores.pool.cambiar_perfil("importacion")
+
+            lote = []
+            for linea, registro in leer_registros(ruta, formato):
+                resultado['leidas'] += 1
+                try:
+                    lote.append((linea, normalizar_registro(registro)))
+                except ValueError as e:
+                    rechazar(linea, str(e))
+                    continue
+
+                if len(lote) >= self.tamaño_lote:
+                    self._procesar_lote(lote, mapa_autores, resultado, rechazar)
+                    lote = []
+                    if on_progreso:
+                        on_progreso(resultado)
+
+            if lote:
+                self._procesar_lote(lote, mapa_autores, resultado, rechazar)
+        finally:
+            if self.masivo:
+                print("🔍 Reconstruyendo índice de búsqueda...")
+                self._restaurar_indice_busqueda()
+            self.autores.pool.cambiar_perfil(perfil_anterior)
+            if salida_rechazos:
+                salida_rechazos.close()
+
+        resultado['segundos'] = time.perf_counter() - inicio
+        if resultado['segundos'] > 0:
+            resultado['filas_por_segundo'] = resultado['importadas'] / resultado['segundos']
+
+        # Después de al menos un lote completo las estadísticas del
+        # planificador ya no describen el catálogo (ver mantenimiento.py)
+        if resultado['importadas'] >= self.tamaño_lote:
+            resultado['analisis_ms'] = self.autores.analizar()
+        return resultado
@@ -0,0 +1,37 @@
+# isbn.py - Normalización de ISBN a ISBN-13
+
+"""
+Desde el esquema v10 la columna libros.isbn guarda el ISBN normalizado a
+ISBN-13: solo los 13 dígitos, sin guiones ni espacios, y los ISBN-10 se
+convierten con el prefijo 978. Así '978-84-376-0494-7', '9788437604947' y
+'84-376-0494-0' son el mismo libro para el índice único. Todo ISBN que
+llega de la interfaz o de una importación pasa por ``normalizar_isbn``
+antes de llegar a la base.
+"""
+
+def _digito_control_13(digitos):
+    """Dígito de control de los primeros 12 dígitos de un ISBN-13"""
+    suma = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digitos[:12]))
+    return str((10 - suma % 10) % 10)
+
+def normalizar_isbn(texto):
+    """ISBN-13 de 13 dígitos para un ISBN-10 o ISBN-13 con o sin guiones.
+
+    Lanza ValueError si el texto no tiene la forma de un ISBN. El dígito de
+    control de un ISBN-13 no se verifica (hay catálogos con ISBN internos).
+    """
+    limpio = "".join(c for c in str(texto or "") if c not in "- ").upper()
+    if len(limpio) == 13 and limpio.isdigit():
+        return limpio
+    if len(limpio) == 10 and limpio[:9].isdigit() and (limpio[9].isdigit() or limpio[9] == "X"):
+        base = "978" + limpio[:9]
+        return base + _digito_control_13(base)
+    raise ValueError(f"ISBN inválido: '{texto}'")
+
+def clave_isbn(texto):
+    """ISBN con el que buscar un libro: el normalizado si se puede y si no el
+    texto sin espacios (libros anteriores al esquema v10 con ISBN no estándar)"""
+    try:
+        return normalizar_isbn(texto)
+    except ValueError:
+        return str(texto or "").strip()
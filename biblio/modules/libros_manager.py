@@ -1,16 +1,33 @@
 # libros_manager.py - Módulo para la gestión de libros
 
 import dearpygui.dearpygui as dpg
-from .database_manager import DatabaseManager
+from .servicios import ServicioLibros
 from .autores_manager import AutoresManager
-from . import sqlstatement as sql
+from .paginador import crear_paginador, actualizar_paginador
+from .isbn import clave_isbn
 
-class LibrosManager(DatabaseManager):
-    """Clase para manejar todas las operaciones relacionadas con libros"""
+# Colores del estado en la tabla de libros
+COLOR_PRESTADO = (255, 0, 0)
+COLOR_DISPONIBLE = (0, 255, 0)
+COLOR_OTRO_ESTADO = (255, 255, 255)
+
+def color_estado(estado):
+    """Color con el que se muestra el estado de un libro"""
+    estado = (estado or "").lower()
+    if estado == "prestado":
+        return COLOR_PRESTADO
+    if estado == "disponible":
+        return COLOR_DISPONIBLE
+    return COLOR_OTRO_ESTADO
+
+class LibrosManager(ServicioLibros):
+    """Interfaz de libros: formulario, catálogo paginado y estado sobre ServicioLibros"""
     
     def __init__(self, db_name="biblioteca.db"):
         super().__init__(db_name)
         self.autores_manager = AutoresManager(db_name)
+        # Término de la búsqueda que se está mostrando (None: todo el catálogo)
+        self._termino_libros = None
     
     # ================================
     # OPERACIONES CRUD - LIBROS
@@ -25,174 +42,181 @@ class LibrosManager(DatabaseManager):
         editorial = dpg.get_value("input_libro_editorial")
         genero = dpg.get_value("input_libro_genero")
         
-        if not isbn or not titulo:
-            self._set_status("Error: ISBN y título son obligatorios")
-            return
-        
         # Obtener ID del autor seleccionado
         autor_id = self.autores_manager.obtener_id_autor_seleccionado(combo_selection, "combo_autor_libro")
         
-        try:
-            rows_affected = self.execute_command(
-                sql.INSERT_LIBRO, 
-                (isbn, titulo, autor_id, año, editorial, genero, "Disponible")
-            )
-            
-            if rows_affected > 0:
-                # Limpiar campos
-                dpg.set_value("input_libro_isbn", "")
-                dpg.set_value("input_libro_titulo", "")
-                dpg.set_value("combo_autor_libro", "Sin autor")
-                dpg.set_value("input_libro_año", "")
-                dpg.set_value("input_libro_editorial", "")
-                dpg.set_value("input_libro_genero", "")
-                
-                self._set_status(f"Libro '{titulo}' agregado exitosamente")
-                self.cargar_libros()
-                
-                # Notificar a otros módulos si es necesario
-                if hasattr(self, 'on_libro_added'):
-                    self.on_libro_added()
-            else:
-                self._set_status("Error al agregar libro")
-                
-        except Exception as e:
-            self._set_status(f"Error al agregar libro: {e}")
+        # El servicio valida y normaliza el ISBN; sus errores se muestran en el estado
+        self.en_segundo_plano(
+            self.crear_libro, isbn, titulo, autor_id, año, editorial, genero,
+            al_terminar=lambda isbn_guardado: self._libro_guardado(
+                True, f"Libro '{titulo}' agregado exitosamente", "Error al agregar libro"),
+            cancelable=False
+        )
+    
+    def _libro_guardado(self, guardado, mensaje, mensaje_error):
+        """Actualizar la interfaz después de agregar o actualizar un libro"""
+        if guardado:
+            # Limpiar campos y volver a modo agregar
+            self._reset_formulario_libro()
+            
+            self._set_status(mensaje)
+            self.cargar_libros()
+            
+            # Notificar a otros módulos si es necesario
+            if hasattr(self, 'on_libro_added'):
+                self.on_libro_added()
+        else:
+            self._set_status(mensaje_error)
     
     def cargar_libros(self, sender=None, app_data=None):
-        """Cargar la lista de libros en la tabla"""
+        """Cargar la primera página de libros (o de la búsqueda mostrada) en la tabla"""
+        self._cargar_pagina_libros(numero=1, termino=self._termino_libros)
+    
+    def buscar_en_catalogo(self, sender=None, app_data=None):
+        """Mostrar la primera página de los libros que coinciden con el término buscado.
+        
+        Con el campo vacío vuelve al catálogo completo.
+        """
+        termino = dpg.get_value("input_buscar_libro").strip() or None
+        self._cargar_pagina_libros(numero=1, termino=termino)
+    
+    def pagina_libros_siguiente(self, sender=None, app_data=None):
+        """Mostrar la página siguiente del catálogo o de la búsqueda"""
+        pagina = getattr(self, '_pagina_libros', None)
+        if pagina and pagina['hay_siguiente']:
+            self._cargar_pagina_libros(pagina['ultima'], "siguiente", self._numero_pagina_libros + 1,
+                                       self._termino_libros)
+    
+    def pagina_libros_anterior(self, sender=None, app_data=None):
+        """Mostrar la página anterior del catálogo o de la búsqueda"""
+        pagina = getattr(self, '_pagina_libros', None)
+        if pagina and pagina['hay_anterior']:
+            self._cargar_pagina_libros(pagina['primera'], "anterior", max(1, self._numero_pagina_libros - 1),
+                                       self._termino_libros)
+    
+    def _cargar_pagina_libros(self, desde=None, direccion="siguiente", numero=1, termino=None):
+        """Cargar una página del catálogo, o de la búsqueda de ``termino``, en la tabla"""
         print("📥 Cargando libros...")
         
-        try:
-            # Verificar que la tabla existe
-            if not dpg.does_item_exist("table_libros"):
-                print("❌ ERROR: table_libros no existe!")
-                self._set_status("Error: Tabla no disponible")
-                return
-            
-            # Obtener libros con información de autores
-            libros = self.execute_query(sql.SELECT_LIBROS_WITH_AUTHORS)
-            
-            print(f"📊 Encontrados {len(libros)} libros en la BD")
-            
-            # Limpiar solo las filas de datos, preservando las columnas (igual que autores)
-            # Primero obtenemos todos los hijos de la tabla
-            children = dpg.get_item_children("table_libros", slot=1)  # slot 1 contiene las filas
-            if children:
-                for child in children:
-                    if dpg.get_item_type(child) == "mvAppItemType::mvTableRow":
-                        dpg.delete_item(child)
-            
-            # Agregar datos (sin encabezados, ya están definidos en las columnas)
-            for libro in libros:
-                with dpg.table_row(parent="table_libros"):
-                    dpg.add_text(libro[0])  # isbn
-                    dpg.add_text(libro[1])  # titulo
-                    dpg.add_text(libro[7] or "Sin autor")  # nombre_autor
-                    dpg.add_text(libro[5] or "")  # genero
-                    # Estado con color
-                    estado = libro[6] or ""
-                    if estado.lower() == "prestado":
-                        dpg.add_text(estado, color=(255, 0, 0))  # Rojo
-                    elif estado.lower() == "disponible":
-                        dpg.add_text(estado, color=(0, 255, 0))  # Verde
-                    else:
-                        dpg.add_text(estado)
-                    with dpg.group(horizontal=True):
-                        dpg.add_button(
-                            label=f"Editar##edit_libro_{libro[0]}", 
-                            callback=self.editar_libro,
-                            user_data=libro[0],
-                            width=55
-                        )
-                        dpg.add_button(
-                            label=f"Eliminar##del_libro_{libro[0]}", 
-                            callback=self.eliminar_libro,
-                            user_data=libro[0],
-                            width=65
-                        )
-            
-            print(f"✅ Cargados {len(libros)} libros correctamente")
-            self._set_status(f"Cargados {len(libros)} libros")
-                        
-        except Exception as e:
-            print(f"❌ Error al cargar libros: {e}")
-            self._set_status(f"Error: {e}")
+        # Verificar que la tabla existe
+        if not dpg.does_item_exist("table_libros"):
+            print("❌ ERROR: table_libros no existe!")
+            self._set_status("Error: Tabla no disponible")
+            return
+        
+        # Obtener solo la página pedida, con información de autores, en el
+        # trabajador; las filas de la búsqueda tienen las mismas columnas
+        if termino:
+            consulta, argumentos = self.buscar_libros, (termino, desde, direccion)
+        else:
+            consulta, argumentos = self.obtener_pagina_libros, (desde, direccion)
+        self.en_segundo_plano(consulta, *argumentos,
+                              al_terminar=lambda pagina: self._mostrar_pagina_libros(pagina, numero, termino),
+                              clave="table_libros")
+    
+    def _mostrar_pagina_libros(self, pagina, numero, termino=None):
+        """Agregar la página de libros a la tabla, de a una fila por paso (generador)"""
+        libros = pagina['filas']
+        # Número, cursor y búsqueda cambian juntos al mostrar la página, no al
+        # hacer clic: una carga cancelada por otro clic no los deja desfasados
+        self._pagina_libros = pagina
+        self._numero_pagina_libros = numero
+        self._termino_libros = termino
+        
+        print(f"📊 Página {self._numero_pagina_libros}: {len(libros)} libros")
+        
+        # Limpiar solo las filas de datos, preservando las columnas (igual que autores)
+        dpg.delete_item("table_libros", children_only=True, slot=1)
+        
+        # Agregar datos (sin encabezados, ya están definidos en las columnas)
+        for libro in libros:
+            with dpg.table_row(parent="table_libros"):
+                dpg.add_text(libro[0])  # isbn
+                dpg.add_text(libro[1])  # titulo
+                dpg.add_text(libro[7] or "Sin autor")  # nombre_autor
+                dpg.add_text(libro[5] or "")  # genero
+                # Estado con color (con tag para refrescarlo sin recargar la página)
+                estado = libro[6] or ""
+                dpg.add_text(estado, tag=f"estado_libro_{libro[0]}", color=color_estado(estado))
+                with dpg.group(horizontal=True):
+                    dpg.add_button(
+                        label=f"Editar##edit_libro_{libro[0]}", 
+                        callback=self.editar_libro,
+                        user_data=libro[0],
+                        width=55
+                    )
+                    dpg.add_button(
+                        label=f"Eliminar##del_libro_{libro[0]}", 
+                        callback=self.eliminar_libro,
+                        user_data=libro[0],
+                        width=65
+                    )
+            yield
+        
+        actualizar_paginador("table_libros_paginador", pagina, self._numero_pagina_libros)
+        if termino:
+            self._set_status(f"Búsqueda '{termino}': página {self._numero_pagina_libros} ({len(libros)} libros)")
+        else:
+            self._set_status(f"Página {self._numero_pagina_libros} ({len(libros)} libros)")
     
     def eliminar_libro(self, sender=None, app_data=None, user_data=None):
         """Eliminar un libro (solo si no tiene préstamos activos)"""
         isbn = user_data if user_data is not None else app_data
-        try:
-            # Verificar si tiene préstamos activos
-            count_result = self.execute_query(sql.CHECK_LIBRO_HAS_ACTIVE_LOANS, (isbn,))
-            count = count_result[0][0] if count_result else 0
-            
-            if count > 0:
-                self._set_status("No se puede eliminar: el libro tiene préstamos activos")
-                return
-            
-            # Eliminar libro
-            rows_affected = self.execute_command(sql.DELETE_LIBRO, (isbn,))
-            
-            if rows_affected > 0:
-                self._set_status("Libro eliminado exitosamente")
-                self.cargar_libros()
-                
-                # Notificar a otros módulos si es necesario
-                if hasattr(self, 'on_libro_deleted'):
-                    self.on_libro_deleted()
-            else:
-                self._set_status("Error: No se pudo eliminar el libro")
-            
-        except Exception as e:
-            self._set_status(f"Error al eliminar libro: {e}")
+        self.en_segundo_plano(self.borrar_libro, isbn,
+                              al_terminar=self._libro_eliminado, cancelable=False)
+    
+    def _libro_eliminado(self, rows_affected):
+        """Actualizar la interfaz después de intentar eliminar un libro"""
+        if rows_affected is None:
+            self._set_status("No se puede eliminar: el libro tiene préstamos activos")
+        elif rows_affected > 0:
+            self._set_status("Libro eliminado exitosamente")
+            self.cargar_libros()
+            
+            # Notificar a otros módulos si es necesario
+            if hasattr(self, 'on_libro_deleted'):
+                self.on_libro_deleted()
+        else:
+            self._set_status("Error: No se pudo eliminar el libro")
     
     def editar_libro(self, sender=None, app_data=None, user_data=None):
         """Cargar datos del libro en el formulario para edición"""
         isbn = user_data if user_data is not None else app_data
         print(f"🔍 Editando libro con ISBN: {isbn} (tipo: {type(isbn)})")
         
-        try:
-            # Obtener datos del libro
-            libro = self.execute_query(sql.SELECT_LIBRO_BY_ISBN, (isbn,))
-            
-            if not libro:
-                self._set_status(f"Error: Libro con ISBN '{isbn}' no encontrado")
-                return
-            
-            libro = libro[0]
-            
-            # Cargar datos en los campos del formulario
-            dpg.set_value("input_libro_isbn", libro[0])
-            dpg.configure_item("input_libro_isbn", enabled=False)  # Deshabilitar ISBN en edición
-            dpg.set_value("input_libro_titulo", libro[1])
-            dpg.set_value("input_libro_año", str(libro[4]) if libro[4] else "")
-            dpg.set_value("input_libro_editorial", libro[5] or "")
-            dpg.set_value("input_libro_genero", libro[6] or "")
-            
-            # Seleccionar el autor en el combo
-            autor_id = libro[2]
-            if autor_id:
-                autor_info = self.execute_query(sql.SELECT_AUTOR_BY_ID, (autor_id,))
-                if autor_info:
-                    autor = autor_info[0]
-                    autor_nombre = f"{autor[1]} {autor[2]}"  # nombre apellido
-                    dpg.set_value("combo_autor_libro", autor_nombre)
-            
-            # Cambiar el botón a modo edición
-            dpg.set_item_label("btn_agregar_libro", "Actualizar Libro")
-            dpg.set_item_callback("btn_agregar_libro", self.actualizar_libro)
-            
-            # Mostrar botón de cancelar
-            dpg.show_item("btn_cancelar_edicion")
-            
-            # Guardar el ISBN que se está editando
-            self.libro_editando = isbn
-            
-            self._set_status(f"Editando libro: {libro[1]}")
-            
-        except Exception as e:
-            self._set_status(f"Error al cargar libro para edición: {e}")
+        self.en_segundo_plano(self.obtener_libro_con_autor, isbn,
+                              al_terminar=lambda datos: self._cargar_formulario_libro(isbn, *datos),
+                              clave="formulario_libro")
+    
+    def _cargar_formulario_libro(self, isbn, libro, autor_nombre):
+        """Pasar el formulario a modo edición con los datos del libro"""
+        if not libro:
+            self._set_status(f"Error: Libro con ISBN '{isbn}' no encontrado")
+            return
+        
+        # Cargar datos en los campos del formulario
+        dpg.set_value("input_libro_isbn", libro[0])
+        dpg.configure_item("input_libro_isbn", enabled=False)  # Deshabilitar ISBN en edición
+        dpg.set_value("input_libro_titulo", libro[1])
+        dpg.set_value("input_libro_año", str(libro[4]) if libro[4] else "")
+        dpg.set_value("input_libro_editorial", libro[5] or "")
+        dpg.set_value("input_libro_genero", libro[6] or "")
+        
+        # Seleccionar el autor en el combo
+        if autor_nombre:
+            dpg.set_value("combo_autor_libro", autor_nombre)
+        
+        # Cambiar el botón a modo edición
+        dpg.set_item_label("btn_agregar_libro", "Actualizar Libro")
+        dpg.set_item_callback("btn_agregar_libro", self.actualizar_libro)
+        
+        # Mostrar botón de cancelar
+        dpg.show_item("btn_cancelar_edicion")
+        
+        # Guardar el ISBN que se está editando
+        self.libro_editando = isbn
+        
+        self._set_status(f"Editando libro: {libro[1]}")
     
     def actualizar_libro(self, sender=None, app_data=None):
         """Actualizar un libro existente"""
@@ -203,34 +227,15 @@ class LibrosManager(DatabaseManager):
         editorial = dpg.get_value("input_libro_editorial")
         genero = dpg.get_value("input_libro_genero")
         
-        if not isbn or not titulo:
-            self._set_status("Error: ISBN y título son obligatorios")
-            return
-        
         # Obtener ID del autor seleccionado
         autor_id = self.autores_manager.obtener_id_autor_seleccionado(combo_selection, "combo_autor_libro")
         
-        try:
-            rows_affected = self.execute_command(
-                sql.UPDATE_LIBRO_INFO, 
-                (titulo, autor_id, año, editorial, genero, isbn)
-            )
-            
-            if rows_affected > 0:
-                # Limpiar campos y resetear a modo agregar
-                self._reset_formulario_libro()
-                
-                self._set_status(f"Libro '{titulo}' actualizado exitosamente")
-                self.cargar_libros()
-                
-                # Notificar a otros módulos si es necesario
-                if hasattr(self, 'on_libro_added'):
-                    self.on_libro_added()
-            else:
-                self._set_status("Error al actualizar libro")
-                
-        except Exception as e:
-            self._set_status(f"Error al actualizar libro: {e}")
+        self.en_segundo_plano(
+            self.modificar_libro, isbn, titulo, autor_id, año, editorial, genero,
+            al_terminar=lambda actualizado: self._libro_guardado(
+                actualizado, f"Libro '{titulo}' actualizado exitosamente", "Error al actualizar libro"),
+            cancelable=False
+        )
     
     def _reset_formulario_libro(self):
         """Resetear el formulario a modo agregar"""
@@ -252,43 +257,26 @@ class LibrosManager(DatabaseManager):
         if hasattr(self, 'libro_editando'):
             delattr(self, 'libro_editando')
     
-    def obtener_libros_disponibles_para_combo(self):
-        """Obtener lista de libros disponibles para usar en combo boxes"""
-        try:
-            libros = self.execute_query(sql.SELECT_LIBROS_DISPONIBLES_FOR_COMBO)
-            
-            # Crear lista para el combo
-            items = ["Seleccionar libro..."]
-            valores = [None]
-            
-            for libro in libros:
-                items.append(f"{libro[1]} - {libro[0]}")  # titulo - isbn
-                valores.append(libro[0])  # isbn
-            
-            return items, valores
-            
-        except Exception as e:
-            print(f"❌ Error al obtener libros para combo: {e}")
-            return ["Seleccionar libro..."], [None]
-    
     def actualizar_combo_libros(self, combo_tag="combo_libro_prestamo"):
         """Actualizar el combo box de libros disponibles"""
-        try:
-            items, valores = self.obtener_libros_disponibles_para_combo()
-            
-            if dpg.does_item_exist(combo_tag):
-                dpg.configure_item(combo_tag, items=items)
-                # Guardar los valores para uso posterior
-                setattr(self, f"{combo_tag}_valores", valores)
-            
-        except Exception as e:
-            print(f"❌ Error al actualizar combo libros: {e}")
+        # Sin combo en pantalla no hace falta leer todos los libros disponibles
+        if not dpg.does_item_exist(combo_tag):
+            return
+        
+        self.en_segundo_plano(self.obtener_libros_disponibles_para_combo,
+                              al_terminar=lambda combo: self._llenar_combo(combo_tag, *combo),
+                              clave=combo_tag)
+    
+    def _llenar_combo(self, combo_tag, items, valores):
+        """Mostrar los items en el combo y guardar sus valores como user_data del combo"""
+        if dpg.does_item_exist(combo_tag):
+            dpg.configure_item(combo_tag, items=items, user_data=valores)
     
     def obtener_isbn_libro_seleccionado(self, combo_selection, combo_tag="combo_libro_prestamo"):
-        """Obtener el ISBN del libro seleccionado en un combo"""
+        """Obtener el ISBN del libro seleccionado en un combo (sin consultar la base)"""
         try:
-            valores = getattr(self, f"{combo_tag}_valores", [None])
-            items, _ = self.obtener_libros_disponibles_para_combo()
+            items = dpg.get_item_configuration(combo_tag)['items']
+            valores = dpg.get_item_user_data(combo_tag) or [None]
             
             if combo_selection in items:
                 index = items.index(combo_selection)
@@ -300,23 +288,33 @@ class LibrosManager(DatabaseManager):
             print(f"❌ Error al obtener ISBN de libro: {e}")
             return None
     
+    def actualizar_estado_en_tabla(self, isbn):
+        """Refrescar el estado de un libro en la página visible sin recargarla"""
+        # La celda lleva el ISBN guardado: el texto exacto antes que el
+        # normalizado, como en servicios.isbn_guardado
+        for clave in (str(isbn or "").strip(), clave_isbn(isbn)):
+            tag = f"estado_libro_{clave}"
+            if dpg.does_item_exist(tag):
+                break
+        else:
+            return
+        self.en_segundo_plano(self.obtener_estado_libro, isbn,
+                              al_terminar=lambda estado: self._mostrar_estado(tag, estado),
+                              clave=tag)
+    
+    def _mostrar_estado(self, tag, estado):
+        """Mostrar el estado leído en la celda de la tabla (si sigue en pantalla)"""
+        if dpg.does_item_exist(tag):
+            estado = estado or ""
+            dpg.set_value(tag, estado)
+            dpg.configure_item(tag, color=color_estado(estado))
+    
     def cambiar_estado_libro(self, isbn, nuevo_estado):
-        """Cambiar el estado de un libro (Disponible, Prestado, etc.)"""
-        try:
-            rows_affected = self.execute_command(sql.UPDATE_LIBRO_ESTADO, (nuevo_estado, isbn))
-            
-            if rows_affected > 0:
-                print(f"✅ Estado del libro {isbn} cambiado a '{nuevo_estado}'")
-                self.cargar_libros()
-                self.actualizar_combo_libros()
-                return True
-            else:
-                print(f"❌ No se pudo cambiar el estado del libro {isbn}")
-                return False
-            
-        except Exception as e:
-            print(f"❌ Error al cambiar estado del libro: {e}")
-            return False
+        """Cambiar el estado de un libro y refrescar su celda en la tabla"""
+        cambiado = super().cambiar_estado_libro(isbn, nuevo_estado)
+        if cambiado:
+            self.actualizar_estado_en_tabla(isbn)
+        return cambiado
     
     # ================================
     # INTERFAZ DE USUARIO
@@ -331,6 +329,10 @@ class LibrosManager(DatabaseManager):
         with dpg.group(horizontal=True, parent=parent_tab):
             dpg.add_button(label="Recargar Libros", callback=self.cargar_libros)
             dpg.add_button(label="Actualizar Autores", callback=self._actualizar_combo_autores_libros)
+        with dpg.group(horizontal=True, parent=parent_tab):
+            dpg.add_input_text(tag="input_buscar_libro", hint="Título, género, editorial o autor",
+                               width=300, on_enter=True, callback=self.buscar_en_catalogo)
+            dpg.add_button(label="Buscar Libros", callback=self.buscar_en_catalogo)
         dpg.add_separator(parent=parent_tab)
         
         # Formulario para agregar libros
@@ -350,6 +352,7 @@ class LibrosManager(DatabaseManager):
             # Lista de libros
             with dpg.child_window():
                 dpg.add_text("Lista de Libros:")
+                crear_paginador("table_libros_paginador", self.pagina_libros_anterior, self.pagina_libros_siguiente)
                 with dpg.table(tag="table_libros"):
                     dpg.add_table_column(label="ISBN")
                     dpg.add_table_column(label="Título")
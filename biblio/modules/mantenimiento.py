@@ -0,0 +1,249 @@
+# mantenimiento.py - Estadísticas del planificador y recuperación de espacio
+
+"""
+Tres tareas mantienen la base en forma sin intervención:
+
+- ``optimizar`` (PRAGMA optimize) actualiza las estadísticas de las tablas
+  que las necesitan. DatabaseManager.cerrar_conexiones lo ejecuta sobre
+  cada conexión del pool antes de cerrarla (OPTIMIZAR_AL_CERRAR).
+- ``analizar`` (ANALYZE completo) después de una carga masiva: la
+  importación de catálogos y los datos sintéticos lo llaman al terminar.
+- ``vaciar_incremental`` devuelve al sistema las páginas que quedaron libres
+  por borrados y por las fusiones del índice de búsqueda. En la interfaz lo
+  hace MantenimientoEnReposo de a pasos cortos, solo cuando el trabajador no
+  tiene consultas pendientes.
+
+El vacío incremental necesita auto_vacuum = INCREMENTAL. Las bases nuevas lo
+tienen desde que el pool las crea; una base existente se convierte una vez
+con ``activar_vacio_incremental`` (un VACUUM completo, con la aplicación
+cerrada):
+
+    python mantener_base.py --activar-incremental
+
+El espacio recuperado y el tiempo de cada tarea se acumulan aquí:
+
+    from modules import mantenimiento
+    mantenimiento.imprimir_resumen()
+"""
+
+import sqlite3
+import threading
+import time
+from . import bloqueos, db_config
+
+# Valores de PRAGMA auto_vacuum
+_MODOS_VACIO = {0: "ninguno", 1: "completo", 2: "incremental"}
+
+_lock = threading.Lock()
+_estadisticas = {}
+
+def _reiniciar_estadisticas():
+    _estadisticas.update({
+        'optimizaciones': 0,
+        'optimizacion_ms': 0.0,
+        'analisis': 0,
+        'analisis_ms': 0.0,
+        'pasos_vacio': 0,
+        'paginas_liberadas': 0,
+        'bytes_recuperados': 0,
+    })
+
+_reiniciar_estadisticas()
+
+def _sumar(**valores):
+    with _lock:
+        for clave, valor in valores.items():
+            _estadisticas[clave] += valor
+
+def espacio(conn):
+    """Tamaño de la base: páginas en uso y libres, en páginas y en bytes, y el modo de auto_vacuum"""
+    tamaño_pagina = conn.execute("PRAGMA page_size").fetchone()[0]
+    paginas = conn.execute("PRAGMA page_count").fetchone()[0]
+    libres = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    modo = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    return {
+        'tamaño_pagina': tamaño_pagina,
+        'paginas': paginas,
+        'paginas_libres': libres,
+        'bytes': paginas * tamaño_pagina,
+        'bytes_libres': libres * tamaño_pagina,
+        'auto_vacuum': _MODOS_VACIO.get(modo, str(modo)),
+    }
+
+def optimizar(conn):
+    """Ejecutar PRAGMA optimize sobre una conexión; retorna False si no se pudo.
+
+    Solo analiza las tablas que la conexión consultó y cuyas estadísticas
+    faltan o quedaron viejas, leyendo a lo sumo LIMITE_ANALISIS filas por
+    índice; casi siempre no hace nada y tarda microsegundos. Un error (por
+    ejemplo, otro puesto con el bloqueo de escritura) no se propaga: la
+    próxima vez se vuelve a intentar.
+    """
+    inicio = time.perf_counter()
+    try:
+        conn.execute(f"PRAGMA analysis_limit = {db_config.LIMITE_ANALISIS}").fetchall()
+        conn.execute("PRAGMA optimize").fetchall()
+    except sqlite3.Error as e:
+        print(f"⚠️ No se pudo ejecutar PRAGMA optimize: {e}")
+        return False
+    _sumar(optimizaciones=1, optimizacion_ms=(time.perf_counter() - inicio) * 1000)
+    return True
+
+def analizar(conn):
+    """Recalcular las estadísticas de todas las tablas e índices (ANALYZE).
+
+    Lee cada índice completo; usarlo después de cargas masivas, cuando las
+    estadísticas anteriores ya no describen los datos. Retorna los
+    milisegundos que tardó.
+    """
+    inicio = time.perf_counter()
+    conn.execute("PRAGMA analysis_limit = 0").fetchall()
+    bloqueos.con_reintentos(lambda: conn.execute("ANALYZE"))
+    milisegundos = (time.perf_counter() - inicio) * 1000
+    _sumar(analisis=1, analisis_ms=milisegundos)
+    return milisegundos
+
+def vaciar_incremental(conn, paginas=None):
+    """Devolver al sistema hasta ``paginas`` páginas libres (PRAGMA incremental_vacuum).
+
+    Toma el bloqueo de escritura solo mientras mueve las páginas, así que
+    conviene pedir pocas por vez (PAGINAS_VACIO_POR_PASO). Con journal_mode
+    WAL el archivo se achica en el próximo checkpoint. Retorna un diccionario
+    con las páginas liberadas, los bytes recuperados, las páginas libres que
+    quedan y el modo de auto_vacuum; si la base no usa vacío incremental no
+    hace nada.
+    """
+    paginas = db_config.PAGINAS_VACIO_POR_PASO if paginas is None else paginas
+    antes = espacio(conn)
+    resultado = {
+        'paginas_liberadas': 0,
+        'bytes_recuperados': 0,
+        'paginas_libres': antes['paginas_libres'],
+        'auto_vacuum': antes['auto_vacuum'],
+    }
+    if antes['auto_vacuum'] != "incremental" or not antes['paginas_libres'] or paginas <= 0:
+        return resultado
+
+    def liberar():
+        bloqueos.tomar_escritura(conn)
+        try:
+            # sqlite3 ejecuta un solo paso de las sentencias que no retornan
+            # filas, y cada paso de incremental_vacuum mueve una página
+            for _ in range(min(paginas, antes['paginas_libres'])):
+                conn.execute("PRAGMA incremental_vacuum(1)")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+    bloqueos.con_reintentos(liberar)
+    libres = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    # Otro puesto pudo liberar páginas mientras tanto: no se cuentan negativas
+    liberadas = max(0, antes['paginas_libres'] - libres)
+    resultado.update({
+        'paginas_liberadas': liberadas,
+        'bytes_recuperados': liberadas * antes['tamaño_pagina'],
+        'paginas_libres': libres,
+    })
+    _sumar(pasos_vacio=1, paginas_liberadas=liberadas, bytes_recuperados=resultado['bytes_recuperados'])
+    return resultado
+
+def activar_vacio_incremental(conn):
+    """Pasar una base existente a auto_vacuum = INCREMENTAL y retornar los bytes recuperados.
+
+    El cambio exige reescribir la base con un VACUUM completo, que también
+    devuelve todas las páginas libres. Mientras dura nadie más puede
+    escribir: ejecutarlo con la aplicación cerrada. Si la base ya usa vacío
+    incremental no hace nada y retorna 0.
+    """
+    antes = espacio(conn)
+    if antes['auto_vacuum'] == "incremental":
+        return 0
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    bloqueos.con_reintentos(lambda: conn.execute("VACUUM"))
+    recuperados = max(0, antes['bytes'] - espacio(conn)['bytes'])
+    _sumar(bytes_recuperados=recuperados)
+    return recuperados
+
+class MantenimientoEnReposo:
+    """Vacío incremental de a pasos mientras la interfaz está en reposo.
+
+    main.py llama a ``paso()`` en cada cuadro. Cuando el trabajador lleva
+    REPOSO_MANTENIMIENTO_S segundos sin consultas pendientes, le envía un
+    paso de vaciar_incremental; el cuadro nunca espera a la base. Con un
+    servidor (BIBLIO_SERVIDOR) el archivo no es local y no hace nada.
+    """
+
+    def __init__(self, manager, reposo=None, paginas=None):
+        self.manager = manager
+        self.reposo = db_config.REPOSO_MANTENIMIENTO_S if reposo is None else reposo
+        self.paginas = db_config.PAGINAS_VACIO_POR_PASO if paginas is None else paginas
+        self.activo = self.paginas > 0 and manager.cliente is None
+        # Bytes recuperados desde que la base tuvo páginas libres por última vez
+        self.recuperados = 0
+        self._tarea = None
+        self._desde = time.monotonic()
+
+    def _vaciar(self):
+        with self.manager.pool.conexion() as conn:
+            return vaciar_incremental(conn, self.paginas)
+
+    def _al_terminar(self, resultado):
+        if resultado['auto_vacuum'] != "incremental":
+            self.activo = False
+            if resultado['paginas_libres']:
+                print(f"ℹ️ La base tiene {resultado['paginas_libres']:,} páginas libres pero no usa "
+                      f"vacío incremental (ver mantener_base.py --activar-incremental)")
+            return
+        self.recuperados += resultado['bytes_recuperados']
+        if self.recuperados and not resultado['paginas_libres']:
+            print(f"🧹 Mantenimiento: {self.recuperados / 1024:,.0f} KiB recuperados")
+            self.recuperados = 0
+
+    def _al_fallar(self, error):
+        # Un bloqueo no es grave: se reintenta en el próximo reposo
+        if not isinstance(error, bloqueos.ErrorBloqueo):
+            print(f"⚠️ Mantenimiento en reposo desactivado: {error}")
+            self.activo = False
+
+    def paso(self):
+        """Enviar un paso de vacío si la interfaz está en reposo (llamar una vez por cuadro)"""
+        trabajador = self.manager.trabajador
+        if not self.activo or trabajador is None:
+            return
+        ahora = time.monotonic()
+        if self._tarea is not None:
+            if not self._tarea.terminada():
+                return
+            self._tarea = None
+        if trabajador.ocupado:
+            self._desde = ahora
+            return
+        if ahora - self._desde < self.reposo:
+            return
+        self._tarea = trabajador.enviar(self._vaciar, al_terminar=self._al_terminar,
+                                        al_fallar=self._al_fallar, cancelable=False)
+        self._desde = ahora
+
+def resumen():
+    """Obtener las métricas de mantenimiento del proceso.
+
+    optimizaciones y analisis: PRAGMA optimize y ANALYZE ejecutados, con sus
+    milisegundos; pasos_vacio, paginas_liberadas y bytes_recuperados: vacío
+    incremental (y los VACUUM de activar_vacio_incremental).
+    """
+    with _lock:
+        return dict(_estadisticas)
+
+def imprimir_resumen():
+    """Imprimir las métricas de mantenimiento"""
+    datos = resumen()
+    print(f"📊 {datos['optimizaciones']} PRAGMA optimize ({datos['optimizacion_ms']:.0f} ms), "
+          f"{datos['analisis']} ANALYZE ({datos['analisis_ms']:.0f} ms)")
+    print(f"🧹 {datos['paginas_liberadas']:,} páginas liberadas en {datos['pasos_vacio']} pasos: "
+          f"{datos['bytes_recuperados'] / 1024:,.0f} KiB recuperados")
+
+def reiniciar():
+    """Borrar las métricas acumuladas"""
+    with _lock:
+        _reiniciar_estadisticas()
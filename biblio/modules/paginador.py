@@ -0,0 +1,18 @@
+# paginador.py - Controles de paginación (Anterior / Siguiente) para tablas
+
+import dearpygui.dearpygui as dpg
+
+def crear_paginador(tag, on_anterior, on_siguiente, parent=0):
+    """Crear los botones Anterior/Siguiente y el indicador de página"""
+    with dpg.group(horizontal=True, tag=tag, parent=parent):
+        dpg.add_button(label="< Anterior", tag=f"{tag}_anterior", callback=on_anterior, enabled=False)
+        dpg.add_text("Página 1", tag=f"{tag}_info")
+        dpg.add_button(label="Siguiente >", tag=f"{tag}_siguiente", callback=on_siguiente, enabled=False)
+
+def actualizar_paginador(tag, pagina, numero):
+    """Habilitar los botones según la página mostrada (ver DatabaseManager.obtener_pagina)"""
+    if not dpg.does_item_exist(tag):
+        return
+    dpg.configure_item(f"{tag}_anterior", enabled=pagina['hay_anterior'])
+    dpg.configure_item(f"{tag}_siguiente", enabled=pagina['hay_siguiente'])
+    dpg.set_value(f"{tag}_info", f"Página {numero}")
@@ -1,13 +1,16 @@
 # prestamos_manager.py - Módulo para la gestión de préstamos
 
 import dearpygui.dearpygui as dpg
-from .database_manager import DatabaseManager
+from .servicios import ServicioPrestamos
 from .libros_manager import LibrosManager
-from . import sqlstatement as sql
-from datetime import datetime, date
+from .paginador import crear_paginador, actualizar_paginador
+from . import fechas
 
-class PrestamosManager(DatabaseManager):
-    """Clase para manejar todas las operaciones relacionadas con préstamos"""
+# Color de la fecha de vencimiento de un préstamo activo ya vencido
+COLOR_VENCIDO = (255, 80, 80)
+
+class PrestamosManager(ServicioPrestamos):
+    """Interfaz de préstamos: registro, devoluciones e historial sobre ServicioPrestamos"""
     
     def __init__(self, db_name="biblioteca.db"):
         super().__init__(db_name)
@@ -22,96 +25,98 @@ class PrestamosManager(DatabaseManager):
         isbn = dpg.get_value("input_prestamo_isbn")
         nombre_usuario = dpg.get_value("input_prestamo_usuario")
         
-        if not isbn or not nombre_usuario:
-            self._set_status("Error: ISBN y nombre de usuario son obligatorios")
+        self.en_segundo_plano(
+            self.prestar_libro, isbn, nombre_usuario,
+            al_terminar=lambda prestamo_id: self._prestamo_registrado(prestamo_id, isbn, nombre_usuario),
+            al_fallar=lambda e: self._set_status(f"Error al registrar préstamo: {e}"),
+            cancelable=False
+        )
+    
+    def _prestamo_registrado(self, prestamo_id, isbn, nombre_usuario):
+        """Actualizar la interfaz después de intentar registrar un préstamo"""
+        if prestamo_id is None:
+            self._set_status("Error: El libro no existe o no está disponible")
             return
         
-        # Verificar que el libro existe y está disponible
-        libros_disponibles = self.execute_query(sql.CHECK_LIBRO_DISPONIBLE, (isbn,))
+        # Refrescar solo la fila del libro (si está en la página visible)
+        self.libros_manager.actualizar_estado_en_tabla(isbn)
         
-        if not libros_disponibles:
-            self._set_status("Error: El libro no existe o no está disponible")
-            return
+        # Limpiar campos
+        dpg.set_value("input_prestamo_isbn", "")
+        dpg.set_value("input_prestamo_usuario", "")
         
-        try:
-            fecha_prestamo = datetime.now().strftime('%Y-%m-%d')
-            
-            # Registrar préstamo
-            rows_affected = self.execute_command(
-                sql.INSERT_PRESTAMO, 
-                (isbn, nombre_usuario, fecha_prestamo)
-            )
-            
-            if rows_affected > 0:
-                # Cambiar estado del libro a "Prestado"
-                self.libros_manager.cambiar_estado_libro(isbn, "Prestado")
-                
-                # Limpiar campos
-                dpg.set_value("input_prestamo_isbn", "")
-                dpg.set_value("input_prestamo_usuario", "")
-                
-                self._set_status(f"Préstamo registrado exitosamente para '{nombre_usuario}'")
-                self.cargar_prestamos()
-                
-                # Notificar a otros módulos si es necesario
-                if hasattr(self, 'on_prestamo_added'):
-                    self.on_prestamo_added()
-            else:
-                self._set_status("Error al registrar préstamo")
-                
-        except Exception as e:
-            self._set_status(f"Error al registrar préstamo: {e}")
+        self._set_status(f"Préstamo registrado exitosamente para '{nombre_usuario}'")
+        self.cargar_prestamos()
+        
+        # Notificar a otros módulos si es necesario
+        if hasattr(self, 'on_prestamo_added'):
+            self.on_prestamo_added()
+    
+    def _agregar_celda_devolucion(self, prestamo):
+        """Fecha de devolución, o el vencimiento (en rojo si pasó) si está activo"""
+        if prestamo[4] is not None:
+            dpg.add_text(fechas.formatear(prestamo[4]))
+        elif prestamo[7] is not None and prestamo[7] < fechas.hoy():
+            dpg.add_text(f"Vencido {fechas.formatear(prestamo[7])}", color=COLOR_VENCIDO)
+        else:
+            dpg.add_text(f"Vence {fechas.formatear(prestamo[7], '-')}")
+    
+    def _tabla_prestamos_disponible(self):
+        """Verificar que la tabla de préstamos existe"""
+        if not dpg.does_item_exist("table_prestamos"):
+            print("❌ ERROR: table_prestamos no existe!")
+            self._set_status("Error: Tabla no disponible")
+            return False
+        return True
     
     def cargar_prestamos(self, sender=None, app_data=None):
         """Cargar la lista de préstamos activos en la tabla"""
         print("📥 Cargando préstamos...")
         
-        try:
-            # Verificar que la tabla existe
-            if not dpg.does_item_exist("table_prestamos"):
-                print("❌ ERROR: table_prestamos no existe!")
-                self._set_status("Error: Tabla no disponible")
-                return
-            
-            # Obtener préstamos con información de libros
-            prestamos = self.execute_query(sql.SELECT_PRESTAMOS_WITH_BOOKS)
-            
-            print(f"📊 Encontrados {len(prestamos)} préstamos en la BD")
-            
-            # Limpiar solo las filas de datos, preservando las columnas (igual que autores)
-            # Primero obtenemos todos los hijos de la tabla
-            children = dpg.get_item_children("table_prestamos", slot=1)  # slot 1 contiene las filas
-            if children:
-                for child in children:
-                    if dpg.get_item_type(child) == "mvAppItemType::mvTableRow":
-                        dpg.delete_item(child)
-            
-            # Agregar datos (sin encabezados, ya están definidos en las columnas)
-            for prestamo in prestamos:
-                with dpg.table_row(parent="table_prestamos"):
-                    dpg.add_text(str(prestamo[0]))  # id_prestamo
-                    dpg.add_text(prestamo[1])  # isbn_libro
-                    dpg.add_text(prestamo[6] or "Sin título")  # titulo
-                    dpg.add_text(prestamo[2])  # nombre_usuario
-                    dpg.add_text(prestamo[3] or "")  # fecha_prestamo
-                    dpg.add_text(prestamo[4] or "Pendiente")  # fecha_devolucion
-                    with dpg.group(horizontal=True):
-                        if not prestamo[4]:  # Si no hay fecha de devolución
-                            dpg.add_button(
-                                label=f"Devolver##dev_prestamo_{prestamo[0]}", 
-                                callback=self.devolver_libro,
-                                user_data=(prestamo[0], prestamo[1]),
-                                width=80
-                            )
-                        else:
-                            dpg.add_text("Devuelto", color=(0, 255, 0))
-            
-            print(f"✅ Cargados {len(prestamos)} préstamos correctamente")
-            self._set_status(f"Cargados {len(prestamos)} préstamos")
-                        
-        except Exception as e:
-            print(f"❌ Error al cargar préstamos: {e}")
-            self._set_status(f"Error: {e}")
+        if not self._tabla_prestamos_disponible():
+            return
+        
+        # Obtener préstamos con información de libros en el trabajador
+        self.en_segundo_plano(
+            self.listar_prestamos_activos,
+            al_terminar=lambda prestamos: self._mostrar_prestamos(prestamos, f"Cargados {len(prestamos)} préstamos"),
+            clave="table_prestamos"
+        )
+    
+    def _mostrar_prestamos(self, prestamos, mensaje):
+        """Reemplazar las filas de la tabla de préstamos, de a una por paso (generador).
+        
+        La usan la carga completa y las búsquedas por usuario y por título.
+        """
+        print(f"📊 {len(prestamos)} préstamos para mostrar")
+        
+        # Limpiar solo las filas de datos, preservando las columnas (igual que autores)
+        # de una sola vez (slot 1 = filas): borrarlas de a una tarda cada vez más con miles de filas
+        dpg.delete_item("table_prestamos", children_only=True, slot=1)
+        
+        # Agregar datos (sin encabezados, ya están definidos en las columnas)
+        for prestamo in prestamos:
+            with dpg.table_row(parent="table_prestamos"):
+                dpg.add_text(str(prestamo[0]))  # id_prestamo
+                dpg.add_text(prestamo[1])  # isbn_libro
+                dpg.add_text(prestamo[6] or "Sin título")  # titulo
+                dpg.add_text(prestamo[2])  # nombre_usuario
+                dpg.add_text(fechas.formatear(prestamo[3]))  # fecha_prestamo
+                self._agregar_celda_devolucion(prestamo)  # fecha_devolucion o vencimiento
+                with dpg.group(horizontal=True):
+                    if prestamo[4] is None:  # Si no hay fecha de devolución
+                        dpg.add_button(
+                            label=f"Devolver##dev_prestamo_{prestamo[0]}", 
+                            callback=self.devolver_libro,
+                            user_data=(prestamo[0], prestamo[1]),
+                            width=80
+                        )
+                    else:
+                        dpg.add_text("Devuelto", color=(0, 255, 0))
+            yield
+        
+        print(f"✅ {mensaje}")
+        self._set_status(mensaje)
     
     def devolver_libro(self, sender=None, app_data=None, user_data=None):
         """Registrar la devolución de un libro"""
@@ -127,86 +132,95 @@ class PrestamosManager(DatabaseManager):
             id_prestamo = sender
             isbn_libro = app_data
         
-        try:
-            fecha_devolucion = datetime.now().strftime('%Y-%m-%d')
-            
-            # Actualizar el préstamo con fecha de devolución
-            rows_affected = self.execute_command(
-                sql.UPDATE_PRESTAMO_DEVOLUCION, 
-                (fecha_devolucion, id_prestamo)
-            )
-            
-            # En SQLite, rowcount puede ser -1 para UPDATE, así que verificamos de otra manera
-            # Verificar que la actualización fue exitosa consultando el registro
-            prestamo_actualizado = self.execute_query(
-                "SELECT fecha_devolucion FROM prestamos WHERE id = ?", 
-                (id_prestamo,)
-            )
-            
-            if prestamo_actualizado and prestamo_actualizado[0][0] == fecha_devolucion:
-                # Cambiar estado del libro a "Disponible"
-                self.libros_manager.cambiar_estado_libro(isbn_libro, "Disponible")
-                
-                self._set_status("Libro devuelto exitosamente")
-                self.cargar_prestamos()
-                
-                # Notificar a otros módulos si es necesario
-                if hasattr(self, 'on_prestamo_returned'):
-                    self.on_prestamo_returned()
-            else:
-                self._set_status("Error: No se pudo registrar la devolución")
-            
-        except Exception as e:
-            self._set_status(f"Error al devolver libro: {e}")
+        self.en_segundo_plano(
+            self.devolver_prestamo, id_prestamo,
+            al_terminar=lambda devuelto: self._devolucion_registrada(devuelto, isbn_libro),
+            al_fallar=lambda e: self._set_status(f"Error al devolver libro: {e}"),
+            cancelable=False
+        )
+    
+    def _devolucion_registrada(self, devuelto, isbn_libro):
+        """Actualizar la interfaz después de intentar registrar una devolución"""
+        if not devuelto:
+            self._set_status("Error: No se pudo registrar la devolución")
+            return
+        
+        # Refrescar solo la fila del libro (si está en la página visible)
+        if isbn_libro:
+            self.libros_manager.actualizar_estado_en_tabla(isbn_libro)
+        
+        self._set_status("Libro devuelto exitosamente")
+        self.cargar_prestamos()
+        
+        # Notificar a otros módulos si es necesario
+        if hasattr(self, 'on_prestamo_returned'):
+            self.on_prestamo_returned()
     
     def cargar_historial_prestamos(self, sender=None, app_data=None):
-        """Cargar el historial completo de préstamos"""
+        """Cargar la primera página del historial de préstamos"""
+        self._cargar_pagina_historial(numero=1)
+    
+    def pagina_historial_siguiente(self, sender=None, app_data=None):
+        """Mostrar la página siguiente (préstamos más antiguos) del historial"""
+        pagina = getattr(self, '_pagina_historial', None)
+        if pagina and pagina['hay_siguiente']:
+            self._cargar_pagina_historial(pagina['ultima'], "siguiente", self._numero_pagina_historial + 1)
+    
+    def pagina_historial_anterior(self, sender=None, app_data=None):
+        """Mostrar la página anterior (préstamos más recientes) del historial"""
+        pagina = getattr(self, '_pagina_historial', None)
+        if pagina and pagina['hay_anterior']:
+            self._cargar_pagina_historial(pagina['primera'], "anterior", max(1, self._numero_pagina_historial - 1))
+    
+    def _cargar_pagina_historial(self, desde=None, direccion="siguiente", numero=1):
+        """Cargar una página del historial en la tabla visible"""
         print("📥 Cargando historial de préstamos...")
         
-        try:
-            # Verificar cuál tabla usar (main.py usa "table_historial", ventana separada usa "table_historial_prestamos")
-            table_tag = "table_historial" if dpg.does_item_exist("table_historial") else "table_historial_prestamos"
-            
-            if not dpg.does_item_exist(table_tag):
-                print(f"❌ ERROR: {table_tag} no existe!")
-                self._set_status("Error: Tabla no disponible")
-                return
-            
-            # Obtener historial completo
-            prestamos = self.execute_query(sql.SELECT_HISTORIAL_PRESTAMOS)
-            
-            print(f"📊 Encontrados {len(prestamos)} préstamos en el historial")
-            
-            # Limpiar solo las filas de datos, preservando las columnas (igual que autores)
-            # Primero obtenemos todos los hijos de la tabla
-            children = dpg.get_item_children(table_tag, slot=1)  # slot 1 contiene las filas
-            if children:
-                for child in children:
-                    if dpg.get_item_type(child) == "mvAppItemType::mvTableRow":
-                        dpg.delete_item(child)
-            
-            # Agregar datos (sin encabezados, ya están definidos en las columnas)
-            for prestamo in prestamos:
-                with dpg.table_row(parent=table_tag):
-                    dpg.add_text(str(prestamo[0]))  # id_prestamo
-                    dpg.add_text(prestamo[1])  # isbn_libro
-                    dpg.add_text(prestamo[6] or "Sin título")  # titulo
-                    dpg.add_text(prestamo[2])  # nombre_usuario
-                    dpg.add_text(prestamo[3] or "")  # fecha_prestamo
-                    dpg.add_text(prestamo[4] or "Pendiente")  # fecha_devolucion
-                    
-                    # Estado
-                    if prestamo[4]:  # Si hay fecha de devolución
-                        dpg.add_text("Devuelto", color=(0, 255, 0))
-                    else:
-                        dpg.add_text("Activo", color=(255, 255, 0))
-            
-            print(f"✅ Cargados {len(prestamos)} préstamos del historial")
-            self._set_status(f"Cargados {len(prestamos)} préstamos en el historial")
-                        
-        except Exception as e:
-            print(f"❌ Error al cargar historial: {e}")
-            self._set_status(f"Error: {e}")
+        # Verificar cuál tabla usar (main.py usa "table_historial", ventana separada usa "table_historial_prestamos")
+        table_tag = "table_historial" if dpg.does_item_exist("table_historial") else "table_historial_prestamos"
+        
+        if not dpg.does_item_exist(table_tag):
+            print(f"❌ ERROR: {table_tag} no existe!")
+            self._set_status("Error: Tabla no disponible")
+            return
+        
+        # Obtener solo la página pedida, en el trabajador
+        self.en_segundo_plano(self.obtener_pagina_historial, desde, direccion,
+                              al_terminar=lambda pagina: self._mostrar_pagina_historial(table_tag, pagina, numero),
+                              clave=table_tag)
+    
+    def _mostrar_pagina_historial(self, table_tag, pagina, numero):
+        """Agregar la página del historial a la tabla, de a una fila por paso (generador)"""
+        prestamos = pagina['filas']
+        # Número y cursor cambian juntos al mostrar la página, no al hacer
+        # clic: una carga cancelada por otro clic no los deja desfasados
+        self._pagina_historial = pagina
+        self._numero_pagina_historial = numero
+        
+        print(f"📊 Página {self._numero_pagina_historial}: {len(prestamos)} préstamos del historial")
+        
+        # Limpiar solo las filas de datos, preservando las columnas (igual que autores)
+        dpg.delete_item(table_tag, children_only=True, slot=1)
+        
+        # Agregar datos (sin encabezados, ya están definidos en las columnas)
+        for prestamo in prestamos:
+            with dpg.table_row(parent=table_tag):
+                dpg.add_text(str(prestamo[0]))  # id_prestamo
+                dpg.add_text(prestamo[1])  # isbn_libro
+                dpg.add_text(prestamo[6] or "Sin título")  # titulo
+                dpg.add_text(prestamo[2])  # nombre_usuario
+                dpg.add_text(fechas.formatear(prestamo[3]))  # fecha_prestamo
+                dpg.add_text(fechas.formatear(prestamo[4], "Pendiente"))  # fecha_devolucion
+                
+                # Estado
+                if prestamo[4] is not None:  # Si hay fecha de devolución
+                    dpg.add_text("Devuelto", color=(0, 255, 0))
+                else:
+                    dpg.add_text("Activo", color=(255, 255, 0))
+            yield
+        
+        actualizar_paginador(f"{table_tag}_paginador", pagina, self._numero_pagina_historial)
+        self._set_status(f"Historial: página {self._numero_pagina_historial} ({len(prestamos)} préstamos)")
     
     def buscar_prestamos_por_usuario(self, sender=None, app_data=None):
         """Buscar préstamos por nombre de usuario"""
@@ -216,49 +230,16 @@ class PrestamosManager(DatabaseManager):
             self.cargar_prestamos()
             return
         
-        try:
-            # Verificar que la tabla existe
-            if not dpg.does_item_exist("table_prestamos"):
-                self._set_status("Error: Tabla no disponible")
-                return
-            
-            # Buscar préstamos por usuario
-            prestamos = self.execute_query(sql.SEARCH_PRESTAMOS_BY_USER, (f'%{termino}%',))
-            
-            print(f"📊 Encontrados {len(prestamos)} préstamos para '{termino}'")
-            
-            # Limpiar solo las filas de datos, preservando las columnas (igual que cargar_prestamos)
-            children = dpg.get_item_children("table_prestamos", slot=1)  # slot 1 contiene las filas
-            if children:
-                for child in children:
-                    if dpg.get_item_type(child) == "mvAppItemType::mvTableRow":
-                        dpg.delete_item(child)
-            
-            # Agregar datos filtrados (sin encabezados, ya están definidos en las columnas)
-            for prestamo in prestamos:
-                with dpg.table_row(parent="table_prestamos"):
-                    dpg.add_text(str(prestamo[0]))  # id_prestamo
-                    dpg.add_text(prestamo[1])  # isbn_libro
-                    dpg.add_text(prestamo[6] or "Sin título")  # titulo
-                    dpg.add_text(prestamo[2])  # nombre_usuario
-                    dpg.add_text(prestamo[3] or "")  # fecha_prestamo
-                    dpg.add_text(prestamo[4] or "Pendiente")  # fecha_devolucion
-                    with dpg.group(horizontal=True):
-                        if not prestamo[4]:  # Si no hay fecha de devolución
-                            dpg.add_button(
-                                label=f"Devolver##dev_prestamo_{prestamo[0]}", 
-                                callback=self.devolver_libro,
-                                user_data=(prestamo[0], prestamo[1]),
-                                width=80
-                            )
-                        else:
-                            dpg.add_text("Devuelto", color=(0, 255, 0))
-            
-            self._set_status(f"Encontrados {len(prestamos)} préstamos para '{termino}'")
-            
-        except Exception as e:
-            print(f"❌ Error al buscar préstamos: {e}")
-            self._set_status(f"Error al buscar: {e}")
+        if not self._tabla_prestamos_disponible():
+            return
+        
+        # Buscar préstamos por usuario en el trabajador
+        self.en_segundo_plano(
+            self.filtrar_prestamos_por_usuario, termino,
+            al_terminar=lambda prestamos: self._mostrar_prestamos(
+                prestamos, f"Encontrados {len(prestamos)} préstamos para '{termino}'"),
+            clave="table_prestamos"
+        )
     
     def buscar_prestamos_por_titulo(self, sender=None, app_data=None):
         """Buscar préstamos por título de libro"""
@@ -268,49 +249,16 @@ class PrestamosManager(DatabaseManager):
             self.cargar_prestamos()
             return
         
-        try:
-            # Verificar que la tabla existe
-            if not dpg.does_item_exist("table_prestamos"):
-                self._set_status("Error: Tabla no disponible")
-                return
-            
-            # Buscar préstamos por título
-            prestamos = self.execute_query(sql.SEARCH_PRESTAMOS_BY_TITLE, (f'%{termino}%',))
-            
-            print(f"📊 Encontrados {len(prestamos)} préstamos para el título '{termino}'")
-            
-            # Limpiar solo las filas de datos, preservando las columnas
-            children = dpg.get_item_children("table_prestamos", slot=1)  # slot 1 contiene las filas
-            if children:
-                for child in children:
-                    if dpg.get_item_type(child) == "mvAppItemType::mvTableRow":
-                        dpg.delete_item(child)
-            
-            # Agregar datos filtrados (sin encabezados, ya están definidos en las columnas)
-            for prestamo in prestamos:
-                with dpg.table_row(parent="table_prestamos"):
-                    dpg.add_text(str(prestamo[0]))  # id_prestamo
-                    dpg.add_text(prestamo[1])  # isbn_libro
-                    dpg.add_text(prestamo[6] or "Sin título")  # titulo
-                    dpg.add_text(prestamo[2])  # nombre_usuario
-                    dpg.add_text(prestamo[3] or "")  # fecha_prestamo
-                    dpg.add_text(prestamo[4] or "Pendiente")  # fecha_devolucion
-                    with dpg.group(horizontal=True):
-                        if not prestamo[4]:  # Si no hay fecha de devolución
-                            dpg.add_button(
-                                label=f"Devolver##dev_prestamo_{prestamo[0]}", 
-                                callback=self.devolver_libro,
-                                user_data=(prestamo[0], prestamo[1]),
-                                width=80
-                            )
-                        else:
-                            dpg.add_text("Devuelto", color=(0, 255, 0))
-            
-            self._set_status(f"Encontrados {len(prestamos)} préstamos para el título '{termino}'")
-            
-        except Exception as e:
-            print(f"❌ Error al buscar préstamos por título: {e}")
-            self._set_status(f"Error al buscar por título: {e}")
+        if not self._tabla_prestamos_disponible():
+            return
+        
+        # Buscar préstamos por título en el trabajador
+        self.en_segundo_plano(
+            self.filtrar_prestamos_por_titulo, termino,
+            al_terminar=lambda prestamos: self._mostrar_prestamos(
+                prestamos, f"Encontrados {len(prestamos)} préstamos para el título '{termino}'"),
+            clave="table_prestamos"
+        )
     
     # ================================
     # INTERFAZ DE USUARIO
@@ -346,7 +294,8 @@ class PrestamosManager(DatabaseManager):
             # Lista de préstamos activos
             with dpg.child_window():
                 dpg.add_text("Préstamos Activos:")
-                with dpg.table(tag="table_prestamos"):
+                # clipper: con miles de préstamos solo se dibujan las filas visibles
+                with dpg.table(tag="table_prestamos", clipper=True):
                     dpg.add_table_column(label="ID")
                     dpg.add_table_column(label="ISBN")
                     dpg.add_table_column(label="Título")
@@ -368,6 +317,8 @@ class PrestamosManager(DatabaseManager):
                 dpg.add_separator()
                 
                 dpg.add_button(label="Actualizar Historial", callback=self.cargar_historial_prestamos)
+                crear_paginador("table_historial_prestamos_paginador",
+                                self.pagina_historial_anterior, self.pagina_historial_siguiente)
                 dpg.add_separator()
                 
                 with dpg.table(tag="table_historial_prestamos"):
@@ -0,0 +1,165 @@
+# query_metrics.py - Latencia por sentencia y registro de consultas lentas
+
+"""
+DatabaseManager informa aquí cada sentencia que ejecuta. Las mediciones se
+agrupan por el nombre de la sentencia en sqlstatement.py (por ejemplo
+SELECT_LIBRO_BY_ISBN); las que no están en sqlstatement.py se agrupan por
+su texto abreviado.
+
+Por sentencia se guarda un histograma de latencias con cubetas de ancho
+geométrico (cada una ~10% más ancha que la anterior), suficiente para
+estimar p50/p95/p99 con memoria constante, más la cantidad de llamadas,
+filas y errores.
+
+Uso:
+    from modules import query_metrics
+    query_metrics.imprimir_resumen()
+    query_metrics.agregar_hook(lambda medicion: ...)
+"""
+
+import bisect
+import logging
+import math
+import threading
+from . import sqlstatement as sql
+from .db_config import (METRICAS_ACTIVAS, UMBRAL_CONSULTA_LENTA_MS, ARCHIVO_CONSULTAS_LENTAS,
+                        REGISTRAR_PARAMETROS)
+
+# Límites superiores de las cubetas en milisegundos: 0,01 ms .. ~10 minutos
+_FACTOR_CUBETA = 1.1
+_LIMITES_MS = [0.01 * _FACTOR_CUBETA ** i for i in range(int(math.log(60_000_000) / math.log(_FACTOR_CUBETA)) + 1)]
+
+_lock = threading.Lock()
+_estadisticas = {}
+_hooks = []
+_nombres_por_texto = None
+_log_lentas_configurado = False
+
+# Sin ARCHIVO_CONSULTAS_LENTAS las consultas lentas solo llegan a los
+# manejadores que agregue quien use el logger (no a la consola)
+logger_lentas = logging.getLogger("biblio.consultas_lentas")
+logger_lentas.addHandler(logging.NullHandler())
+
+class _Estadistica:
+    """Acumulado de una sentencia"""
+
+    __slots__ = ("llamadas", "errores", "filas", "total_ms", "max_ms", "cubetas")
+
+    def __init__(self):
+        self.llamadas = 0
+        self.errores = 0
+        self.filas = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.cubetas = [0] * (len(_LIMITES_MS) + 1)
+
+    def percentil(self, p):
+        """Estimar el percentil p (0-100) como el límite superior de su cubeta"""
+        objetivo = math.ceil(self.llamadas * p / 100)
+        acumulado = 0
+        for indice, cantidad in enumerate(self.cubetas):
+            acumulado += cantidad
+            if acumulado >= objetivo:
+                return min(_LIMITES_MS[indice] if indice < len(_LIMITES_MS) else self.max_ms, self.max_ms)
+        return self.max_ms
+
+def nombre_sentencia(texto):
+    """Obtener el nombre en sqlstatement.py de un texto SQL (o el texto abreviado)"""
+    global _nombres_por_texto
+    if _nombres_por_texto is None:
+        _nombres_por_texto = {
+            valor: nombre for nombre, valor in vars(sql).items()
+            if nombre.isupper() and isinstance(valor, str)
+        }
+    nombre = _nombres_por_texto.get(texto)
+    if nombre is None:
+        nombre = " ".join(texto.split())
+        if len(nombre) > 60:
+            nombre = nombre[:57] + "..."
+    return nombre
+
+def _configurar_log_lentas():
+    """Agregar el archivo de consultas lentas al logger (una sola vez)"""
+    global _log_lentas_configurado
+    if _log_lentas_configurado:
+        return
+    _log_lentas_configurado = True
+    if ARCHIVO_CONSULTAS_LENTAS:
+        manejador = logging.FileHandler(ARCHIVO_CONSULTAS_LENTAS, encoding="utf-8", delay=True)
+        manejador.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        logger_lentas.addHandler(manejador)
+        logger_lentas.setLevel(logging.WARNING)
+
+def registrar(texto, segundos, filas=0, error=None, params=None):
+    """Registrar una ejecución: texto SQL, duración, filas leídas o afectadas y error"""
+    if not METRICAS_ACTIVAS:
+        return
+    nombre = nombre_sentencia(texto)
+    milisegundos = segundos * 1000
+
+    with _lock:
+        estadistica = _estadisticas.get(nombre)
+        if estadistica is None:
+            estadistica = _estadisticas[nombre] = _Estadistica()
+        estadistica.llamadas += 1
+        estadistica.filas += filas or 0
+        estadistica.total_ms += milisegundos
+        estadistica.max_ms = max(estadistica.max_ms, milisegundos)
+        estadistica.cubetas[bisect.bisect_left(_LIMITES_MS, milisegundos)] += 1
+        if error is not None:
+            estadistica.errores += 1
+        hooks = list(_hooks)
+
+    if milisegundos >= UMBRAL_CONSULTA_LENTA_MS:
+        _configurar_log_lentas()
+        # Los valores pueden ser datos personales: solo se anotan si se pide
+        detalle = repr(params) if REGISTRAR_PARAMETROS or not params else f"<{len(params)} valores>"
+        logger_lentas.warning("%s %.1f ms filas=%s params=%s%s", nombre, milisegundos, filas, detalle,
+                              f" error={error}" if error is not None else "")
+
+    if hooks:
+        medicion = {'sentencia': nombre, 'ms': milisegundos, 'filas': filas, 'error': error}
+        for hook in hooks:
+            hook(medicion)
+
+def agregar_hook(funcion):
+    """Registrar una función que recibe cada medición como diccionario
+    (sentencia, ms, filas, error)"""
+    with _lock:
+        _hooks.append(funcion)
+
+def quitar_hook(funcion):
+    """Quitar una función registrada con agregar_hook"""
+    with _lock:
+        if funcion in _hooks:
+            _hooks.remove(funcion)
+
+def resumen():
+    """Obtener por sentencia: llamadas, errores, filas, media, p50, p95, p99 y máximo (ms)"""
+    with _lock:
+        return {
+            nombre: {
+                'llamadas': e.llamadas,
+                'errores': e.errores,
+                'filas': e.filas,
+                'media_ms': e.total_ms / e.llamadas,
+                'p50_ms': e.percentil(50),
+                'p95_ms': e.percentil(95),
+                'p99_ms': e.percentil(99),
+                'max_ms': e.max_ms,
+            }
+            for nombre, e in _estadisticas.items()
+        }
+
+def imprimir_resumen(orden="p95_ms"):
+    """Imprimir el resumen ordenado de la sentencia más lenta a la más rápida"""
+    filas = sorted(resumen().items(), key=lambda item: item[1][orden], reverse=True)
+    print(f"{'Sentencia':<40} {'llamadas':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'máx ms':>9} {'errores':>8}")
+    for nombre, datos in filas:
+        print(f"{nombre[:40]:<40} {datos['llamadas']:>9} {datos['p50_ms']:>9.2f} {datos['p95_ms']:>9.2f} "
+              f"{datos['p99_ms']:>9.2f} {datos['max_ms']:>9.2f} {datos['errores']:>8}")
+
+def reiniciar():
+    """Borrar todas las mediciones acumuladas"""
+    with _lock:
+        _estadisticas.clear()
@@ -0,0 +1,58 @@
+# query_plans.py - Verificación de planes de ejecución de las consultas frecuentes
+
+import re
+from . import sqlstatement as sql
+
+# Consultas críticas de sqlstatement.py y parámetros de ejemplo para explicarlas
+# (las fechas de préstamos son números de día: 19723 = 2024-01-01)
+CONSULTAS_CRITICAS = {
+    "CHECK_LIBRO_HAS_ACTIVE_LOANS": ("9780000000000",),
+    "CHECK_LIBRO_DISPONIBLE": ("9780000000000",),
+    "CHECK_AUTOR_HAS_BOOKS": (1,),
+    "SELECT_PRESTAMOS_WITH_BOOKS": None,
+    "SELECT_HISTORIAL_PRESTAMOS": None,
+    "SELECT_HISTORIAL_USUARIO": ("usuario",),
+    "SELECT_HISTORIAL_PRIMERA_PAGINA": (50,),
+    "SELECT_HISTORIAL_PAGINA_SIGUIENTE": (19723, 1, 50),
+    "SELECT_HISTORIAL_PAGINA_ANTERIOR": (19723, 1, 50),
+    "SELECT_LIBROS_PRIMERA_PAGINA": (50,),
+    "SELECT_LIBROS_PAGINA_SIGUIENTE": ("Titulo", "9780000000000", 50),
+    "SELECT_LIBROS_PAGINA_ANTERIOR": ("Titulo", "9780000000000", 50),
+    "SELECT_LIBROS_DISPONIBLES_FOR_COMBO": None,
+    "SELECT_LIBROS_WITH_AUTHORS": None,
+    "SELECT_LIBRO_BY_ISBN": ("9780000000000",),
+    "SELECT_LIBRO_ESTADO": ("9780000000000",),
+    "INSERT_PRESTAMO_SI_DISPONIBLE": ("usuario", 19723, 19738, "9780000000000"),
+    "SELECT_PRESTAMOS_VENCIDOS": (19723, 19723),
+    "SELECT_PRESTAMOS_POR_VENCER_LOTE": (19725, -719162, 0, 1000),
+    "SELECT_PRESTAMOS_ENTRE_FECHAS": (19723, 19753),
+    "COUNT_PRESTAMOS_ENTRE_FECHAS": (19723, 19753),
+    "SELECT_LIBROS_MAS_PRESTADOS": (10,),
+    "SELECT_LIBROS_MAS_PRESTADOS_PERIODO": ("2024-01", "2024-12", 10),
+    "SELECT_AUTOR_BY_ID": (1,),
+    "SELECT_AUTORES_FOR_COMBO": None,
+    "SELECT_ALL_AUTORES": None,
+}
+
+# "SCAN tabla" sin índice: recorrido completo de la tabla
+_PATRON_SCAN_COMPLETO = re.compile(r"^SCAN (\w+)$")
+
+# Subconsultas que SQLite materializa; recorrerlas no es recorrer una tabla
+_PATRON_SUBCONSULTA = re.compile(r"^(?:MATERIALIZE|CO-ROUTINE) (\w+)$")
+
+def verificar_planes(db_manager, consultas=None):
+    """Explicar cada consulta crítica y detectar recorridos completos de tabla.
+
+    Retorna un diccionario {nombre: lista de pasos problemáticos}; un
+    diccionario vacío significa que todas las consultas usan índices.
+    """
+    consultas = CONSULTAS_CRITICAS if consultas is None else consultas
+    fallas = {}
+    for nombre, params in consultas.items():
+        plan = db_manager.explicar_consulta(getattr(sql, nombre), params)
+        subconsultas = {m.group(1) for m in map(_PATRON_SUBCONSULTA.match, plan) if m}
+        pasos = [paso for paso in plan
+                 if (m := _PATRON_SCAN_COMPLETO.match(paso)) and m.group(1) not in subconsultas]
+        if pasos:
+            fallas[nombre] = pasos
+    return fallas
@@ -0,0 +1,664 @@
+# schema_migrations.py - Migraciones versionadas del esquema de la biblioteca
+
+"""
+Cada migración es una tupla (versión, descripción, pasos). Un paso puede ser
+una sentencia SQL o una función que recibe la conexión. Las migraciones ya
+publicadas no se modifican: cualquier cambio de esquema se agrega como una
+versión nueva al final de MIGRACIONES.
+"""
+
+import os
+import threading
+from . import sqlstatement as sql
+from .isbn import normalizar_isbn
+
+# Índices secundarios para las consultas de sqlstatement.py (versión 2)
+INDICES_V2 = [
+    # CHECK_AUTOR_HAS_BOOKS y el JOIN libros -> autores
+    "CREATE INDEX IF NOT EXISTS idx_libros_autor ON libros(autor_id)",
+    # Listados de libros ordenados por título
+    "CREATE INDEX IF NOT EXISTS idx_libros_titulo ON libros(titulo)",
+    # SELECT_LIBROS_DISPONIBLES_FOR_COMBO: solo libros disponibles, ya ordenados
+    "CREATE INDEX IF NOT EXISTS idx_libros_disponibles_titulo ON libros(titulo) WHERE estado = 'Disponible'",
+    # SELECT_AUTORES_FOR_COMBO / SELECT_ALL_AUTORES
+    "CREATE INDEX IF NOT EXISTS idx_autores_apellido_nombre ON autores(apellido, nombre)",
+    # JOINs y conteos de préstamos por libro
+    "CREATE INDEX IF NOT EXISTS idx_prestamos_isbn ON prestamos(isbn)",
+    # CHECK_LIBRO_HAS_ACTIVE_LOANS: préstamos activos por ISBN
+    "CREATE INDEX IF NOT EXISTS idx_prestamos_activos_isbn ON prestamos(isbn) WHERE fecha_devolucion IS NULL",
+    # SELECT_PRESTAMOS_WITH_BOOKS: préstamos activos por fecha
+    "CREATE INDEX IF NOT EXISTS idx_prestamos_activos_fecha ON prestamos(fecha_prestamo) WHERE fecha_devolucion IS NULL",
+    # SELECT_HISTORIAL_PRESTAMOS
+    "CREATE INDEX IF NOT EXISTS idx_prestamos_fecha ON prestamos(fecha_prestamo)",
+    # SELECT_HISTORIAL_USUARIO
+    "CREATE INDEX IF NOT EXISTS idx_prestamos_usuario_fecha ON prestamos(nombre_usuario, fecha_prestamo)",
+]
+
+# Triggers que mantienen libros_fts al modificar libros. Se exponen por
+# nombre porque la importación masiva los suspende y los vuelve a crear.
+TRIGGERS_BUSQUEDA_LIBROS = {
+    "trg_libros_fts_insert": '''
+    CREATE TRIGGER IF NOT EXISTS trg_libros_fts_insert AFTER INSERT ON libros
+    BEGIN
+        INSERT INTO libros_fts (rowid, titulo, genero, editorial, autor)
+        VALUES (new.rowid, new.titulo, new.genero, new.editorial,
+                (SELECT nombre || ' ' || apellido FROM autores WHERE id = new.autor_id));
+    END
+    ''',
+    "trg_libros_fts_delete": '''
+    CREATE TRIGGER IF NOT EXISTS trg_libros_fts_delete AFTER DELETE ON libros
+    BEGIN
+        DELETE FROM libros_fts WHERE rowid = old.rowid;
+    END
+    ''',
+    "trg_libros_fts_update": '''
+    CREATE TRIGGER IF NOT EXISTS trg_libros_fts_update
+    AFTER UPDATE OF titulo, genero, editorial, autor_id ON libros
+    BEGIN
+        DELETE FROM libros_fts WHERE rowid = old.rowid;
+        INSERT INTO libros_fts (rowid, titulo, genero, editorial, autor)
+        VALUES (new.rowid, new.titulo, new.genero, new.editorial,
+                (SELECT nombre || ' ' || apellido FROM autores WHERE id = new.autor_id));
+    END
+    ''',
+}
+
+# Búsqueda de texto completo sobre el catálogo (versión 3). El rowid de
+# libros_fts es el rowid del libro, mantenido por los triggers.
+BUSQUEDA_FTS_V3 = [
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS libros_fts USING fts5(
+        titulo, genero, editorial, autor,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    ''',
+    '''
+    INSERT INTO libros_fts (rowid, titulo, genero, editorial, autor)
+    SELECT l.rowid, l.titulo, l.genero, l.editorial, a.nombre || ' ' || a.apellido
+    FROM libros l
+    LEFT JOIN autores a ON l.autor_id = a.id
+    ''',
+    *TRIGGERS_BUSQUEDA_LIBROS.values(),
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_autores_fts_update
+    AFTER UPDATE OF nombre, apellido ON autores
+    BEGIN
+        UPDATE libros_fts SET autor = new.nombre || ' ' || new.apellido
+        WHERE rowid IN (SELECT rowid FROM libros WHERE autor_id = new.id);
+    END
+    ''',
+]
+
+# Paginación por clave del catálogo sobre (titulo, isbn) (versión 4). El
+# historial usa idx_prestamos_fecha, que ya incluye el id (rowid) como
+# segunda columna implícita.
+PAGINACION_V4 = [
+    "CREATE INDEX IF NOT EXISTS idx_libros_titulo_isbn ON libros(titulo, isbn)",
+    "DROP INDEX IF EXISTS idx_libros_titulo",
+]
+
+# Contadores por entidad y por estado mantenidos por triggers (versión 5).
+# Claves: 'autores', 'libros', 'prestamos', 'libros.estado:<estado>' y
+# 'prestamos.estado:<estado>'.
+def _triggers_contador(tabla, con_estado):
+    """Triggers que suman y restan en contadores al modificar una tabla.
+
+    Forma parte de la migración 5: no modificar; un cambio va en una versión nueva.
+    """
+    sumar = "INSERT INTO contadores (clave, valor) VALUES ({clave}, {delta}) " \
+            "ON CONFLICT(clave) DO UPDATE SET valor = valor + excluded.valor;"
+    clave_estado = f"'{tabla}.estado:' || IFNULL({{fila}}.estado, '')"
+
+    al_insertar = [sumar.format(clave=f"'{tabla}'", delta=1)]
+    al_borrar = [sumar.format(clave=f"'{tabla}'", delta=-1)]
+    if con_estado:
+        al_insertar.append(sumar.format(clave=clave_estado.format(fila="new"), delta=1))
+        al_borrar.append(sumar.format(clave=clave_estado.format(fila="old"), delta=-1))
+
+    triggers = [
+        f"CREATE TRIGGER IF NOT EXISTS trg_{tabla}_contador_insert AFTER INSERT ON {tabla} "
+        f"BEGIN {' '.join(al_insertar)} END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{tabla}_contador_delete AFTER DELETE ON {tabla} "
+        f"BEGIN {' '.join(al_borrar)} END",
+    ]
+    if con_estado:
+        triggers.append(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{tabla}_contador_estado AFTER UPDATE OF estado ON {tabla} "
+            f"WHEN old.estado IS NOT new.estado BEGIN "
+            f"{sumar.format(clave=clave_estado.format(fila='old'), delta=-1)} "
+            f"{sumar.format(clave=clave_estado.format(fila='new'), delta=1)} END"
+        )
+    return triggers
+
+CONTADORES_V5 = [
+    '''
+    CREATE TABLE IF NOT EXISTS contadores (
+        clave TEXT PRIMARY KEY,
+        valor INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+    ''',
+    '''
+    INSERT OR REPLACE INTO contadores (clave, valor)
+    SELECT 'autores', COUNT(*) FROM autores
+    UNION ALL SELECT 'libros', COUNT(*) FROM libros
+    UNION ALL SELECT 'prestamos', COUNT(*) FROM prestamos
+    UNION ALL SELECT 'libros.estado:' || IFNULL(estado, ''), COUNT(*) FROM libros GROUP BY estado
+    UNION ALL SELECT 'prestamos.estado:' || IFNULL(estado, ''), COUNT(*) FROM prestamos GROUP BY estado
+    ''',
+    *_triggers_contador("autores", con_estado=False),
+    *_triggers_contador("libros", con_estado=True),
+    *_triggers_contador("prestamos", con_estado=True),
+]
+
+# Estado de los libros derivado de los préstamos (versión 6): un libro está
+# 'Prestado' si y solo si tiene un préstamo sin fecha de devolución. Primero
+# se corrige cualquier diferencia existente y después los triggers la
+# mantienen; un UPDATE de libros.estado que la contradiga se rechaza.
+ESTADO_LIBROS_V6 = [
+    '''
+    UPDATE libros
+    SET estado = CASE WHEN EXISTS (SELECT 1 FROM prestamos p
+                                   WHERE p.isbn = libros.isbn AND p.fecha_devolucion IS NULL)
+                      THEN 'Prestado' ELSE 'Disponible' END
+    WHERE (IFNULL(estado, '') = 'Prestado') !=
+          EXISTS (SELECT 1 FROM prestamos p WHERE p.isbn = libros.isbn AND p.fecha_devolucion IS NULL)
+    ''',
+    # Un préstamo activo solo puede crearse sobre un libro existente y disponible
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_prestamos_validar_insert
+    BEFORE INSERT ON prestamos WHEN new.fecha_devolucion IS NULL
+    BEGIN
+        SELECT RAISE(ABORT, 'El libro no existe o no está disponible')
+        WHERE NOT EXISTS (SELECT 1 FROM libros WHERE isbn = new.isbn AND estado = 'Disponible');
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_prestamos_estado_insert
+    AFTER INSERT ON prestamos WHEN new.fecha_devolucion IS NULL
+    BEGIN
+        UPDATE libros SET estado = 'Prestado' WHERE isbn = new.isbn;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_prestamos_estado_devolucion
+    AFTER UPDATE OF fecha_devolucion ON prestamos
+    WHEN old.fecha_devolucion IS NULL AND new.fecha_devolucion IS NOT NULL
+    BEGIN
+        UPDATE libros SET estado = 'Disponible'
+        WHERE isbn = new.isbn AND estado = 'Prestado'
+          AND NOT EXISTS (SELECT 1 FROM prestamos
+                          WHERE isbn = new.isbn AND fecha_devolucion IS NULL);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_prestamos_estado_delete
+    AFTER DELETE ON prestamos WHEN old.fecha_devolucion IS NULL
+    BEGIN
+        UPDATE libros SET estado = 'Disponible'
+        WHERE isbn = old.isbn AND estado = 'Prestado'
+          AND NOT EXISTS (SELECT 1 FROM prestamos
+                          WHERE isbn = old.isbn AND fecha_devolucion IS NULL);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_libros_validar_estado
+    BEFORE UPDATE OF estado ON libros
+    WHEN (IFNULL(new.estado, '') = 'Prestado') !=
+         EXISTS (SELECT 1 FROM prestamos WHERE isbn = new.isbn AND fecha_devolucion IS NULL)
+    BEGIN
+        SELECT RAISE(ABORT, 'El estado Prestado depende de los préstamos activos del libro');
+    END
+    ''',
+]
+
+# Ranking de préstamos (versión 7): cantidad de préstamos por libro, total y
+# por mes ('AAAA-MM'), mantenida por triggers sobre prestamos. Los reportes de
+# libros más prestados leen estas tablas por su índice en lugar de agrupar
+# todo el historial. Las filas que llegan a cero se borran.
+_SUMAR_RANKING = '''
+    INSERT INTO prestamos_por_libro (isbn, total) VALUES ({fila}.isbn, {delta})
+    ON CONFLICT(isbn) DO UPDATE SET total = total + excluded.total;
+    INSERT INTO prestamos_por_libro_mes (mes, isbn, total)
+    VALUES (substr({fila}.fecha_prestamo, 1, 7), {fila}.isbn, {delta})
+    ON CONFLICT(mes, isbn) DO UPDATE SET total = total + excluded.total;
+'''
+_LIMPIAR_RANKING = '''
+    DELETE FROM prestamos_por_libro WHERE isbn = old.isbn AND total <= 0;
+    DELETE FROM prestamos_por_libro_mes
+    WHERE mes = substr(old.fecha_prestamo, 1, 7) AND isbn = old.isbn AND total <= 0;
+'''
+
+RANKING_PRESTAMOS_V7 = [
+    '''
+    CREATE TABLE IF NOT EXISTS prestamos_por_libro (
+        isbn TEXT PRIMARY KEY,
+        total INTEGER NOT NULL
+    ) WITHOUT ROWID
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_prestamos_por_libro_total ON prestamos_por_libro(total DESC, isbn)",
+    '''
+    CREATE TABLE IF NOT EXISTS prestamos_por_libro_mes (
+        mes TEXT NOT NULL,
+        isbn TEXT NOT NULL,
+        total INTEGER NOT NULL,
+        PRIMARY KEY (mes, isbn)
+    ) WITHOUT ROWID
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_prestamos_por_libro_mes_total ON prestamos_por_libro_mes(mes, total DESC)",
+    '''
+    INSERT OR REPLACE INTO prestamos_por_libro (isbn, total)
+    SELECT isbn, COUNT(*) FROM prestamos GROUP BY isbn
+    ''',
+    '''
+    INSERT OR REPLACE INTO prestamos_por_libro_mes (mes, isbn, total)
+    SELECT substr(fecha_prestamo, 1, 7), isbn, COUNT(*) FROM prestamos
+    GROUP BY substr(fecha_prestamo, 1, 7), isbn
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_prestamos_ranking_insert
+    AFTER INSERT ON prestamos
+    BEGIN {_SUMAR_RANKING.format(fila="new", delta=1)} END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_prestamos_ranking_delete
+    AFTER DELETE ON prestamos
+    BEGIN {_SUMAR_RANKING.format(fila="old", delta=-1)} {_LIMPIAR_RANKING} END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_prestamos_ranking_update
+    AFTER UPDATE OF isbn, fecha_prestamo ON prestamos
+    WHEN old.isbn IS NOT new.isbn
+      OR substr(old.fecha_prestamo, 1, 7) IS NOT substr(new.fecha_prestamo, 1, 7)
+    BEGIN
+        {_SUMAR_RANKING.format(fila="old", delta=-1)}
+        {_LIMPIAR_RANKING}
+        {_SUMAR_RANKING.format(fila="new", delta=1)}
+    END
+    ''',
+]
+
+# Vencimiento de los préstamos (versión 8): fecha guardada al prestar según
+# DIAS_PRESTAMO. Los préstamos existentes reciben los 15 días de la regla que
+# usaba la consulta de vencidos. El índice parcial cubre solo los préstamos
+# activos, que son los que se listan por vencimiento.
+VENCIMIENTO_V8 = [
+    "ALTER TABLE prestamos ADD COLUMN fecha_vencimiento DATE",
+    "UPDATE prestamos SET fecha_vencimiento = date(fecha_prestamo, '+15 days')",
+    "CREATE INDEX IF NOT EXISTS idx_prestamos_vencimiento ON prestamos(fecha_vencimiento) WHERE fecha_devolucion IS NULL",
+]
+
+# Fechas de préstamos como número de día desde 1970-01-01 (versión 9, ver
+# fechas.py). La tabla se reconstruye para declarar las columnas INTEGER:
+# se copia convirtiendo las fechas, se reemplaza la original y se vuelven a
+# crear sus índices y triggers. El ranking por mes sigue usando 'AAAA-MM'.
+_DIA = "CAST(julianday(date({columna})) - 2440587.5 AS INTEGER)"
+_MES_DIA = "strftime('%Y-%m', {fila}.fecha_prestamo * 86400, 'unixepoch')"
+
+_SUMAR_RANKING_V9 = f'''
+    INSERT INTO prestamos_por_libro (isbn, total) VALUES ({{fila}}.isbn, {{delta}})
+    ON CONFLICT(isbn) DO UPDATE SET total = total + excluded.total;
+    INSERT INTO prestamos_por_libro_mes (mes, isbn, total)
+    VALUES ({_MES_DIA}, {{fila}}.isbn, {{delta}})
+    ON CONFLICT(mes, isbn) DO UPDATE SET total = total + excluded.total;
+'''
+_LIMPIAR_RANKING_V9 = f'''
+    DELETE FROM prestamos_por_libro WHERE isbn = old.isbn AND total <= 0;
+    DELETE FROM prestamos_por_libro_mes
+    WHERE mes = {_MES_DIA.format(fila="old")} AND isbn = old.isbn AND total <= 0;
+'''
+
+FECHAS_ENTERAS_V9 = [
+    '''
+    CREATE TABLE prestamos_v9 (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        isbn TEXT NOT NULL,
+        nombre_usuario TEXT NOT NULL,
+        fecha_prestamo INTEGER NOT NULL,
+        fecha_devolucion INTEGER,
+        estado TEXT DEFAULT 'Activo',
+        fecha_vencimiento INTEGER,
+        FOREIGN KEY (isbn) REFERENCES libros(isbn)
+    )
+    ''',
+    f'''
+    INSERT INTO prestamos_v9 (id, isbn, nombre_usuario, fecha_prestamo, fecha_devolucion,
+                              estado, fecha_vencimiento)
+    SELECT id, isbn, nombre_usuario, {_DIA.format(columna="fecha_prestamo")},
+           {_DIA.format(columna="fecha_devolucion")}, estado,
+           {_DIA.format(columna="fecha_vencimiento")}
+    FROM prestamos ORDER BY id
+    ''',
+    # Conservar el último id asignado aunque los préstamos más nuevos se hayan borrado
+    '''
+    UPDATE sqlite_sequence
+    SET seq = (SELECT MAX(seq) FROM sqlite_sequence WHERE name IN ('prestamos', 'prestamos_v9'))
+    WHERE name = 'prestamos_v9'
+    ''',
+    "DROP TABLE prestamos",
+    # Sin el modo legacy, RENAME revisa los triggers de libros que nombran a
+    # prestamos y falla porque en este momento la tabla no existe
+    "PRAGMA legacy_alter_table = ON",
+    "ALTER TABLE prestamos_v9 RENAME TO prestamos",
+    "PRAGMA legacy_alter_table = OFF",
+    *[indice for indice in INDICES_V2 if " ON prestamos(" in indice],
+    VENCIMIENTO_V8[2],
+    *_triggers_contador("prestamos", con_estado=True),
+    *ESTADO_LIBROS_V6[1:5],
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_prestamos_ranking_insert
+    AFTER INSERT ON prestamos
+    BEGIN {_SUMAR_RANKING_V9.format(fila="new", delta=1)} END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_prestamos_ranking_delete
+    AFTER DELETE ON prestamos
+    BEGIN {_SUMAR_RANKING_V9.format(fila="old", delta=-1)} {_LIMPIAR_RANKING_V9} END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_prestamos_ranking_update
+    AFTER UPDATE OF isbn, fecha_prestamo ON prestamos
+    WHEN old.isbn IS NOT new.isbn
+      OR {_MES_DIA.format(fila="old")} IS NOT {_MES_DIA.format(fila="new")}
+    BEGIN
+        {_SUMAR_RANKING_V9.format(fila="old", delta=-1)}
+        {_LIMPIAR_RANKING_V9}
+        {_SUMAR_RANKING_V9.format(fila="new", delta=1)}
+    END
+    ''',
+]
+
+# Clave entera para libros (versión 10): libros.id es el rowid y
+# prestamos.libro_id apunta a él; libros.isbn guarda el ISBN-13 normalizado
+# (ver isbn.py) con un índice único. Ambas tablas se reconstruyen, el id de
+# cada libro es su rowid anterior (el de libros_fts) y el ranking pasa a
+# contarse por libro_id. AUTOINCREMENT evita que un id borrado se reutilice:
+# el historial sigue apuntando al libro que ya no existe y no a otro.
+def _copiar_libros_v10(conn):
+    """Copiar libros a libros_v10 con el ISBN normalizado.
+
+    Arma temp.isbn_v10 (ISBN anterior -> id) para pasar los préstamos a
+    libro_id. Un ISBN que no se puede normalizar, o cuya forma normalizada ya
+    tiene otro libro, se conserva tal cual para no perder el libro. Los
+    préstamos de libros ya borrados reciben un id propio sin fila en libros.
+    """
+    conn.execute("CREATE TEMP TABLE isbn_v10 (id INTEGER PRIMARY KEY, isbn_anterior TEXT UNIQUE, isbn TEXT)")
+    libros = []
+    for rowid, anterior in conn.execute("SELECT rowid, isbn FROM libros"):
+        try:
+            libros.append((rowid, anterior, normalizar_isbn(anterior)))
+        except ValueError:
+            libros.append((rowid, anterior, None))
+    # Primero los que ya estaban normalizados, para que conserven su ISBN
+    libros.sort(key=lambda libro: libro[1] != libro[2])
+    usados = set()
+    asignados = []
+    for rowid, anterior, nuevo in libros:
+        if nuevo is None or nuevo in usados:
+            nuevo = anterior if anterior is not None else f"SIN-ISBN-{rowid}"
+        usados.add(nuevo)
+        asignados.append((rowid, anterior, nuevo))
+    conn.executemany("INSERT INTO temp.isbn_v10 (id, isbn_anterior, isbn) VALUES (?, ?, ?)", asignados)
+    conn.execute('''
+        INSERT INTO temp.isbn_v10 (isbn_anterior)
+        SELECT DISTINCT isbn FROM prestamos
+        WHERE isbn NOT IN (SELECT isbn_anterior FROM temp.isbn_v10 WHERE isbn_anterior IS NOT NULL)
+    ''')
+    conn.execute('''
+        INSERT INTO libros_v10 (id, isbn, titulo, autor_id, año_publicacion, editorial, genero, estado)
+        SELECT l.rowid, m.isbn, l.titulo, l.autor_id, l.año_publicacion, l.editorial, l.genero, l.estado
+        FROM libros l JOIN temp.isbn_v10 m ON m.id = l.rowid
+        ORDER BY l.rowid
+    ''')
+    # Reservar también los ids de los libros borrados
+    conn.execute("DELETE FROM sqlite_sequence WHERE name = 'libros_v10'")
+    conn.execute('''
+        INSERT INTO sqlite_sequence (name, seq)
+        SELECT 'libros_v10', MAX(id) FROM temp.isbn_v10 HAVING MAX(id) IS NOT NULL
+    ''')
+
+_SUMAR_RANKING_V10 = f'''
+    INSERT INTO prestamos_por_libro (libro_id, total) VALUES ({{fila}}.libro_id, {{delta}})
+    ON CONFLICT(libro_id) DO UPDATE SET total = total + excluded.total;
+    INSERT INTO prestamos_por_libro_mes (mes, libro_id, total)
+    VALUES ({_MES_DIA}, {{fila}}.libro_id, {{delta}})
+    ON CONFLICT(mes, libro_id) DO UPDATE SET total = total + excluded.total;
+'''
+_LIMPIAR_RANKING_V10 = f'''
+    DELETE FROM prestamos_por_libro WHERE libro_id = old.libro_id AND total <= 0;
+    DELETE FROM prestamos_por_libro_mes
+    WHERE mes = {_MES_DIA.format(fila="old")} AND libro_id = old.libro_id AND total <= 0;
+'''
+
+CLAVE_LIBROS_V10 = [
+    '''
+    CREATE TABLE libros_v10 (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        isbn TEXT NOT NULL,
+        titulo TEXT NOT NULL,
+        autor_id INTEGER,
+        año_publicacion INTEGER,
+        editorial TEXT,
+        genero TEXT,
+        estado TEXT DEFAULT 'Disponible',
+        FOREIGN KEY (autor_id) REFERENCES autores(id)
+    )
+    ''',
+    '''
+    CREATE TABLE prestamos_v10 (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        libro_id INTEGER NOT NULL,
+        nombre_usuario TEXT NOT NULL,
+        fecha_prestamo INTEGER NOT NULL,
+        fecha_devolucion INTEGER,
+        estado TEXT DEFAULT 'Activo',
+        fecha_vencimiento INTEGER,
+        FOREIGN KEY (libro_id) REFERENCES libros(id)
+    )
+    ''',
+    _copiar_libros_v10,
+    '''
+    INSERT INTO prestamos_v10 (id, libro_id, nombre_usuario, fecha_prestamo, fecha_devolucion,
+                               estado, fecha_vencimiento)
+    SELECT p.id, m.id, p.nombre_usuario, p.fecha_prestamo, p.fecha_devolucion,
+           p.estado, p.fecha_vencimiento
+    FROM prestamos p JOIN temp.isbn_v10 m ON m.isbn_anterior = p.isbn
+    ORDER BY p.id
+    ''',
+    '''
+    UPDATE sqlite_sequence
+    SET seq = (SELECT MAX(seq) FROM sqlite_sequence WHERE name IN ('prestamos', 'prestamos_v10'))
+    WHERE name = 'prestamos_v10'
+    ''',
+    "DROP TABLE temp.isbn_v10",
+    "DROP TABLE prestamos",
+    "DROP TABLE libros",
+    "DROP TABLE prestamos_por_libro",
+    "DROP TABLE prestamos_por_libro_mes",
+    # Igual que en la versión 9: los triggers de autores nombran a libros
+    "PRAGMA legacy_alter_table = ON",
+    "ALTER TABLE libros_v10 RENAME TO libros",
+    "ALTER TABLE prestamos_v10 RENAME TO prestamos",
+    "PRAGMA legacy_alter_table = OFF",
+    # Índices de libros; el catálogo se sigue paginando por (titulo, isbn)
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_libros_isbn ON libros(isbn)",
+    *[indice for indice in INDICES_V2 if " ON libros(" in indice and "idx_libros_titulo " not in indice],
+    PAGINACION_V4[0],
+    # Índices de préstamos: los de fechas y usuario, y los de libro por libro_id
+    "CREATE INDEX IF NOT EXISTS idx_prestamos_libro ON prestamos(libro_id)",
+    "CREATE INDEX IF NOT EXISTS idx_prestamos_activos_libro ON prestamos(libro_id) WHERE fecha_devolucion IS NULL",
+    *[indice for indice in INDICES_V2 if " ON prestamos(" in indice and "(isbn)" not in indice],
+    VENCIMIENTO_V8[2],
+    # Ranking por libro_id
+    '''
+    CREATE TABLE prestamos_por_libro (
+        libro_id INTEGER PRIMARY KEY,
+        total INTEGER NOT NULL
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_prestamos_por_libro_total ON prestamos_por_libro(total DESC, libro_id)",
+    '''
+    CREATE TABLE prestamos_por_libro_mes (
+        mes TEXT NOT NULL,
+        libro_id INTEGER NOT NULL,
+        total INTEGER NOT NULL,
+        PRIMARY KEY (mes, libro_id)
+    ) WITHOUT ROWID
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_prestamos_por_libro_mes_total ON prestamos_por_libro_mes(mes, total DESC)",
+    "INSERT INTO prestamos_por_libro (libro_id, total) SELECT libro_id, COUNT(*) FROM prestamos GROUP BY libro_id",
+    f'''
+    INSERT INTO prestamos_por_libro_mes (mes, libro_id, total)
+    SELECT {_MES_DIA.format(fila="prestamos")} as mes, libro_id, COUNT(*) FROM prestamos
+    GROUP BY mes, libro_id
+    ''',
+    # libros_fts: el rowid de cada libro es ahora su id; se regenera por si
+    # un VACUUM anterior había renumerado los rowid de libros (borrar la
+    # tabla y crearla de nuevo es mucho más rápido que vaciarla)
+    "DROP TABLE libros_fts",
+    BUSQUEDA_FTS_V3[0],
+    BUSQUEDA_FTS_V3[1],
+    *TRIGGERS_BUSQUEDA_LIBROS.values(),
+    *_triggers_contador("libros", con_estado=True),
+    *_triggers_contador("prestamos", con_estado=True),
+    # Estado de los libros (misma regla que la versión 6) por libro_id
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_prestamos_validar_insert
+    BEFORE INSERT ON prestamos WHEN new.fecha_devolucion IS NULL
+    BEGIN
+        SELECT RAISE(ABORT, 'El libro no existe o no está disponible')
+        WHERE NOT EXISTS (SELECT 1 FROM libros WHERE id = new.libro_id AND estado = 'Disponible');
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_prestamos_estado_insert
+    AFTER INSERT ON prestamos WHEN new.fecha_devolucion IS NULL
+    BEGIN
+        UPDATE libros SET estado = 'Prestado' WHERE id = new.libro_id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_prestamos_estado_devolucion
+    AFTER UPDATE OF fecha_devolucion ON prestamos
+    WHEN old.fecha_devolucion IS NULL AND new.fecha_devolucion IS NOT NULL
+    BEGIN
+        UPDATE libros SET estado = 'Disponible'
+        WHERE id = new.libro_id AND estado = 'Prestado'
+          AND NOT EXISTS (SELECT 1 FROM prestamos
+                          WHERE libro_id = new.libro_id AND fecha_devolucion IS NULL);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_prestamos_estado_delete
+    AFTER DELETE ON prestamos WHEN old.fecha_devolucion IS NULL
+    BEGIN
+        UPDATE libros SET estado = 'Disponible'
+        WHERE id = old.libro_id AND estado = 'Prestado'
+          AND NOT EXISTS (SELECT 1 FROM prestamos
+                          WHERE libro_id = old.libro_id AND fecha_devolucion IS NULL);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_libros_validar_estado
+    BEFORE UPDATE OF estado ON libros
+    WHEN (IFNULL(new.estado, '') = 'Prestado') !=
+         EXISTS (SELECT 1 FROM prestamos WHERE libro_id = new.id AND fecha_devolucion IS NULL)
+    BEGIN
+        SELECT RAISE(ABORT, 'El estado Prestado depende de los préstamos activos del libro');
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_prestamos_ranking_insert
+    AFTER INSERT ON prestamos
+    BEGIN {_SUMAR_RANKING_V10.format(fila="new", delta=1)} END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_prestamos_ranking_delete
+    AFTER DELETE ON prestamos
+    BEGIN {_SUMAR_RANKING_V10.format(fila="old", delta=-1)} {_LIMPIAR_RANKING_V10} END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_prestamos_ranking_update
+    AFTER UPDATE OF libro_id, fecha_prestamo ON prestamos
+    WHEN old.libro_id IS NOT new.libro_id
+      OR {_MES_DIA.format(fila="old")} IS NOT {_MES_DIA.format(fila="new")}
+    BEGIN
+        {_SUMAR_RANKING_V10.format(fila="old", delta=-1)}
+        {_LIMPIAR_RANKING_V10}
+        {_SUMAR_RANKING_V10.format(fila="new", delta=1)}
+    END
+    ''',
+]
+
+MIGRACIONES = [
+    (1, "Tablas base: autores, libros y préstamos", [
+        sql.CREATE_TABLE_AUTORES,
+        sql.CREATE_TABLE_LIBROS,
+        sql.CREATE_TABLE_PRESTAMOS,
+    ]),
+    (2, "Índices secundarios para consultas frecuentes", INDICES_V2),
+    (3, "Búsqueda de texto completo en el catálogo (FTS5)", BUSQUEDA_FTS_V3),
+    (4, "Índice para paginar el catálogo por título", PAGINACION_V4),
+    (5, "Contadores de entidades y estados mantenidos por triggers", CONTADORES_V5),
+    (6, "Estado de los libros derivado de los préstamos activos", ESTADO_LIBROS_V6),
+    (7, "Ranking de préstamos por libro, total y por mes", RANKING_PRESTAMOS_V7),
+    (8, "Fecha de vencimiento de los préstamos", VENCIMIENTO_V8),
+    (9, "Fechas de préstamos como número de día", FECHAS_ENTERAS_V9),
+    (10, "Clave entera para libros e ISBN normalizado a ISBN-13", CLAVE_LIBROS_V10),
+]
+
+VERSION_ACTUAL = MIGRACIONES[-1][0]
+
+# Bases ya verificadas en este proceso (ruta absoluta -> versión)
+_bases_verificadas = {}
+_bases_lock = threading.Lock()
+
+def _version_guardada(conn):
+    """Leer la versión de esquema registrada en la base"""
+    conn.execute(sql.CREATE_TABLE_SCHEMA_VERSION)
+    return conn.execute(sql.SELECT_SCHEMA_VERSION).fetchone()[0] or 0
+
+def aplicar_migraciones(conn):
+    """Aplicar sobre la conexión las migraciones pendientes en una sola transacción.
+
+    Retorna la lista de versiones aplicadas (vacía si el esquema ya estaba al día).
+    """
+    if _version_guardada(conn) >= VERSION_ACTUAL:
+        conn.commit()
+        return []
+
+    aplicadas = []
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Releer dentro del bloqueo: otro proceso pudo migrar mientras tanto
+        version = _version_guardada(conn)
+        for numero, descripcion, pasos in MIGRACIONES:
+            if numero <= version:
+                continue
+            for paso in pasos:
+                if callable(paso):
+                    paso(conn)
+                else:
+                    conn.execute(paso)
+            conn.execute(sql.INSERT_SCHEMA_VERSION, (numero, descripcion))
+            aplicadas.append(numero)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return aplicadas
+
+def asegurar_esquema(pool):
+    """Migrar la base del pool si todavía no se verificó en este proceso.
+
+    Retorna la lista de versiones aplicadas, o None si la base ya se había
+    verificado antes y no se tocó.
+    """
+    clave = os.path.abspath(pool.db_name)
+    with _bases_lock:
+        if _bases_verificadas.get(clave) == VERSION_ACTUAL:
+            return None
+        with pool.conexion() as conn:
+            aplicadas = aplicar_migraciones(conn)
+        _bases_verificadas[clave] = VERSION_ACTUAL
+        return aplicadas
@@ -0,0 +1,498 @@
+# servicios.py - Lógica de la biblioteca sin interfaz gráfica
+
+"""
+Operaciones de autores, libros y préstamos como métodos de Python puro: reciben
+valores, devuelven filas o resultados y lanzan excepciones ante un error. No
+importan DearPyGui, así que pueden usarse desde scripts, procesos por lotes,
+mediciones o cualquier otra interfaz.
+
+Los managers de la interfaz (autores_manager, libros_manager y
+prestamos_manager) heredan de estos servicios y solo agregan la lectura de
+los campos del formulario y el dibujo de las tablas.
+
+Los métodos marcados con @remota pueden atenderse en el servidor de la
+biblioteca (ver servidor_api.py) cuando el manager tiene un cliente.
+
+    from modules.servicios import ServicioLibros, ServicioPrestamos
+    prestamos = ServicioPrestamos("biblioteca.db")
+    prestamo_id = prestamos.prestar_libro("978-84-376-0494-7", "Juan Pérez")
+    pagina = ServicioLibros("biblioteca.db").buscar_libros("soledad")
+"""
+
+import sqlite3
+from .database_manager import DatabaseManager, remota
+from . import sqlstatement as sql
+from . import fechas
+from .db_config import DIAS_PRESTAMO, TAMAÑO_LOTE, TAMAÑO_PAGINA
+from .isbn import normalizar_isbn, clave_isbn
+from .schema_migrations import TRIGGERS_BUSQUEDA_LIBROS
+
+def clave_autor(nombre_completo):
+    """Normalizar un nombre completo para compararlo sin importar espacios ni mayúsculas"""
+    return " ".join(nombre_completo.split()).casefold()
+
+def expresiones_busqueda(termino):
+    """Convertir el texto ingresado en expresiones MATCH de FTS5.
+
+    Retorna (exacta, prefijo): en la primera cada palabra debe aparecer
+    completa y en la segunda como prefijo. Las comillas se eliminan para que
+    el texto del usuario nunca se interprete como sintaxis de FTS5.
+    """
+    palabras = termino.replace('"', ' ').split()
+    exacta = " ".join(f'"{palabra}"' for palabra in palabras)
+    prefijo = " ".join(f'"{palabra}"*' for palabra in palabras)
+    return exacta, prefijo
+
+def calcular_vencimiento(fecha_prestamo, dias=None):
+    """Número de día de vencimiento de un préstamo hecho en fecha_prestamo
+    (número de día, date o 'AAAA-MM-DD')"""
+    return fechas.a_dia(fecha_prestamo) + (DIAS_PRESTAMO if dias is None else dias)
+
+def isbn_guardado(manager, isbn):
+    """ISBN con el que está guardado un libro en la base.
+
+    Primero se busca el texto tal cual: la migración v10 dejó con su ISBN
+    original a los libros cuyo ISBN normalizado ya tenía otro libro, y
+    normalizarlo llevaría a ese otro. Si no hay un libro con ese ISBN exacto
+    se usa la forma normalizada (clave_isbn).
+    """
+    clave = clave_isbn(isbn)
+    exacto = str(isbn or "").strip()
+    if exacto != clave and manager.execute_query(sql.SELECT_LIBRO_EXISTE_ISBN, (exacto,)):
+        return exacto
+    return clave
+
+# ================================
+# AUTORES
+# ================================
+
+class ServicioAutores(DatabaseManager):
+    """Operaciones sobre autores"""
+    
+    @remota
+    def crear_autor(self, nombre, apellido, nacionalidad=None, fecha_nacimiento=None):
+        """Dar de alta un autor y retornar su id.
+        
+        Lanza ValueError si falta el nombre o el apellido.
+        """
+        if not nombre or not apellido:
+            raise ValueError("Nombre y apellido son obligatorios")
+        with self.transaccion() as cursor:
+            cursor.execute(sql.INSERT_AUTOR, (nombre, apellido, nacionalidad or None, fecha_nacimiento or None))
+            return cursor.lastrowid
+    
+    def crear_autores(self, autores):
+        """Insertar varios autores (nombre, apellido) en una transacción y retornar sus ids"""
+        ids = []
+        with self.transaccion() as cursor:
+            for nombre, apellido in autores:
+                cursor.execute(sql.INSERT_AUTOR, (nombre, apellido, None, None))
+                ids.append(cursor.lastrowid)
+        return ids
+    
+    @remota
+    def modificar_autor(self, autor_id, nombre, apellido, nacionalidad=None, fecha_nacimiento=None):
+        """Actualizar los datos de un autor; retorna False si no existe.
+        
+        Lanza ValueError si falta el nombre o el apellido.
+        """
+        if not nombre or not apellido:
+            raise ValueError("Nombre y apellido son obligatorios")
+        with self.transaccion() as cursor:
+            cursor.execute(sql.UPDATE_AUTOR,
+                           (nombre, apellido, nacionalidad or None, fecha_nacimiento or None, autor_id))
+            return cursor.rowcount > 0
+    
+    @remota
+    def borrar_autor(self, autor_id):
+        """Eliminar un autor si no tiene libros asociados.
+        
+        Retorna la cantidad de filas eliminadas, o None si el autor tiene libros.
+        """
+        count_result = self.execute_query(sql.CHECK_AUTOR_HAS_BOOKS, (autor_id,), usar_cache=False)
+        if count_result and count_result[0][0] > 0:
+            return None
+        return self.execute_command(sql.DELETE_AUTOR, (autor_id,))
+    
+    @remota
+    def obtener_autor(self, autor_id):
+        """Fila (id, nombre, apellido, nacionalidad, fecha_nacimiento), o None si no existe"""
+        autor = self.execute_query(sql.SELECT_AUTOR_BY_ID, (autor_id,))
+        return autor[0] if autor else None
+    
+    @remota
+    def listar_autores(self):
+        """Todos los autores ordenados por apellido y nombre"""
+        return self.execute_query(sql.SELECT_ALL_AUTORES)
+    
+    @remota
+    def obtener_autores_para_combo(self):
+        """Obtener lista de autores para usar en combo boxes"""
+        try:
+            autores = self.execute_query(sql.SELECT_AUTORES_FOR_COMBO)
+            
+            # Crear lista para el combo
+            items = ["Sin autor"]
+            valores = [None]
+            
+            for autor in autores:
+                items.append(autor[1])  # nombre_completo
+                valores.append(autor[0])  # id
+            
+            return items, valores
+        
+        except Exception as e:
+            print(f"❌ Error al obtener autores para combo: {e}")
+            return ["Sin autor"], [None]
+    
+    def obtener_mapa_autores(self):
+        """Obtener el diccionario nombre completo normalizado -> id de todos los autores"""
+        return {
+            clave_autor(f"{nombre} {apellido}"): id_autor
+            for id_autor, nombre, apellido in self.iter_query(sql.SELECT_AUTORES_NOMBRES)
+        }
+
+# ================================
+# LIBROS
+# ================================
+
+# Sentencias de cada tramo de buscar_libros: [fase][hacia atrás] = (desde el
+# extremo, desde una clave)
+_CONSULTAS_BUSQUEDA = (
+    ((sql.SEARCH_LIBROS_FTS, sql.SEARCH_LIBROS_FTS_SIGUIENTE),
+     (sql.SEARCH_LIBROS_FTS_ULTIMA, sql.SEARCH_LIBROS_FTS_ANTERIOR)),
+    ((sql.SEARCH_LIBROS_FTS_PREFIX, sql.SEARCH_LIBROS_FTS_PREFIX_SIGUIENTE),
+     (sql.SEARCH_LIBROS_FTS_PREFIX_ULTIMA, sql.SEARCH_LIBROS_FTS_PREFIX_ANTERIOR)),
+)
+
+class ServicioLibros(DatabaseManager):
+    """Operaciones sobre el catálogo de libros"""
+    
+    @remota
+    def crear_libro(self, isbn, titulo, autor_id=None, año=None, editorial=None, genero=None):
+        """Dar de alta un libro disponible y retornar su ISBN normalizado.
+        
+        El ISBN puede tener guiones o ser un ISBN-10; se guarda como ISBN-13
+        (índice único del esquema v10). Lanza ValueError si falta el ISBN o
+        el título, si el ISBN no es válido o si ya existe.
+        """
+        if not isbn or not titulo:
+            raise ValueError("ISBN y título son obligatorios")
+        isbn = normalizar_isbn(isbn)
+        try:
+            with self.transaccion() as cursor:
+                cursor.execute(sql.INSERT_LIBRO,
+                               (isbn, titulo, autor_id, año or None, editorial, genero, "Disponible"))
+        except sqlite3.IntegrityError:
+            raise ValueError(f"Ya existe un libro con ISBN '{isbn}'") from None
+        return isbn
+    
+    @remota
+    def modificar_libro(self, isbn, titulo, autor_id=None, año=None, editorial=None, genero=None):
+        """Actualizar los datos de un libro (no su estado); retorna False si no existe.
+        
+        Lanza ValueError si falta el título.
+        """
+        if not titulo:
+            raise ValueError("ISBN y título son obligatorios")
+        with self.transaccion() as cursor:
+            cursor.execute(sql.UPDATE_LIBRO_INFO,
+                           (titulo, autor_id, año or None, editorial, genero, isbn_guardado(self, isbn)))
+            return cursor.rowcount > 0
+    
+    @remota
+    def borrar_libro(self, isbn):
+        """Eliminar un libro si no tiene préstamos activos.
+        
+        Retorna la cantidad de filas eliminadas, o None si el libro está prestado.
+        """
+        isbn = isbn_guardado(self, isbn)
+        count_result = self.execute_query(sql.CHECK_LIBRO_HAS_ACTIVE_LOANS, (isbn,), usar_cache=False)
+        if count_result and count_result[0][0] > 0:
+            return None
+        return self.execute_command(sql.DELETE_LIBRO, (isbn,))
+    
+    @remota
+    def obtener_pagina_libros(self, desde=None, direccion="siguiente", tamaño=None):
+        """Obtener una página del catálogo ordenado por (titulo, isbn).
+        
+        ``desde`` es la clave (titulo, isbn) de la última fila de la página
+        actual para ir a la siguiente, o de la primera para ir a la anterior.
+        """
+        return self.obtener_pagina(
+            (sql.SELECT_LIBROS_PRIMERA_PAGINA,
+             sql.SELECT_LIBROS_PAGINA_SIGUIENTE,
+             sql.SELECT_LIBROS_PAGINA_ANTERIOR),
+            lambda libro: (libro[1], libro[0]),
+            desde, direccion, tamaño
+        )
+    
+    @remota
+    def buscar_libros(self, termino, desde=None, direccion="siguiente", tamaño=None):
+        """Buscar libros por título, género, editorial o autor, de a una página.
+        
+        Primero van las coincidencias de palabras completas ordenadas por
+        relevancia (bm25) y después las que solo coinciden por prefijo, por
+        rowid, para no calcular la relevancia sobre miles de filas. Las filas
+        y el resultado tienen la forma de obtener_pagina_libros; la clave de
+        cada fila es (fase, orden, id), con fase 0 para las coincidencias
+        completas y 1 para las de prefijo.
+        """
+        tamaño = tamaño or TAMAÑO_PAGINA
+        exacta, prefijo = expresiones_busqueda(termino)
+        if not exacta:
+            return self.armar_pagina([], None, None, "siguiente", tamaño)
+        if desde is None:
+            direccion = "siguiente"
+        
+        tramos = (exacta, f"({prefijo}) NOT ({exacta})")
+        hacia_atras = direccion == "anterior"
+        if hacia_atras:
+            fases = range(desde[0], -1, -1)
+        else:
+            fases = range(desde[0] if desde else 0, len(tramos))
+        
+        # Se recorren los tramos desde el de la clave hasta juntar una fila
+        # más que la página; el tramo siguiente empieza desde su extremo
+        filas = []
+        for fase in fases:
+            clave = desde[1:] if desde and fase == desde[0] else None
+            filas += self._buscar_tramo(fase, tramos[fase], clave, hacia_atras,
+                                        tamaño + 1 - len(filas))
+            if len(filas) > tamaño:
+                break
+        return self.armar_pagina(filas, lambda libro: tuple(libro[8:]), desde, direccion, tamaño)
+    
+    def _buscar_tramo(self, fase, expresion, clave, hacia_atras, limite):
+        """Filas de un tramo de la búsqueda a partir de la clave (orden, id) o de un extremo"""
+        consultas = _CONSULTAS_BUSQUEDA[fase][hacia_atras]
+        if clave is None:
+            return self.execute_query(consultas[0], (expresion, limite))
+        # Las coincidencias por prefijo se ordenan solo por id
+        clave = clave if fase == 0 else clave[1:]
+        return self.execute_query(consultas[1], (expresion, *clave, limite))
+    
+    def reconstruir_indice_busqueda(self):
+        """Regenerar libros_fts a partir de libros (por ejemplo después de un VACUUM completo).
+        
+        También vuelve a crear los triggers de libros_fts si faltan, por
+        ejemplo si una importación masiva se interrumpió con ellos suspendidos.
+        """
+        try:
+            with self.transaccion() as cursor:
+                cursor.execute(sql.DELETE_LIBROS_FTS)
+                cursor.execute(sql.INSERT_LIBROS_FTS_FROM_LIBROS)
+                for trigger in TRIGGERS_BUSQUEDA_LIBROS.values():
+                    cursor.execute(trigger)
+            return True
+        except Exception as e:
+            print(f"❌ Error al reconstruir índice de búsqueda: {e}")
+            return False
+    
+    @remota
+    def obtener_libro_con_autor(self, isbn):
+        """Obtener (fila del libro, 'nombre apellido' del autor o None); (None, None) si no existe"""
+        libro = self.execute_query(sql.SELECT_LIBRO_BY_ISBN, (isbn_guardado(self, isbn),))
+        if not libro:
+            return None, None
+        libro = libro[0]
+        
+        autor_nombre = None
+        if libro[2]:
+            autor_info = self.execute_query(sql.SELECT_AUTOR_BY_ID, (libro[2],))
+            if autor_info:
+                autor = autor_info[0]
+                autor_nombre = f"{autor[1]} {autor[2]}"  # nombre apellido
+        return libro, autor_nombre
+    
+    @remota
+    def obtener_libros_disponibles_para_combo(self):
+        """Obtener lista de libros disponibles para usar en combo boxes"""
+        try:
+            libros = self.execute_query(sql.SELECT_LIBROS_DISPONIBLES_FOR_COMBO)
+            
+            # Crear lista para el combo
+            items = ["Seleccionar libro..."]
+            valores = [None]
+            
+            for libro in libros:
+                items.append(f"{libro[1]} - {libro[0]}")  # titulo - isbn
+                valores.append(libro[0])  # isbn
+            
+            return items, valores
+        
+        except Exception as e:
+            print(f"❌ Error al obtener libros para combo: {e}")
+            return ["Seleccionar libro..."], [None]
+    
+    @remota
+    def obtener_estado_libro(self, isbn):
+        """Estado actual de un libro, o None si no existe"""
+        fila = self.execute_query(sql.SELECT_LIBRO_ESTADO, (isbn_guardado(self, isbn),))
+        return fila[0][0] if fila else None
+    
+    @remota
+    def cambiar_estado_libro(self, isbn, nuevo_estado):
+        """Cambiar el estado de un libro (por ejemplo a un estado propio como 'En reparación').
+        
+        'Prestado' y 'Disponible' los mantienen los triggers de préstamos: la
+        base rechaza un cambio que contradiga los préstamos activos del libro.
+        Lanza ErrorBloqueo si otro puesto mantiene la base bloqueada.
+        """
+        rows_affected = self.execute_command(sql.UPDATE_LIBRO_ESTADO, (nuevo_estado, isbn_guardado(self, isbn)))
+        
+        if rows_affected > 0:
+            print(f"✅ Estado del libro {isbn} cambiado a '{nuevo_estado}'")
+            return True
+        else:
+            print(f"❌ No se pudo cambiar el estado del libro {isbn}")
+            return False
+    
+    def verificar_estado_libros(self, reparar=True):
+        """Comparar libros.estado con los préstamos activos y, si se pide, corregirlo.
+        
+        Retorna la cantidad de libros inconsistentes encontrados. La
+        corrección es una sola sentencia UPDATE sobre todo el catálogo.
+        """
+        if not reparar:
+            return self.execute_query(sql.COUNT_LIBROS_ESTADO_INCONSISTENTE, usar_cache=False)[0][0]
+        with self.transaccion() as cursor:
+            cursor.execute(sql.REPARAR_ESTADO_LIBROS)
+            reparados = cursor.rowcount
+        if reparados:
+            print(f"🔧 Estado corregido en {reparados} libros")
+        return reparados
+
+# ================================
+# PRÉSTAMOS
+# ================================
+
+class ServicioPrestamos(DatabaseManager):
+    """Operaciones de circulación: préstamos, devoluciones, historial y vencimientos"""
+    
+    @remota
+    def prestar_libro(self, isbn, nombre_usuario, fecha_prestamo=None, dias=None):
+        """Prestar un libro con una única sentencia.
+        
+        El préstamo se inserta solo si el libro está disponible; los triggers
+        de la base marcan el libro como prestado. Vence a los ``dias`` días
+        (DIAS_PRESTAMO por defecto). ``fecha_prestamo`` puede ser un número
+        de día, un date o 'AAAA-MM-DD' (hoy por defecto). El ISBN puede
+        tener guiones o ser un ISBN-10. Retorna el id del préstamo, o None si
+        el libro no existe o ya está prestado. Lanza ValueError si falta el
+        ISBN o el usuario.
+        """
+        if not isbn or not nombre_usuario:
+            raise ValueError("ISBN y nombre de usuario son obligatorios")
+        isbn = isbn_guardado(self, isbn)
+        fecha_prestamo = fechas.a_dia(fecha_prestamo) if fecha_prestamo is not None else fechas.hoy()
+        fecha_vencimiento = calcular_vencimiento(fecha_prestamo, dias)
+        
+        with self.transaccion() as cursor:
+            cursor.execute(sql.INSERT_PRESTAMO_SI_DISPONIBLE,
+                           (nombre_usuario, fecha_prestamo, fecha_vencimiento, isbn))
+            return cursor.lastrowid if cursor.rowcount else None
+    
+    @remota
+    def devolver_prestamo(self, id_prestamo, fecha_devolucion=None):
+        """Registrar la devolución de un préstamo con una única sentencia.
+        
+        Los triggers de la base vuelven a marcar el libro como disponible.
+        Retorna False si el préstamo no existe o ya estaba devuelto.
+        """
+        fecha_devolucion = fechas.a_dia(fecha_devolucion) if fecha_devolucion is not None else fechas.hoy()
+        
+        with self.transaccion() as cursor:
+            cursor.execute(sql.UPDATE_PRESTAMO_DEVOLVER_SI_ACTIVO, (fecha_devolucion, id_prestamo))
+            return cursor.rowcount > 0
+    
+    @remota
+    def listar_prestamos_activos(self):
+        """Préstamos sin devolver, del más reciente al más antiguo.
+        
+        Cada fila: (id, isbn, usuario, fecha_prestamo, fecha_devolucion, estado,
+        titulo, fecha_vencimiento), con las fechas como número de día.
+        """
+        return self.execute_query(sql.SELECT_PRESTAMOS_WITH_BOOKS)
+    
+    @remota
+    def filtrar_prestamos_por_usuario(self, termino):
+        """Préstamos cuyo usuario contiene ``termino`` (mismas columnas que listar_prestamos_activos)"""
+        return self.execute_query(sql.SEARCH_PRESTAMOS_BY_USER, (f'%{termino}%',))
+    
+    @remota
+    def filtrar_prestamos_por_titulo(self, termino):
+        """Préstamos de libros cuyo título contiene ``termino`` (mismas columnas que listar_prestamos_activos)"""
+        return self.execute_query(sql.SEARCH_PRESTAMOS_BY_TITLE, (f'%{termino}%',))
+    
+    @remota
+    def historial_usuario(self, nombre_usuario):
+        """Todos los préstamos de un usuario, del más reciente al más antiguo"""
+        return self.execute_query(sql.SELECT_HISTORIAL_USUARIO, (nombre_usuario,))
+    
+    @remota
+    def obtener_pagina_historial(self, desde=None, direccion="siguiente", tamaño=None):
+        """Obtener una página del historial, del préstamo más reciente al más antiguo.
+        
+        ``desde`` es la clave (fecha_prestamo, id) de la última fila de la página
+        actual para ir a la siguiente, o de la primera para ir a la anterior.
+        """
+        return self.obtener_pagina(
+            (sql.SELECT_HISTORIAL_PRIMERA_PAGINA,
+             sql.SELECT_HISTORIAL_PAGINA_SIGUIENTE,
+             sql.SELECT_HISTORIAL_PAGINA_ANTERIOR),
+            lambda prestamo: (prestamo[3], prestamo[0]),
+            desde, direccion, tamaño
+        )
+    
+    @remota
+    def obtener_prestamos_vencidos(self, hoy=None):
+        """Préstamos activos vencidos antes de ``hoy``, del más atrasado al menos.
+        
+        Cada fila: (id, isbn, titulo, usuario, fecha_prestamo, fecha_vencimiento,
+        días de atraso), con las fechas como número de día. Recorre el índice
+        parcial de vencimientos.
+        """
+        hoy = fechas.a_dia(hoy) if hoy is not None else fechas.hoy()
+        return self.execute_query(sql.SELECT_PRESTAMOS_VENCIDOS, (hoy, hoy))
+    
+    def lotes_recordatorio(self, dias_antes=2, hoy=None, tamaño_lote=None):
+        """Generar lotes de préstamos activos que vencen en los próximos ``dias_antes``
+        días (o ya vencidos), ordenados por vencimiento.
+        
+        Cada lote es una consulta por clave (fecha_vencimiento, id) sobre el
+        índice de vencimientos, así que la memoria no depende del total.
+        """
+        hoy = fechas.a_dia(hoy) if hoy is not None else fechas.hoy()
+        limite = hoy + dias_antes
+        tamaño_lote = tamaño_lote or TAMAÑO_LOTE
+        clave = (fechas.DIA_MINIMO, 0)
+        while True:
+            lote = self.execute_query(sql.SELECT_PRESTAMOS_POR_VENCER_LOTE,
+                                      (limite, *clave, tamaño_lote))
+            if not lote:
+                return
+            yield lote
+            if len(lote) < tamaño_lote:
+                return
+            clave = (lote[-1][5], lote[-1][0])
+    
+    @remota
+    def obtener_prestamos_entre(self, desde, hasta):
+        """Préstamos hechos entre ``desde`` y ``hasta`` (inclusive), del más reciente
+        al más antiguo.
+        
+        Los límites pueden ser números de día, date o 'AAAA-MM-DD'. Es un
+        rango sobre idx_prestamos_fecha; las filas tienen el formato de
+        SELECT_PRESTAMOS_WITH_BOOKS.
+        """
+        return self.execute_query(sql.SELECT_PRESTAMOS_ENTRE_FECHAS,
+                                  (fechas.a_dia(desde), fechas.a_dia(hasta)))
+    
+    @remota
+    def contar_prestamos_entre(self, desde, hasta):
+        """Cantidad de préstamos hechos entre ``desde`` y ``hasta`` (inclusive),
+        contada solo sobre el índice de fechas"""
+        resultado = self.execute_query(sql.COUNT_PRESTAMOS_ENTRE_FECHAS,
+                                       (fechas.a_dia(desde), fechas.a_dia(hasta)))
+        return resultado[0][0] if resultado else 0
@@ -0,0 +1,235 @@
+# servidor_api.py - Servidor HTTP/JSON local sobre los servicios de la biblioteca
+
+"""
+Cuando varios mostradores usan el mismo biblioteca.db desde una carpeta
+compartida, cada uno toma los bloqueos de SQLite sobre la red, que son lentos
+y poco confiables. ServidorBiblioteca corre en la máquina que tiene el
+archivo, lo abre con un único pool de conexiones y atiende por HTTP las
+operaciones de los servicios; los mostradores se conectan con
+ClienteBiblioteca (ver cliente_api.py) y ya no tocan el archivo.
+
+Se exponen los métodos marcados con @remota en database_manager.py y
+servicios.py, con el mismo nombre y los mismos argumentos:
+
+    POST /operacion/prestar_libro   {"args": ["978-84-376-0494-7", "Juan Pérez"]}
+    -> 200 {"resultado": 1234}
+
+    POST /lote   {"operaciones": [{"operacion": "devolver_prestamo", "args": [1234]},
+                                  {"operacion": "listar_prestamos_activos"}]}
+    -> 200 {"resultados": [{"resultado": true}, {"resultado": [[...], ...]}]}
+
+    GET /estado  -> 200 {"estado": "ok", "operaciones": [...]}
+
+    GET /exportar?formato=csv&consultas=SELECT_ALL_LIBROS,SELECT_ALL_AUTORES
+    -> 200 ZIP con un archivo por consulta; cabecera X-Biblio-Filas {"SELECT_ALL_LIBROS": 1234, ...}
+
+La exportación (ver exportador.py) se lee en el servidor desde una misma
+instantánea, se comprime en un archivo temporal y se envía de a partes: el
+mostrador la descarga sin abrir el archivo de la base. Sin ``consultas`` se
+exportan las de CONSULTAS_POR_DEFECTO.
+
+Un ValueError de la operación (datos inválidos, ISBN repetido) o un
+TypeError (argumentos que no corresponden) responde 400 con {"error":
+mensaje, "tipo": nombre de la excepción}; si la base siguió bloqueada
+después de los reintentos (ErrorBloqueo, ver bloqueos.py), 503; cualquier
+otro error, 500. En un lote cada operación tiene su propio resultado o
+error y se ejecuta en su propia transacción, en orden; el lote ahorra los
+viajes de ida y vuelta.
+
+Para pruebas, ``servidor_local`` lo levanta en 127.0.0.1 en un puerto libre:
+
+    with servidor_local("/tmp/prueba.db") as servidor:
+        cliente = ClienteBiblioteca(servidor.url)
+        cliente.llamar("buscar_libros", "soledad")
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+from .servicios import ServicioAutores, ServicioLibros, ServicioPrestamos
+from .bloqueos import ErrorBloqueo
+from .cliente_api import CABECERA_CLAVE, CABECERA_FILAS
+from .exportador import exportar
+from .db_config import SERVIDOR_PUERTO, SERVIDOR_CLAVE, SERVIDOR_PERFIL, MAX_OPERACIONES_LOTE
+
+def operaciones_remotas(*servicios):
+    """Diccionario nombre -> método de las operaciones @remota de los servicios"""
+    operaciones = {}
+    for servicio in servicios:
+        for nombre in dir(type(servicio)):
+            if getattr(getattr(type(servicio), nombre), "remota", False):
+                operaciones[nombre] = getattr(servicio, nombre)
+    return operaciones
+
+def _a_json(valor):
+    # Las fechas que lleguen como date se envían como 'AAAA-MM-DD'
+    return json.dumps(valor, ensure_ascii=False, default=str).encode("utf-8")
+
+class _ManejadorBiblioteca(BaseHTTPRequestHandler):
+    """Traduce cada pedido HTTP en llamadas a ServidorBiblioteca.ejecutar"""
+
+    # HTTP/1.1 mantiene abierta la conexión de cada mostrador entre pedidos
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if not self._autorizado():
+            return
+        ruta = urlsplit(self.path)
+        if ruta.path == "/exportar":
+            return self._exportar(parse_qs(ruta.query))
+        if self.path != "/estado":
+            return self._responder(404, {"error": f"Ruta desconocida: {self.path}"})
+        self._responder(200, {"estado": "ok", "operaciones": sorted(self.server.operaciones)})
+
+    def do_POST(self):
+        if not self._autorizado():
+            return
+        try:
+            longitud = int(self.headers.get("Content-Length", 0))
+            cuerpo = json.loads(self.rfile.read(longitud) or b"{}")
+        except ValueError as e:
+            return self._responder(400, {"error": f"JSON inválido: {e}"})
+        if not isinstance(cuerpo, dict):
+            return self._responder(400, {"error": "Se esperaba un objeto JSON"})
+
+        if self.path == "/lote":
+            operaciones = cuerpo.get("operaciones") or []
+            if len(operaciones) > MAX_OPERACIONES_LOTE:
+                return self._responder(413, {"error": f"Más de {MAX_OPERACIONES_LOTE} operaciones en el lote"})
+            resultados = [
+                self.server.ejecutar(op.get("operacion"), op.get("args"), op.get("kwargs"))[1]
+                if isinstance(op, dict) else {"error": "Operación mal formada", "tipo": "ValueError"}
+                for op in operaciones
+            ]
+            return self._responder(200, {"resultados": resultados})
+
+        if self.path.startswith("/operacion/"):
+            nombre = self.path[len("/operacion/"):]
+            codigo, respuesta = self.server.ejecutar(nombre, cuerpo.get("args"), cuerpo.get("kwargs"))
+            return self._responder(codigo, respuesta)
+
+        self._responder(404, {"error": f"Ruta desconocida: {self.path}"})
+
+    def _exportar(self, parametros):
+        formato = parametros.get("formato", ["csv"])[0]
+        consultas = [nombre for nombre in parametros.get("consultas", [""])[0].split(",") if nombre]
+        with tempfile.TemporaryDirectory(prefix="biblio_exportacion_") as directorio:
+            codigo, resultado = self.server.exportar(directorio, consultas or None, formato)
+            if codigo != 200:
+                return self._responder(codigo, resultado)
+            ruta_zip = os.path.join(directorio, "exportacion.zip")
+            with zipfile.ZipFile(ruta_zip, "w", zipfile.ZIP_DEFLATED) as archivo_zip:
+                for ruta, _ in resultado.values():
+                    archivo_zip.write(ruta, os.path.basename(ruta))
+            self.send_response(200)
+            self.send_header("Content-Type", "application/zip")
+            self.send_header("Content-Length", str(os.path.getsize(ruta_zip)))
+            self.send_header(CABECERA_FILAS, json.dumps({nombre: filas for nombre, (_, filas) in resultado.items()}))
+            self.end_headers()
+            with open(ruta_zip, "rb") as archivo_zip:
+                shutil.copyfileobj(archivo_zip, self.wfile)
+
+    def _autorizado(self):
+        if not self.server.clave or self.headers.get(CABECERA_CLAVE) == self.server.clave:
+            return True
+        self._responder(401, {"error": "Clave del servidor incorrecta"})
+        return False
+
+    def _responder(self, codigo, datos):
+        cuerpo = _a_json(datos)
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *args):
+        if self.server.verbose:
+            super().log_message(formato, *args)
+
+class ServidorBiblioteca(ThreadingHTTPServer):
+    """Servidor HTTP que atiende las operaciones de los servicios sobre un archivo"""
+
+    daemon_threads = True
+
+    def __init__(self, db_name="biblioteca.db", host="127.0.0.1", puerto=None,
+                 clave=None, verbose=False, perfil=None):
+        self.db_name = db_name
+        self.clave = SERVIDOR_CLAVE if clave is None else clave
+        self.verbose = verbose
+        # El servidor es el único que abre el archivo: puede usar WAL (SERVIDOR_PERFIL)
+        self.perfil = SERVIDOR_PERFIL if perfil is None else perfil
+        self.servicios = [ServicioAutores(db_name, self.perfil), ServicioLibros(db_name, self.perfil),
+                          ServicioPrestamos(db_name, self.perfil)]
+        # El servidor siempre trabaja sobre el archivo, aunque el proceso
+        # tenga un cliente configurado (por ejemplo en una prueba); en ese
+        # caso el esquema no se verificó al crearlos y se verifica ahora
+        for servicio in self.servicios:
+            servicio.cliente = None
+        # El pool pudo existir antes en el proceso, con otro perfil
+        self.servicios[0].pool.cambiar_perfil(self.perfil)
+        self.servicios[0].init_database()
+        self.operaciones = operaciones_remotas(*self.servicios)
+        self._hilo = None
+        super().__init__((host, SERVIDOR_PUERTO if puerto is None else puerto), _ManejadorBiblioteca)
+
+    @property
+    def url(self):
+        host, puerto = self.server_address[:2]
+        return f"http://{host}:{puerto}"
+
+    def ejecutar(self, nombre, args=None, kwargs=None):
+        """Ejecutar una operación y retornar (código HTTP, respuesta)"""
+        operacion = self.operaciones.get(nombre)
+        if operacion is None:
+            return 404, {"error": f"Operación desconocida: {nombre}", "tipo": "LookupError"}
+        codigo, respuesta = self._capturar(nombre, operacion, *(args or []), **(kwargs or {}))
+        return (200, {"resultado": respuesta}) if codigo == 200 else (codigo, respuesta)
+
+    def exportar(self, directorio, consultas=None, formato="csv"):
+        """Exportar consultas a ``directorio`` (ver exportador.exportar) y
+        retornar (código HTTP, diccionario nombre -> (ruta, filas) o error)"""
+        return self._capturar("exportar", exportar, self.servicios[0], directorio, consultas, formato)
+
+    def _capturar(self, nombre, funcion, *args, **kwargs):
+        """Llamar a ``funcion`` y retornar (200, resultado) o (código HTTP, error)"""
+        try:
+            return 200, funcion(*args, **kwargs)
+        except ErrorBloqueo as e:
+            return 503, {"error": str(e), "tipo": "ErrorBloqueo"}
+        except (ValueError, TypeError) as e:
+            # Datos inválidos o argumentos que no corresponden a la operación
+            return 400, {"error": str(e), "tipo": type(e).__name__}
+        except Exception as e:
+            print(f"❌ Error en la operación {nombre}: {e}")
+            return 500, {"error": str(e), "tipo": type(e).__name__}
+
+    def iniciar_en_segundo_plano(self):
+        """Atender pedidos en un hilo aparte y retornar enseguida"""
+        self._hilo = threading.Thread(target=self.serve_forever, name="servidor-biblioteca", daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        """Dejar de atender pedidos y cerrar el socket y las conexiones a la base"""
+        if self._hilo is not None:
+            self.shutdown()
+            self._hilo.join()
+            self._hilo = None
+        self.server_close()
+        self.servicios[0].cerrar_conexiones()
+
+@contextmanager
+def servidor_local(db_name, clave=None):
+    """Levantar un servidor en 127.0.0.1 (puerto libre) mientras dura el bloque"""
+    servidor = ServidorBiblioteca(db_name, "127.0.0.1", 0, clave=clave).iniciar_en_segundo_plano()
+    try:
+        yield servidor
+    finally:
+        servidor.detener()
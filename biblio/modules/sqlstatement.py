@@ -1,7 +1,7 @@
 # sqlstatement.py - Sentencias SQL para el Sistema de Gestión de Biblioteca
 
 # ================================
-# CREACIÓN DE TABLAS
+# CREACIÓN DE TABLAS (esquema versión 1, ver schema_migrations.py)
 # ================================
 
 CREATE_TABLE_AUTORES = '''
@@ -39,6 +39,70 @@ CREATE TABLE IF NOT EXISTS prestamos (
 )
 '''
 
+# ================================
+# CONTROL DE VERSIONES DEL ESQUEMA
+# ================================
+
+CREATE_TABLE_SCHEMA_VERSION = '''
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER PRIMARY KEY,
+    descripcion TEXT NOT NULL,
+    aplicada_en TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+)
+'''
+
+SELECT_SCHEMA_VERSION = "SELECT MAX(version) FROM schema_version"
+
+INSERT_SCHEMA_VERSION = '''
+INSERT INTO schema_version (version, descripcion)
+VALUES (?, ?)
+'''
+
+# Triggers de libros y prestamos (nombre, sql), para suspenderlos durante
+# una carga masiva y volver a crearlos tal cual
+SELECT_TRIGGERS_CARGA = '''
+SELECT name, sql FROM sqlite_master
+WHERE type = 'trigger' AND tbl_name IN ('libros', 'prestamos')
+'''
+
+# ================================
+# CONTADORES (mantenidos por triggers, ver schema_migrations.py)
+# ================================
+
+SELECT_CONTADORES = "SELECT clave, valor FROM contadores"
+
+DELETE_CONTADORES = "DELETE FROM contadores"
+
+# Recalcular todos los contadores desde las tablas (reparación)
+INSERT_CONTADORES_DESDE_TABLAS = '''
+INSERT INTO contadores (clave, valor)
+SELECT 'autores', COUNT(*) FROM autores
+UNION ALL SELECT 'libros', COUNT(*) FROM libros
+UNION ALL SELECT 'prestamos', COUNT(*) FROM prestamos
+UNION ALL SELECT 'libros.estado:' || IFNULL(estado, ''), COUNT(*) FROM libros GROUP BY estado
+UNION ALL SELECT 'prestamos.estado:' || IFNULL(estado, ''), COUNT(*) FROM prestamos GROUP BY estado
+'''
+
+# ================================
+# RANKING DE PRÉSTAMOS (mantenido por triggers, ver schema_migrations.py)
+# ================================
+
+DELETE_PRESTAMOS_POR_LIBRO = "DELETE FROM prestamos_por_libro"
+
+DELETE_PRESTAMOS_POR_LIBRO_MES = "DELETE FROM prestamos_por_libro_mes"
+
+# Recalcular el ranking desde prestamos (reparación)
+INSERT_PRESTAMOS_POR_LIBRO_DESDE_PRESTAMOS = '''
+INSERT INTO prestamos_por_libro (libro_id, total)
+SELECT libro_id, COUNT(*) FROM prestamos GROUP BY libro_id
+'''
+
+INSERT_PRESTAMOS_POR_LIBRO_MES_DESDE_PRESTAMOS = '''
+INSERT INTO prestamos_por_libro_mes (mes, libro_id, total)
+SELECT strftime('%Y-%m', fecha_prestamo * 86400, 'unixepoch') as mes, libro_id, COUNT(*) FROM prestamos
+GROUP BY mes, libro_id
+'''
+
 # ================================
 # OPERACIONES CRUD - AUTORES
 # ================================
@@ -71,7 +135,7 @@ WHERE autor_id = ?
 CHECK_LIBRO_HAS_ACTIVE_LOANS = """
 SELECT COUNT(*) 
 FROM prestamos 
-WHERE isbn = ? AND fecha_devolucion IS NULL
+WHERE libro_id = (SELECT id FROM libros WHERE isbn = ?) AND fecha_devolucion IS NULL
 """
 
 # SELECT con JOINs
@@ -83,6 +147,36 @@ LEFT JOIN autores a ON l.autor_id = a.id
 ORDER BY l.titulo
 """
 
+# Catálogo paginado por clave (titulo, isbn)
+SELECT_LIBROS_PRIMERA_PAGINA = """
+SELECT l.isbn, l.titulo, l.autor_id, l.año_publicacion, l.editorial, l.genero, l.estado,
+       COALESCE(a.nombre || ' ' || a.apellido, 'Sin autor') as nombre_autor
+FROM libros l
+LEFT JOIN autores a ON l.autor_id = a.id
+ORDER BY l.titulo, l.isbn
+LIMIT ?
+"""
+
+SELECT_LIBROS_PAGINA_SIGUIENTE = """
+SELECT l.isbn, l.titulo, l.autor_id, l.año_publicacion, l.editorial, l.genero, l.estado,
+       COALESCE(a.nombre || ' ' || a.apellido, 'Sin autor') as nombre_autor
+FROM libros l
+LEFT JOIN autores a ON l.autor_id = a.id
+WHERE (l.titulo, l.isbn) > (?, ?)
+ORDER BY l.titulo, l.isbn
+LIMIT ?
+"""
+
+SELECT_LIBROS_PAGINA_ANTERIOR = """
+SELECT l.isbn, l.titulo, l.autor_id, l.año_publicacion, l.editorial, l.genero, l.estado,
+       COALESCE(a.nombre || ' ' || a.apellido, 'Sin autor') as nombre_autor
+FROM libros l
+LEFT JOIN autores a ON l.autor_id = a.id
+WHERE (l.titulo, l.isbn) < (?, ?)
+ORDER BY l.titulo DESC, l.isbn DESC
+LIMIT ?
+"""
+
 SELECT_LIBROS_DISPONIBLES_FOR_COMBO = """
 SELECT isbn, titulo
 FROM libros 
@@ -105,37 +199,81 @@ WHERE id = ?
 
 # SELECT con JOINs para préstamos
 SELECT_PRESTAMOS_WITH_BOOKS = """
-SELECT p.id, p.isbn, p.nombre_usuario, p.fecha_prestamo, p.fecha_devolucion, p.estado,
-       l.titulo
+SELECT p.id, l.isbn, p.nombre_usuario, p.fecha_prestamo, p.fecha_devolucion, p.estado,
+       l.titulo, p.fecha_vencimiento
 FROM prestamos p
-LEFT JOIN libros l ON p.isbn = l.isbn
+LEFT JOIN libros l ON l.id = p.libro_id
 WHERE p.fecha_devolucion IS NULL
 ORDER BY p.fecha_prestamo DESC
 """
 
 SELECT_HISTORIAL_PRESTAMOS = """
-SELECT p.id, p.isbn, p.nombre_usuario, p.fecha_prestamo, p.fecha_devolucion, p.estado,
+SELECT p.id, l.isbn, p.nombre_usuario, p.fecha_prestamo, p.fecha_devolucion, p.estado,
        l.titulo
 FROM prestamos p
-LEFT JOIN libros l ON p.isbn = l.isbn
+LEFT JOIN libros l ON l.id = p.libro_id
 ORDER BY p.fecha_prestamo DESC
 """
 
+# Historial paginado por clave (fecha_prestamo, id), del más reciente al más antiguo
+SELECT_HISTORIAL_PRIMERA_PAGINA = """
+SELECT p.id, l.isbn, p.nombre_usuario, p.fecha_prestamo, p.fecha_devolucion, p.estado,
+       l.titulo
+FROM prestamos p
+LEFT JOIN libros l ON l.id = p.libro_id
+ORDER BY p.fecha_prestamo DESC, p.id DESC
+LIMIT ?
+"""
+
+SELECT_HISTORIAL_PAGINA_SIGUIENTE = """
+SELECT p.id, l.isbn, p.nombre_usuario, p.fecha_prestamo, p.fecha_devolucion, p.estado,
+       l.titulo
+FROM prestamos p
+LEFT JOIN libros l ON l.id = p.libro_id
+WHERE (p.fecha_prestamo, p.id) < (?, ?)
+ORDER BY p.fecha_prestamo DESC, p.id DESC
+LIMIT ?
+"""
+
+SELECT_HISTORIAL_PAGINA_ANTERIOR = """
+SELECT p.id, l.isbn, p.nombre_usuario, p.fecha_prestamo, p.fecha_devolucion, p.estado,
+       l.titulo
+FROM prestamos p
+LEFT JOIN libros l ON l.id = p.libro_id
+WHERE (p.fecha_prestamo, p.id) > (?, ?)
+ORDER BY p.fecha_prestamo ASC, p.id ASC
+LIMIT ?
+"""
+
+# Préstamos hechos entre dos números de día (inclusive), por idx_prestamos_fecha
+SELECT_PRESTAMOS_ENTRE_FECHAS = """
+SELECT p.id, l.isbn, p.nombre_usuario, p.fecha_prestamo, p.fecha_devolucion, p.estado,
+       l.titulo, p.fecha_vencimiento
+FROM prestamos p
+LEFT JOIN libros l ON l.id = p.libro_id
+WHERE p.fecha_prestamo BETWEEN ? AND ?
+ORDER BY p.fecha_prestamo DESC, p.id DESC
+"""
+
+COUNT_PRESTAMOS_ENTRE_FECHAS = """
+SELECT COUNT(*) FROM prestamos WHERE fecha_prestamo BETWEEN ? AND ?
+"""
+
 # Búsquedas específicas
 SEARCH_PRESTAMOS_BY_USER = """
-SELECT p.id, p.isbn, p.nombre_usuario, p.fecha_prestamo, p.fecha_devolucion, p.estado,
-       l.titulo
+SELECT p.id, l.isbn, p.nombre_usuario, p.fecha_prestamo, p.fecha_devolucion, p.estado,
+       l.titulo, p.fecha_vencimiento
 FROM prestamos p
-LEFT JOIN libros l ON p.isbn = l.isbn
+LEFT JOIN libros l ON l.id = p.libro_id
 WHERE p.nombre_usuario LIKE ?
 ORDER BY p.fecha_prestamo DESC
 """
 
 SEARCH_PRESTAMOS_BY_TITLE = """
-SELECT p.id, p.isbn, p.nombre_usuario, p.fecha_prestamo, p.fecha_devolucion, p.estado,
-       l.titulo
+SELECT p.id, l.isbn, p.nombre_usuario, p.fecha_prestamo, p.fecha_devolucion, p.estado,
+       l.titulo, p.fecha_vencimiento
 FROM prestamos p
-LEFT JOIN libros l ON p.isbn = l.isbn
+LEFT JOIN libros l ON l.id = p.libro_id
 WHERE l.titulo LIKE ?
 ORDER BY p.fecha_prestamo DESC
 """
@@ -153,6 +291,12 @@ FROM autores
 WHERE id = ?
 '''
 
+# Nombres de todos los autores (mapa nombre -> id de la importación)
+SELECT_AUTORES_NOMBRES = '''
+SELECT id, nombre, apellido
+FROM autores
+'''
+
 UPDATE_AUTOR = '''
 UPDATE autores
 SET nombre = ?, apellido = ?, nacionalidad = ?, fecha_nacimiento = ?
@@ -178,6 +322,68 @@ INSERT INTO libros (isbn, titulo, autor_id, año_publicacion, editorial, genero,
 VALUES (?, ?, ?, ?, ?, ?, ?)
 '''
 
+# Alta o actualización por ISBN (importación de catálogos); no toca el estado
+UPSERT_LIBRO = '''
+INSERT INTO libros (isbn, titulo, autor_id, año_publicacion, editorial, genero, estado)
+VALUES (?, ?, ?, ?, ?, ?, 'Disponible')
+ON CONFLICT(isbn) DO UPDATE SET
+    titulo = excluded.titulo,
+    autor_id = excluded.autor_id,
+    año_publicacion = excluded.año_publicacion,
+    editorial = excluded.editorial,
+    genero = excluded.genero
+'''
+
+# Importación por lotes (importador.py): el lote se carga en una tabla
+# temporal y libros y libros_fts se actualizan con una sentencia cada uno.
+# Si un ISBN se repite en el lote queda la última fila, como con UPSERT_LIBRO.
+# Insertar en orden de título recorre los índices por título de a una página
+CREATE_LOTE_IMPORTACION = '''
+CREATE TEMP TABLE IF NOT EXISTS lote_importacion (
+    isbn TEXT PRIMARY KEY,
+    titulo TEXT,
+    autor_id INTEGER,
+    año_publicacion INTEGER,
+    editorial TEXT,
+    genero TEXT
+)
+'''
+
+DELETE_LOTE_IMPORTACION = "DELETE FROM temp.lote_importacion"
+
+INSERT_LOTE_IMPORTACION = '''
+INSERT OR REPLACE INTO temp.lote_importacion (isbn, titulo, autor_id, año_publicacion, editorial, genero)
+VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+# Entradas de libros_fts de los libros del lote que ya existían
+DELETE_LIBROS_FTS_LOTE = '''
+DELETE FROM libros_fts
+WHERE rowid IN (SELECT l.id FROM temp.lote_importacion t JOIN libros l ON l.isbn = t.isbn)
+'''
+
+UPSERT_LIBROS_LOTE = '''
+INSERT INTO libros (isbn, titulo, autor_id, año_publicacion, editorial, genero, estado)
+SELECT isbn, titulo, autor_id, año_publicacion, editorial, genero, 'Disponible'
+FROM temp.lote_importacion
+WHERE true
+ORDER BY titulo
+ON CONFLICT(isbn) DO UPDATE SET
+    titulo = excluded.titulo,
+    autor_id = excluded.autor_id,
+    año_publicacion = excluded.año_publicacion,
+    editorial = excluded.editorial,
+    genero = excluded.genero
+'''
+
+INSERT_LIBROS_FTS_LOTE = '''
+INSERT INTO libros_fts (rowid, titulo, genero, editorial, autor)
+SELECT l.id, l.titulo, l.genero, l.editorial, a.nombre || ' ' || a.apellido
+FROM temp.lote_importacion t
+JOIN libros l ON l.isbn = t.isbn
+LEFT JOIN autores a ON l.autor_id = a.id
+'''
+
 SELECT_ALL_LIBROS = '''
 SELECT l.isbn, l.titulo, 
        COALESCE(a.nombre || ' ' || a.apellido, 'Sin autor') as autor,
@@ -234,37 +440,187 @@ WHERE l.genero LIKE ?
 ORDER BY l.titulo
 '''
 
+# Búsqueda de texto completo (título, género, editorial y autor), paginada
+# por clave en dos tramos (ver ServicioLibros.buscar_libros): primero las
+# coincidencias de palabras completas por relevancia, con clave (rank, rowid);
+# después las que solo coinciden por prefijo, por rowid, sin calcular la
+# relevancia sobre miles de filas. Las columnas son las de las páginas del
+# catálogo más la clave (fase, orden, id)
+SEARCH_LIBROS_FTS = '''
+SELECT l.isbn, l.titulo, l.autor_id, l.año_publicacion, l.editorial, l.genero, l.estado,
+       COALESCE(a.nombre || ' ' || a.apellido, 'Sin autor') as nombre_autor,
+       0 as fase, f.rank as orden, l.id
+FROM (
+    SELECT rowid, rank
+    FROM libros_fts
+    WHERE libros_fts MATCH ?
+    ORDER BY rank, rowid
+    LIMIT ?
+) f
+JOIN libros l ON l.id = f.rowid
+LEFT JOIN autores a ON l.autor_id = a.id
+ORDER BY f.rank, l.id
+'''
+
+SEARCH_LIBROS_FTS_SIGUIENTE = '''
+SELECT l.isbn, l.titulo, l.autor_id, l.año_publicacion, l.editorial, l.genero, l.estado,
+       COALESCE(a.nombre || ' ' || a.apellido, 'Sin autor') as nombre_autor,
+       0 as fase, f.rank as orden, l.id
+FROM (
+    SELECT rowid, rank
+    FROM libros_fts
+    WHERE libros_fts MATCH ? AND (rank, rowid) > (?, ?)
+    ORDER BY rank, rowid
+    LIMIT ?
+) f
+JOIN libros l ON l.id = f.rowid
+LEFT JOIN autores a ON l.autor_id = a.id
+ORDER BY f.rank, l.id
+'''
+
+SEARCH_LIBROS_FTS_ANTERIOR = '''
+SELECT l.isbn, l.titulo, l.autor_id, l.año_publicacion, l.editorial, l.genero, l.estado,
+       COALESCE(a.nombre || ' ' || a.apellido, 'Sin autor') as nombre_autor,
+       0 as fase, f.rank as orden, l.id
+FROM (
+    SELECT rowid, rank
+    FROM libros_fts
+    WHERE libros_fts MATCH ? AND (rank, rowid) < (?, ?)
+    ORDER BY rank DESC, rowid DESC
+    LIMIT ?
+) f
+JOIN libros l ON l.id = f.rowid
+LEFT JOIN autores a ON l.autor_id = a.id
+ORDER BY f.rank DESC, l.id DESC
+'''
+
+SEARCH_LIBROS_FTS_ULTIMA = '''
+SELECT l.isbn, l.titulo, l.autor_id, l.año_publicacion, l.editorial, l.genero, l.estado,
+       COALESCE(a.nombre || ' ' || a.apellido, 'Sin autor') as nombre_autor,
+       0 as fase, f.rank as orden, l.id
+FROM (
+    SELECT rowid, rank
+    FROM libros_fts
+    WHERE libros_fts MATCH ?
+    ORDER BY rank DESC, rowid DESC
+    LIMIT ?
+) f
+JOIN libros l ON l.id = f.rowid
+LEFT JOIN autores a ON l.autor_id = a.id
+ORDER BY f.rank DESC, l.id DESC
+'''
+
+SEARCH_LIBROS_FTS_PREFIX = '''
+SELECT l.isbn, l.titulo, l.autor_id, l.año_publicacion, l.editorial, l.genero, l.estado,
+       COALESCE(a.nombre || ' ' || a.apellido, 'Sin autor') as nombre_autor,
+       1 as fase, 0 as orden, l.id
+FROM (
+    SELECT rowid
+    FROM libros_fts
+    WHERE libros_fts MATCH ?
+    ORDER BY rowid
+    LIMIT ?
+) f
+JOIN libros l ON l.id = f.rowid
+LEFT JOIN autores a ON l.autor_id = a.id
+ORDER BY l.id
+'''
+
+SEARCH_LIBROS_FTS_PREFIX_SIGUIENTE = '''
+SELECT l.isbn, l.titulo, l.autor_id, l.año_publicacion, l.editorial, l.genero, l.estado,
+       COALESCE(a.nombre || ' ' || a.apellido, 'Sin autor') as nombre_autor,
+       1 as fase, 0 as orden, l.id
+FROM (
+    SELECT rowid
+    FROM libros_fts
+    WHERE libros_fts MATCH ? AND rowid > ?
+    ORDER BY rowid
+    LIMIT ?
+) f
+JOIN libros l ON l.id = f.rowid
+LEFT JOIN autores a ON l.autor_id = a.id
+ORDER BY l.id
+'''
+
+SEARCH_LIBROS_FTS_PREFIX_ANTERIOR = '''
+SELECT l.isbn, l.titulo, l.autor_id, l.año_publicacion, l.editorial, l.genero, l.estado,
+       COALESCE(a.nombre || ' ' || a.apellido, 'Sin autor') as nombre_autor,
+       1 as fase, 0 as orden, l.id
+FROM (
+    SELECT rowid
+    FROM libros_fts
+    WHERE libros_fts MATCH ? AND rowid < ?
+    ORDER BY rowid DESC
+    LIMIT ?
+) f
+JOIN libros l ON l.id = f.rowid
+LEFT JOIN autores a ON l.autor_id = a.id
+ORDER BY l.id DESC
+'''
+
+SEARCH_LIBROS_FTS_PREFIX_ULTIMA = '''
+SELECT l.isbn, l.titulo, l.autor_id, l.año_publicacion, l.editorial, l.genero, l.estado,
+       COALESCE(a.nombre || ' ' || a.apellido, 'Sin autor') as nombre_autor,
+       1 as fase, 0 as orden, l.id
+FROM (
+    SELECT rowid
+    FROM libros_fts
+    WHERE libros_fts MATCH ?
+    ORDER BY rowid DESC
+    LIMIT ?
+) f
+JOIN libros l ON l.id = f.rowid
+LEFT JOIN autores a ON l.autor_id = a.id
+ORDER BY l.id DESC
+'''
+
+# Reconstrucción completa del índice de búsqueda
+DELETE_LIBROS_FTS = "DELETE FROM libros_fts"
+
+INSERT_LIBROS_FTS_FROM_LIBROS = '''
+INSERT INTO libros_fts (rowid, titulo, genero, editorial, autor)
+SELECT l.id, l.titulo, l.genero, l.editorial, a.nombre || ' ' || a.apellido
+FROM libros l
+LEFT JOIN autores a ON l.autor_id = a.id
+'''
+
 # ================================
 # OPERACIONES CRUD - PRÉSTAMOS
 # ================================
 
 INSERT_PRESTAMO = '''
-INSERT INTO prestamos (isbn, nombre_usuario, fecha_prestamo, estado)
-VALUES (?, ?, ?, 'Activo')
+INSERT INTO prestamos (libro_id, nombre_usuario, fecha_prestamo, fecha_vencimiento, estado)
+VALUES ((SELECT id FROM libros WHERE isbn = ?), ?, ?, ?, 'Activo')
+'''
+
+# Préstamo ya cerrado (importaciones y datos de prueba)
+INSERT_PRESTAMO_DEVUELTO = '''
+INSERT INTO prestamos (libro_id, nombre_usuario, fecha_prestamo, fecha_vencimiento, fecha_devolucion, estado)
+VALUES ((SELECT id FROM libros WHERE isbn = ?), ?, ?, ?, ?, ?)
 '''
 
 SELECT_ALL_PRESTAMOS = '''
-SELECT p.id, p.isbn, l.titulo, p.nombre_usuario, 
+SELECT p.id, l.isbn, l.titulo, p.nombre_usuario, 
        p.fecha_prestamo, p.fecha_devolucion, p.estado
 FROM prestamos p
-JOIN libros l ON p.isbn = l.isbn
+JOIN libros l ON l.id = p.libro_id
 ORDER BY p.fecha_prestamo DESC
 '''
 
 SELECT_PRESTAMOS_ACTIVOS = '''
-SELECT p.id, p.isbn, l.titulo, p.nombre_usuario, 
+SELECT p.id, l.isbn, l.titulo, p.nombre_usuario, 
        p.fecha_prestamo, p.estado
 FROM prestamos p
-JOIN libros l ON p.isbn = l.isbn
+JOIN libros l ON l.id = p.libro_id
 WHERE p.estado = 'Activo'
 ORDER BY p.fecha_prestamo DESC
 '''
 
 SELECT_PRESTAMO_BY_ID = '''
-SELECT p.id, p.isbn, l.titulo, p.nombre_usuario, 
+SELECT p.id, l.isbn, l.titulo, p.nombre_usuario, 
        p.fecha_prestamo, p.fecha_devolucion, p.estado
 FROM prestamos p
-JOIN libros l ON p.isbn = l.isbn
+JOIN libros l ON l.id = p.libro_id
 WHERE p.id = ?
 '''
 
@@ -277,7 +633,49 @@ WHERE id = ?
 # Verificar si un libro está disponible para préstamo
 CHECK_LIBRO_DISPONIBLE = '''
 SELECT COUNT(*) FROM prestamos 
-WHERE isbn = ? AND estado = 'Activo'
+WHERE libro_id = (SELECT id FROM libros WHERE isbn = ?) AND estado = 'Activo'
+'''
+
+# Préstamo y devolución en una sola sentencia: las condiciones evitan que dos
+# puestos presten el mismo ejemplar o devuelvan dos veces el mismo préstamo.
+# El estado del libro lo actualizan los triggers de prestamos (esquema v6).
+INSERT_PRESTAMO_SI_DISPONIBLE = '''
+INSERT INTO prestamos (libro_id, nombre_usuario, fecha_prestamo, fecha_vencimiento, estado)
+SELECT id, ?, ?, ?, 'Activo'
+FROM libros
+WHERE isbn = ? AND estado = 'Disponible'
+'''
+
+UPDATE_PRESTAMO_DEVOLVER_SI_ACTIVO = '''
+UPDATE prestamos
+SET fecha_devolucion = ?, estado = 'Devuelto'
+WHERE id = ? AND fecha_devolucion IS NULL
+'''
+
+# Estado de un libro (para refrescar una sola fila de la tabla)
+SELECT_LIBRO_ESTADO = '''
+SELECT estado FROM libros WHERE isbn = ?
+'''
+
+SELECT_LIBRO_EXISTE_ISBN = '''
+SELECT 1 FROM libros WHERE isbn = ?
+'''
+
+# Libros cuyo estado no coincide con sus préstamos activos, y su corrección
+# en una sola sentencia (misma regla que los triggers del esquema v6)
+COUNT_LIBROS_ESTADO_INCONSISTENTE = '''
+SELECT COUNT(*) FROM libros
+WHERE (IFNULL(estado, '') = 'Prestado') !=
+      EXISTS (SELECT 1 FROM prestamos p WHERE p.libro_id = libros.id AND p.fecha_devolucion IS NULL)
+'''
+
+REPARAR_ESTADO_LIBROS = '''
+UPDATE libros
+SET estado = CASE WHEN EXISTS (SELECT 1 FROM prestamos p
+                               WHERE p.libro_id = libros.id AND p.fecha_devolucion IS NULL)
+                  THEN 'Prestado' ELSE 'Disponible' END
+WHERE (IFNULL(estado, '') = 'Prestado') !=
+      EXISTS (SELECT 1 FROM prestamos p WHERE p.libro_id = libros.id AND p.fecha_devolucion IS NULL)
 '''
 
 # Actualizar estado del libro a prestado
@@ -309,33 +707,59 @@ ORDER BY apellido, nombre
 SELECT_LIBROS_MAS_PRESTADOS = '''
 SELECT l.isbn, l.titulo, 
        COALESCE(a.nombre || ' ' || a.apellido, 'Sin autor') as autor,
-       COUNT(p.id) as total_prestamos
-FROM libros l
+       r.total as total_prestamos
+FROM (SELECT libro_id, total FROM prestamos_por_libro
+      ORDER BY total DESC, libro_id LIMIT ?) r
+JOIN libros l ON l.id = r.libro_id
+LEFT JOIN autores a ON l.autor_id = a.id
+ORDER BY total_prestamos DESC, l.titulo
+'''
+
+# Libros más prestados entre dos meses 'AAAA-MM' (inclusive)
+SELECT_LIBROS_MAS_PRESTADOS_PERIODO = '''
+SELECT l.isbn, l.titulo, 
+       COALESCE(a.nombre || ' ' || a.apellido, 'Sin autor') as autor,
+       r.total as total_prestamos
+FROM (SELECT libro_id, SUM(total) as total FROM prestamos_por_libro_mes
+      WHERE mes BETWEEN ? AND ?
+      GROUP BY libro_id
+      ORDER BY total DESC, libro_id LIMIT ?) r
+JOIN libros l ON l.id = r.libro_id
 LEFT JOIN autores a ON l.autor_id = a.id
-LEFT JOIN prestamos p ON l.isbn = p.isbn
-GROUP BY l.isbn, l.titulo, autor
-HAVING COUNT(p.id) > 0
 ORDER BY total_prestamos DESC, l.titulo
-LIMIT 10
 '''
 
 # Historial de préstamos de un usuario
 SELECT_HISTORIAL_USUARIO = '''
-SELECT p.id, p.isbn, l.titulo, p.fecha_prestamo, p.fecha_devolucion, p.estado
+SELECT p.id, l.isbn, l.titulo, p.fecha_prestamo, p.fecha_devolucion, p.estado
 FROM prestamos p
-JOIN libros l ON p.isbn = l.isbn
+JOIN libros l ON l.id = p.libro_id
 WHERE p.nombre_usuario = ?
 ORDER BY p.fecha_prestamo DESC
 '''
 
 # Préstamos con retraso (opcional para sistema de multas)
 SELECT_PRESTAMOS_VENCIDOS = '''
-SELECT p.id, p.isbn, l.titulo, p.nombre_usuario, 
-       p.fecha_prestamo,
-       julianday('now') - julianday(p.fecha_prestamo) as dias_transcurridos
+SELECT p.id, l.isbn, l.titulo, p.nombre_usuario, 
+       p.fecha_prestamo, p.fecha_vencimiento,
+       ? - p.fecha_vencimiento as dias_vencido
 FROM prestamos p
-JOIN libros l ON p.isbn = l.isbn
-WHERE p.estado = 'Activo' 
-  AND julianday('now') - julianday(p.fecha_prestamo) > 15
-ORDER BY dias_transcurridos DESC
+JOIN libros l ON l.id = p.libro_id
+WHERE p.fecha_devolucion IS NULL
+  AND p.fecha_vencimiento < ?
+ORDER BY p.fecha_vencimiento, p.id
+'''
+
+# Lotes de recordatorios: préstamos activos que vencen hasta una fecha,
+# paginados por clave (fecha_vencimiento, id)
+SELECT_PRESTAMOS_POR_VENCER_LOTE = '''
+SELECT p.id, l.isbn, l.titulo, p.nombre_usuario, 
+       p.fecha_prestamo, p.fecha_vencimiento
+FROM prestamos p
+JOIN libros l ON l.id = p.libro_id
+WHERE p.fecha_devolucion IS NULL
+  AND p.fecha_vencimiento <= ?
+  AND (p.fecha_vencimiento, p.id) > (?, ?)
+ORDER BY p.fecha_vencimiento, p.id
+LIMIT ?
 '''
@@ -0,0 +1,199 @@
+# trabajador_db.py - Hilos de fondo para las consultas de la interfaz
+
+"""
+Una consulta lenta ejecutada dentro de un callback de DearPyGui congela la
+ventana hasta que termina. TrabajadorDB ejecuta la parte de base de datos en
+un pool de hilos y devuelve el resultado al hilo de la interfaz en el
+cuadro siguiente, cuando el bucle de dibujo de main.py llama a
+``procesar_terminadas()``:
+
+    tarea = trabajador.enviar(manager.obtener_pagina_historial,
+                              al_terminar=mostrar_pagina, clave="table_historial")
+    tarea.cancelar()
+
+Las funciones enviadas no deben llamar a dpg; solo ``al_terminar`` y
+``al_fallar`` corren en el hilo de la interfaz. Si ``al_terminar`` es un
+generador (una función con yield) se avanza de a partes en los cuadros
+siguientes, sin pasar de PRESUPUESTO_CUADRO_MS por cuadro: así se agregan
+miles de filas a una tabla sin que la ventana baje de 60 cuadros por segundo.
+
+Una tarea nueva con la misma ``clave`` cancela la anterior (por ejemplo, dos
+clics seguidos en "Recargar" sobre la misma tabla).
+"""
+
+import inspect
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+from .connection_pool import ConnectionPool
+from .db_config import HILOS_TRABAJADOR, PRESUPUESTO_CUADRO_MS
+
+class Tarea:
+    """Resultado futuro de una función enviada al trabajador"""
+
+    def __init__(self, funcion, args, kwargs, al_terminar, al_fallar, clave, cancelable):
+        self.funcion = funcion
+        self.clave = clave
+        self.cancelable = cancelable
+        self.cancelada = False
+        self.enviada = time.monotonic()
+        self._args = args
+        self._kwargs = kwargs
+        self._al_terminar = al_terminar
+        self._al_fallar = al_fallar
+        self._future = None
+        # Hilo que la está ejecutando, para interrumpir su consulta al cancelar
+        self._hilo = None
+        self._lock = threading.Lock()
+
+    def _ejecutar(self):
+        """Correr la función en el hilo del trabajador"""
+        with self._lock:
+            if self.cancelada:
+                raise CancelledError()
+            self._hilo = threading.get_ident()
+        try:
+            return self.funcion(*self._args, **self._kwargs)
+        finally:
+            with self._lock:
+                self._hilo = None
+
+    def cancelar(self):
+        """Cancelar la tarea; sus callbacks ya no se llaman.
+
+        Si todavía no empezó no llega a ejecutarse; si está corriendo se
+        interrumpe la consulta en curso (sqlite3 Connection.interrupt). Las
+        tareas no cancelables (escrituras) siguen y retornan False.
+        """
+        if not self.cancelable:
+            return False
+        with self._lock:
+            self.cancelada = True
+            self._future.cancel()
+            # Con el lock tomado el hilo no puede pasar a otra tarea mientras se interrumpe
+            if self._hilo is not None:
+                ConnectionPool.interrumpir_hilo(self._hilo)
+        return True
+
+    def terminada(self):
+        """True si la función ya terminó (o se canceló antes de empezar)"""
+        return self._future.done()
+
+    def resultado(self, timeout=None):
+        """Esperar y retornar el resultado (para scripts; nunca desde la interfaz)"""
+        return self._future.result(timeout)
+
+class TrabajadorDB:
+    """Pool de hilos para la base de datos con entrega de resultados por cuadro"""
+
+    def __init__(self, hilos=None, presupuesto_ms=None):
+        self._executor = ThreadPoolExecutor(max_workers=hilos or HILOS_TRABAJADOR,
+                                            thread_name_prefix="biblio-db")
+        self.presupuesto = (presupuesto_ms or PRESUPUESTO_CUADRO_MS) / 1000
+        self._terminadas = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        # Tareas enviadas cuyos callbacks todavía no terminaron
+        self._pendientes = set()
+        self._por_clave = {}
+        # Callbacks generadores que se siguen avanzando en los próximos cuadros
+        self._en_curso = []
+
+    def enviar(self, funcion, *args, al_terminar=None, al_fallar=None, clave=None,
+               cancelable=True, **kwargs):
+        """Ejecutar ``funcion(*args, **kwargs)`` en un hilo de fondo y retornar su Tarea.
+
+        ``al_terminar(resultado)`` o ``al_fallar(excepción)`` se llaman en el
+        hilo de la interfaz. Las escrituras se envían con ``cancelable=False``:
+        una vez confirmadas, la interfaz tiene que enterarse.
+        """
+        tarea = Tarea(funcion, args, kwargs, al_terminar, al_fallar, clave, cancelable)
+        with self._lock:
+            tarea._future = self._executor.submit(tarea._ejecutar)
+            self._pendientes.add(tarea)
+            anterior = None
+            if clave is not None:
+                anterior = self._por_clave.get(clave)
+                self._por_clave[clave] = tarea
+        tarea._future.add_done_callback(lambda _: self._terminadas.put(tarea))
+        if anterior is not None:
+            anterior.cancelar()
+        return tarea
+
+    def procesar_terminadas(self):
+        """Entregar los resultados listos; llamar una vez por cuadro desde el hilo de la interfaz.
+
+        Primero sigue con los generadores pendientes y luego toma tareas
+        terminadas, hasta agotar el presupuesto de tiempo del cuadro.
+        """
+        limite = time.perf_counter() + self.presupuesto
+        while self._en_curso and time.perf_counter() < limite:
+            tarea, generador = self._en_curso[0]
+            if tarea.cancelada:
+                generador.close()
+                self._finalizar(self._en_curso.pop(0)[0])
+                continue
+            try:
+                while time.perf_counter() < limite:
+                    next(generador)
+            except StopIteration:
+                self._finalizar(self._en_curso.pop(0)[0])
+            except Exception as e:
+                print(f"❌ Error al mostrar resultados: {e}")
+                self._finalizar(self._en_curso.pop(0)[0])
+
+        while time.perf_counter() < limite:
+            try:
+                tarea = self._terminadas.get_nowait()
+            except queue.Empty:
+                break
+            self._entregar(tarea)
+
+    def _entregar(self, tarea):
+        """Llamar al callback que corresponda a una tarea terminada"""
+        if tarea.cancelada:
+            self._finalizar(tarea)
+            return
+        try:
+            error = tarea._future.exception()
+            if error is not None:
+                if tarea._al_fallar is None:
+                    raise error
+                tarea._al_fallar(error)
+            elif tarea._al_terminar is not None:
+                salida = tarea._al_terminar(tarea._future.result())
+                if inspect.isgenerator(salida):
+                    self._en_curso.append((tarea, salida))
+                    return
+        except Exception as e:
+            print(f"❌ Error en tarea de base de datos: {e}")
+        self._finalizar(tarea)
+
+    def _finalizar(self, tarea):
+        with self._lock:
+            self._pendientes.discard(tarea)
+            if self._por_clave.get(tarea.clave) is tarea:
+                del self._por_clave[tarea.clave]
+
+    @property
+    def ocupado(self):
+        """True mientras haya tareas cuyos resultados no terminaron de mostrarse"""
+        return bool(self._pendientes)
+
+    def tiempo_ocupado(self):
+        """Segundos desde que se envió la tarea pendiente más antigua (0 si no hay)"""
+        with self._lock:
+            if not self._pendientes:
+                return 0.0
+            return time.monotonic() - min(tarea.enviada for tarea in self._pendientes)
+
+    def cancelar_todas(self):
+        """Cancelar todas las tareas cancelables pendientes; retorna cuántas"""
+        with self._lock:
+            tareas = list(self._pendientes)
+        return sum(1 for tarea in tareas if tarea.cancelar())
+
+    def cerrar(self):
+        """Cancelar lo pendiente y esperar a que los hilos terminen (al salir)"""
+        self.cancelar_todas()
+        self._executor.shutdown(wait=True, cancel_futures=True)
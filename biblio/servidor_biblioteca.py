@@ -0,0 +1,166 @@
+# servidor_biblioteca.py - Servidor HTTP/JSON para varios mostradores sobre una base
+"""
+Uso:
+    python servidor_biblioteca.py [--db biblioteca.db] [--host 127.0.0.1]
+                                  [--puerto 8765] [--clave CLAVE] [--perfil PERFIL]
+                                  [--verbose]
+    python servidor_biblioteca.py --prueba
+
+Correrlo en la máquina que tiene el archivo de la base. Para que otros
+mostradores de la red lo usen, escuchar en todas las interfaces
+(--host 0.0.0.0) y en cada mostrador iniciar la aplicación con
+BIBLIO_SERVIDOR=http://<máquina>:8765 (y BIBLIO_SERVIDOR_CLAVE si se usa
+--clave). Como es el único proceso que abre el archivo, usa el perfil
+rendimiento (WAL) salvo que se indique otro con --perfil.
+
+--prueba levanta el servidor en 127.0.0.1 sobre una base temporal y lo
+recorre con un cliente: altas, búsqueda, préstamos, devoluciones, lotes,
+errores y varios mostradores prestando a la vez.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+
+from modules.cliente_api import ClienteBiblioteca, ErrorServidor
+from modules.datos_sinteticos import isbn_sintetico
+from modules.db_config import SERVIDOR_PUERTO, SERVIDOR_PERFIL, PERFILES_PRAGMA
+from modules.exportador import exportar
+from modules.servicios import ServicioPrestamos
+from modules.servidor_api import ServidorBiblioteca, servidor_local
+
+# Mostradores y préstamos por mostrador de la prueba concurrente
+MOSTRADORES_PRUEBA = 4
+PRESTAMOS_POR_MOSTRADOR = 25
+
+def _verificar(condicion, mensaje):
+    print(f"{'✅' if condicion else '❌'} {mensaje}")
+    return bool(condicion)
+
+def probar():
+    """Recorrer las operaciones del servidor en loopback; retorna 0 si todo pasó"""
+    with tempfile.TemporaryDirectory(prefix="biblio_servidor_") as directorio:
+        return _probar(os.path.join(directorio, "prueba.db"))
+
+def _probar(db_name):
+    resultados = []
+    with servidor_local(db_name, clave="prueba") as servidor:
+        print(f"🌐 Servidor de prueba en {servidor.url} ({db_name})")
+        cliente = ClienteBiblioteca(servidor.url, clave="prueba")
+
+        estado = cliente.estado()
+        resultados.append(_verificar("prestar_libro" in estado["operaciones"],
+                                     f"{len(estado['operaciones'])} operaciones publicadas"))
+
+        try:
+            ClienteBiblioteca(servidor.url, clave="otra").estado()
+            resultados.append(_verificar(False, "Clave incorrecta rechazada"))
+        except ErrorServidor:
+            resultados.append(_verificar(True, "Clave incorrecta rechazada"))
+
+        autor_id = cliente.llamar("crear_autor", "Gabriel", "García Márquez", "Colombiana")
+        isbns = cliente.lote([("crear_libro", isbn_sintetico(i), f"Libro de prueba {i}", autor_id)
+                              for i in range(MOSTRADORES_PRUEBA * PRESTAMOS_POR_MOSTRADOR + 1)])
+        isbns = [isbn for isbn in isbns if not isinstance(isbn, Exception)]
+        resultados.append(_verificar(len(isbns) == MOSTRADORES_PRUEBA * PRESTAMOS_POR_MOSTRADOR + 1,
+                                     f"{len(isbns)} libros creados en un lote"))
+
+        try:
+            cliente.llamar("crear_libro", isbns[0], "Repetido")
+            resultados.append(_verificar(False, "ISBN repetido rechazado con ValueError"))
+        except ValueError as e:
+            resultados.append(_verificar(True, f"ISBN repetido rechazado con ValueError ({e})"))
+
+        encontrados = cliente.llamar("buscar_libros", "prueba", tamaño=10)
+        mas = cliente.llamar("buscar_libros", "prueba", encontrados['ultima'], "siguiente", 10)
+        volver = cliente.llamar("buscar_libros", "prueba", mas['primera'], "anterior", 10)
+        resultados.append(_verificar(len(encontrados['filas']) == 10 and encontrados['hay_siguiente']
+                                     and mas['filas'][0] != encontrados['filas'][0]
+                                     and volver['filas'] == encontrados['filas'],
+                                     "Búsqueda de texto completo paginada"))
+
+        pagina = cliente.llamar("obtener_pagina_libros", tamaño=20)
+        siguiente = cliente.llamar("obtener_pagina_libros", pagina['ultima'], "siguiente", 20)
+        resultados.append(_verificar(pagina['hay_siguiente'] and siguiente['filas'][0] != pagina['filas'][0],
+                                     "Paginación del catálogo"))
+
+        # Un servicio con cliente envía sus operaciones al servidor sin tocar el archivo
+        servicio = ServicioPrestamos(db_name)
+        servicio.cliente = cliente
+        prestamo_id = servicio.prestar_libro(isbns[-1], "Lectora Remota")
+        repetido = servicio.prestar_libro(isbns[-1], "Otro Lector")
+        resultados.append(_verificar(prestamo_id and repetido is None,
+                                     "Préstamo a través de un servicio con cliente (y rechazo del repetido)"))
+        resultados.append(_verificar(servicio.devolver_prestamo(prestamo_id), "Devolución"))
+
+        # La exportación de un mostrador la lee el servidor y se descarga
+        exportacion = exportar(servicio, os.path.join(os.path.dirname(db_name), "exportacion"))
+        ruta, filas = exportacion["SELECT_ALL_LIBROS"]
+        resultados.append(_verificar(filas == len(isbns) and os.path.exists(ruta),
+                                     f"Exportación descargada del servidor ({filas} libros)"))
+
+        errores = []
+
+        def mostrador(numero):
+            propio = ClienteBiblioteca(servidor.url, clave="prueba")
+            desde = numero * PRESTAMOS_POR_MOSTRADOR
+            for isbn in isbns[desde:desde + PRESTAMOS_POR_MOSTRADOR]:
+                try:
+                    if propio.llamar("prestar_libro", isbn, f"Usuario {numero}") is None:
+                        errores.append(f"{isbn}: no se prestó")
+                except Exception as e:
+                    errores.append(f"{isbn}: {e}")
+            propio.cerrar()
+
+        hilos = [threading.Thread(target=mostrador, args=(n,)) for n in range(MOSTRADORES_PRUEBA)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        activos = cliente.llamar("listar_prestamos_activos")
+        resultados.append(_verificar(not errores and len(activos) == MOSTRADORES_PRUEBA * PRESTAMOS_POR_MOSTRADOR,
+                                     f"{MOSTRADORES_PRUEBA} mostradores a la vez: {len(activos)} préstamos activos"
+                                     + (f" ({errores[0]})" if errores else "")))
+
+        devueltos = cliente.lote([("devolver_prestamo", prestamo[0]) for prestamo in activos]
+                                 + [("operacion_inexistente",)])
+        resultados.append(_verificar(all(d is True for d in devueltos[:-1])
+                                     and isinstance(devueltos[-1], ErrorServidor),
+                                     "Devoluciones en lote y error por operación"))
+        cliente.cerrar()
+
+    return 0 if all(resultados) else 1
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor HTTP/JSON de la biblioteca")
+    parser.add_argument("--db", default="biblioteca.db")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="interfaz donde escuchar (0.0.0.0 para aceptar otros mostradores)")
+    parser.add_argument("--puerto", type=int, default=SERVIDOR_PUERTO)
+    parser.add_argument("--clave", help="clave que deben enviar los mostradores")
+    parser.add_argument("--perfil", choices=list(PERFILES_PRAGMA), default=SERVIDOR_PERFIL,
+                        help="perfil de PRAGMAs de la base")
+    parser.add_argument("--verbose", action="store_true", help="mostrar cada pedido")
+    parser.add_argument("--prueba", action="store_true",
+                        help="probar el servidor en loopback sobre una base temporal")
+    args = parser.parse_args()
+
+    if args.prueba:
+        return probar()
+
+    servidor = ServidorBiblioteca(args.db, args.host, args.puerto, clave=args.clave, verbose=args.verbose,
+                                  perfil=args.perfil)
+    print(f"🌐 Atendiendo {args.db} en {servidor.url} (Ctrl+C para terminar)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Servidor detenido")
+    finally:
+        servidor.server_close()
+        servidor.servicios[0].cerrar_conexiones()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
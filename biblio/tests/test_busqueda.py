@@ -0,0 +1,29 @@
+# test_busqueda.py - La búsqueda de libros se recorre por páginas en ambos sentidos
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules import sqlstatement as sql
+from modules.servicios import ServicioLibros
+
+def test_paginas_de_busqueda_con_coincidencias_completas_y_por_prefijo(tmp_path):
+    libros = ServicioLibros(str(tmp_path / "busqueda.db"))
+    try:
+        # 7 títulos con la palabra completa y 5 que solo coinciden por prefijo
+        libros.execute_many(sql.INSERT_LIBRO, [
+            (f"isbn-{i}", f"{'mar' if i < 7 else 'marea'} {i}", None, None, None, None, "Disponible")
+            for i in range(12)
+        ])
+        paginas = [libros.buscar_libros("mar", tamaño=5)]
+        while paginas[-1]['hay_siguiente']:
+            paginas.append(libros.buscar_libros("mar", paginas[-1]['ultima'], "siguiente", 5))
+        titulos = [libro[1] for pagina in paginas for libro in pagina['filas']]
+        assert len(paginas) == 3 and len(set(titulos)) == 12
+        assert [titulo.split()[0] for titulo in titulos] == ["mar"] * 7 + ["marea"] * 5
+
+        anterior = libros.buscar_libros("mar", paginas[2]['primera'], "anterior", 5)
+        assert anterior['filas'] == paginas[1]['filas'] and anterior['hay_anterior']
+        assert not libros.buscar_libros("mar", paginas[1]['primera'], "anterior", 5)['hay_anterior']
+    finally:
+        libros.cerrar_conexiones()
@@ -0,0 +1,28 @@
+# test_isbn.py - Las operaciones por ISBN llegan al libro guardado con ese ISBN
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules import sqlstatement as sql
+from modules.servicios import ServicioLibros, ServicioPrestamos
+
+def test_isbn_sin_normalizar_de_la_migracion_v10(tmp_path):
+    # Como deja la migración v10 a dos libros con el mismo ISBN normalizado:
+    # el segundo conserva su ISBN original
+    db = str(tmp_path / "isbn.db")
+    libros = ServicioLibros(db)
+    prestamos = ServicioPrestamos(db)
+    try:
+        libros.execute_many(sql.INSERT_LIBRO, [
+            ("9780306406157", "Libro A", None, None, None, None, "Disponible"),
+            ("0-306-40615-2", "Libro B", None, None, None, None, "Disponible"),
+        ])
+        assert prestamos.prestar_libro("0-306-40615-2", "Ana") is not None
+        assert libros.obtener_estado_libro("0-306-40615-2") == "Prestado"
+        assert libros.obtener_estado_libro("978-0-306-40615-7") == "Disponible"
+        assert libros.borrar_libro("9780306406157") == 1
+        assert libros.obtener_libro_con_autor("0-306-40615-2")[0][1] == "Libro B"
+    finally:
+        libros.cerrar_conexiones()
+        prestamos.cerrar_conexiones()
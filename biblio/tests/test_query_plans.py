@@ -0,0 +1,16 @@
+# test_query_plans.py - Las consultas críticas no deben recorrer tablas completas
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.database_manager import DatabaseManager
+from modules.query_plans import verificar_planes
+
+def test_consultas_criticas_usan_indices(tmp_path):
+    manager = DatabaseManager(str(tmp_path / "planes.db"))
+    try:
+        fallas = verificar_planes(manager)
+    finally:
+        manager.cerrar_conexiones()
+    assert fallas == {}, "\n".join(f"{nombre}: {', '.join(pasos)}" for nombre, pasos in fallas.items())
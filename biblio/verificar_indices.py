@@ -0,0 +1,38 @@
+# verificar_indices.py - Falla si alguna consulta frecuente recorre una tabla completa
+"""
+Ejecuta EXPLAIN QUERY PLAN sobre cada consulta de CONSULTAS_CRITICAS contra
+una base recién migrada y termina con código 1 si alguna usa SCAN sin índice.
+La misma verificación corre en las pruebas (tests/test_query_plans.py).
+
+Uso:
+    python verificar_indices.py [--db biblioteca.db]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+from modules.database_manager import DatabaseManager
+from modules.query_plans import CONSULTAS_CRITICAS, verificar_planes
+
+def main():
+    parser = argparse.ArgumentParser(description="Verificar que las consultas críticas usan índices")
+    parser.add_argument("--db", help="base a verificar (por defecto una temporal recién migrada)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        manager = DatabaseManager(args.db or os.path.join(directorio, "planes.db"))
+        fallas = verificar_planes(manager)
+        manager.cerrar_conexiones()
+
+    for nombre in CONSULTAS_CRITICAS:
+        if nombre in fallas:
+            print(f"❌ {nombre}: {', '.join(fallas[nombre])}")
+        else:
+            print(f"✅ {nombre}")
+
+    return 1 if fallas else 0
+
+if __name__ == "__main__":
+    sys.exit(main())